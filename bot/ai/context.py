@@ -1,26 +1,192 @@
-from collections import deque
+"""
+Conversation context memory for AI replies
+Two tiers behind one API:
+- memory: the last CONTEXT_MEMORY_SIZE messages of up to CONTEXT_CACHE_USERS users,
+  LRU-ordered; users idle for CONTEXT_IDLE_TTL seconds are evicted
+- DB: conversation_contexts, indexed on (user_id, timestamp) and pruned to the
+  newest CONTEXT_HISTORY_LIMIT messages per user on every write (ring buffer)
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import delete, select
+
 from config.settings import settings
+from bot.utils.database import SessionLocal, ConversationContext
+
+
+class ContextMemory:
+    """Bounded per-user conversation history (memory tier over the conversation_contexts table)"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        window: int = settings.CONTEXT_MEMORY_SIZE,
+        max_users: int = settings.CONTEXT_CACHE_USERS,
+        idle_ttl: float = settings.CONTEXT_IDLE_TTL,
+        history_limit: int = settings.CONTEXT_HISTORY_LIMIT,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self.history_limit = max(history_limit, window)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0  # Bumped by every add/clear: a load that raced a write is not cached
+        self._histories: "OrderedDict[int, List]" = OrderedDict()  # user_id -> [last_used, deque]
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Last `limit` messages (oldest first) in OpenAI message format"""
+        limit = self.window if limit is None else limit
+        if limit > self.window:
+            return self._load(user_id, limit)  # Longer than the memory tier keeps
+
+        with self._lock:
+            entry = self._touch(user_id)
+            if entry is not None:
+                self.hits += 1
+                return list(entry[1])[-limit:] if limit else []
+            self.misses += 1
+            writes = self._writes
+
+        messages = self._load(user_id, self.window)
+        with self._lock:
+            if user_id not in self._histories and self._writes == writes:
+                self._histories[user_id] = [self.clock(), deque(messages, maxlen=self.window)]
+                self._evict()
+        return messages[-limit:] if limit else []
+
+    def add(self, user_id: int, messages: List[Dict[str, str]]):
+        """Store messages (one commit) and drop the user's messages beyond history_limit"""
+        db = self.session_factory()
+        try:
+            db.add_all(
+                ConversationContext(user_id=user_id, role=message["role"], content=message["content"])
+                for message in messages
+            )
+            db.flush()
+            newest = select(ConversationContext.id).where(
+                ConversationContext.user_id == user_id
+            ).order_by(
+                ConversationContext.timestamp.desc(), ConversationContext.id.desc()
+            ).limit(self.history_limit)
+            db.execute(
+                delete(ConversationContext).where(
+                    ConversationContext.user_id == user_id,
+                    ConversationContext.id.not_in(newest.scalar_subquery())
+                ),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._writes += 1
+            entry = self._touch(user_id)
+            if entry is not None:
+                entry[1].extend({"role": message["role"], "content": message["content"]} for message in messages)
+
+    def clear(self, user_id: int):
+        """Forget a user's conversation in both tiers"""
+        db = self.session_factory()
+        try:
+            db.execute(delete(ConversationContext).where(ConversationContext.user_id == user_id))
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self._writes += 1
+            self._histories.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        """Memory tier size and hit rate (for logs / admin metrics)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._histories),
+                "messages": sum(len(entry[1]) for entry in self._histories.values()),
+                "content_chars": sum(len(m["content"] or "") for entry in self._histories.values() for m in entry[1]),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def _load(self, user_id: int, limit: int) -> List[Dict[str, str]]:
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(ConversationContext.role, ConversationContext.content)
+                .where(ConversationContext.user_id == user_id)
+                .order_by(ConversationContext.timestamp.desc(), ConversationContext.id.desc())
+                .limit(limit)
+            ).all()
+            return [{"role": role, "content": content} for role, content in reversed(rows)]
+        finally:
+            db.close()
+
+    def _touch(self, user_id: int) -> Optional[List]:
+        """Entry marked as just used, or None (caller holds the lock)"""
+        self._evict()
+        entry = self._histories.get(user_id)
+        if entry is not None:
+            entry[0] = self.clock()
+            self._histories.move_to_end(user_id)
+        return entry
+
+    def _evict(self):
+        """Drop idle users from the LRU end, then the oldest beyond max_users (caller holds the lock)"""
+        idle_before = self.clock() - self.idle_ttl
+        while self._histories:
+            user_id, entry = next(iter(self._histories.items()))
+            if entry[0] > idle_before and len(self._histories) <= self.max_users:
+                break
+            del self._histories[user_id]
+            self.evictions += 1
+
+
+_context_memory: Optional[ContextMemory] = None
+_context_memory_lock = threading.Lock()
+
+
+def get_context_memory() -> ContextMemory:
+    """Get the process-wide context memory"""
+    global _context_memory
+    with _context_memory_lock:
+        if _context_memory is None:
+            _context_memory = ContextMemory()
+            logger.info(
+                f"✅ Context memory ready ({_context_memory.max_users} users, "
+                f"{_context_memory.history_limit} stored messages per user)"
+            )
+        return _context_memory
 
-conversation_histories = {}
 
 def get_conversation_history(user_id: int):
     """
     Gets the conversation history for a user.
     """
-    if user_id not in conversation_histories:
-        conversation_histories[user_id] = deque(maxlen=settings.CONTEXT_MEMORY_SIZE)
-    return conversation_histories[user_id]
+    return get_context_memory().get(user_id)
+
 
 def add_to_conversation_history(user_id: int, role: str, content: str):
     """
     Adds a message to the conversation history for a user.
     """
-    history = get_conversation_history(user_id)
-    history.append({"role": role, "content": content})
+    get_context_memory().add(user_id, [{"role": role, "content": content}])
+
 
 def clear_conversation_history(user_id: int):
     """
     Clears the conversation history for a user.
     """
-    if user_id in conversation_histories:
-        conversation_histories[user_id].clear()
+    get_context_memory().clear(user_id)
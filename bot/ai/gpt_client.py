@@ -2,10 +2,15 @@
 OpenAI GPT-4 Client for AI Conversations
 Phase 2: AI Enhancement
 """
+import asyncio
+import time
 from openai import AsyncOpenAI
 from loguru import logger
 from config.settings import settings
-from typing import List, Dict
+from typing import List, Dict, Optional
+from bot.ai.prompt_builder import PromptBuilder
+from bot.ai.response_cache import get_response_cache
+from bot.services.analytics import Analytics
 
 
 # System prompt for GPT-4
@@ -80,48 +85,69 @@ class GPTClient:
         self.model = settings.OPENAI_MODEL
         self.temperature = settings.OPENAI_TEMPERATURE
         self.max_tokens = settings.OPENAI_MAX_TOKENS
+        # Same system prompt first in every request: a stable prefix for provider-side prompt caching
+        self.prompt_builder = PromptBuilder(SYSTEM_PROMPT, self.model)
+        self.response_cache = get_response_cache()  # None when AI_CACHE_ENABLED is off
     
     async def chat(
         self,
         message: str,
         context: List[Dict[str, str]] = None,
-        user_id: int = None
+        user_id: int = None,
+        tier: Optional[str] = None
     ) -> str:
         """
         Send message to GPT-4 and get response
         
         Args:
             message: User's message
-            context: Previous conversation context
+            context: Previous conversation context (trimmed to the tier's token budget)
             user_id: User's Telegram ID
+            tier: Subscription tier value (FREE / TRIAL / PREMIUM) - sets the token budget
         
         Returns:
             AI response text
         """
         try:
-            # Build messages array
-            messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+            # Repeated support question: answer from the semantic cache, no OpenAI call
+            if self.response_cache is not None:
+                started = time.perf_counter()
+                cached = await asyncio.to_thread(self.response_cache.get, message)
+                if cached is not None:
+                    Analytics.track_event(user_id, 'ai_request', {
+                        'model': self.model,
+                        'tier': tier or 'FREE',
+                        'cache_hit': True,
+                        'prompt_tokens': 0,
+                        'completion_tokens': 0,
+                        'latency_ms': round((time.perf_counter() - started) * 1000)
+                    })
+                    logger.info(f"GPT-4 cache hit for user {user_id}: {message[:100]}")
+                    return cached
             
-            # Add context (last 5 messages)
-            if context:
-                messages.extend(context[-settings.CONTEXT_MEMORY_SIZE:])
+            prompt = self.prompt_builder.build(message, context, tier)
             
-            # Add current message
-            messages.append({"role": "user", "content": message})
-            
-            logger.info(f"GPT-4 request for user {user_id}: {message[:100]}")
+            logger.info(
+                f"GPT-4 request for user {user_id}: {message[:100]} "
+                f"(~{prompt['prompt_tokens']} tokens, {prompt['history_dropped']} turns trimmed)"
+            )
             
             # Call OpenAI API
+            started = time.perf_counter()
             response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=prompt["messages"],
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=prompt["max_tokens"]
             )
+            self._record_usage(user_id, tier, prompt, response, started)
             
             ai_response = response.choices[0].message.content
             logger.info(f"GPT-4 response for user {user_id}: {ai_response[:100]}")
             
+            if self.response_cache is not None:
+                await asyncio.to_thread(self.response_cache.put, message, ai_response)
+            
             return ai_response
             
         except Exception as e:
@@ -139,23 +165,39 @@ class GPTClient:
         For API integration: Get user balance, transactions, etc.
         """
         try:
-            messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-            if context:
-                messages.extend(context[-settings.CONTEXT_MEMORY_SIZE:])
-            messages.append({"role": "user", "content": message})
+            prompt = self.prompt_builder.build(message, context)
             
+            started = time.perf_counter()
             response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=prompt["messages"],
                 functions=functions,
                 function_call="auto"
             )
+            self._record_usage(None, None, prompt, response, started)
             
             return response
             
         except Exception as e:
             logger.error(f"GPT-4 function calling error: {e}")
             return None
+    
+    def _record_usage(self, user_id: Optional[int], tier: Optional[str], prompt: Dict, response, started: float):
+        """Track tokens in/out and latency of one request (cost and latency dashboards)"""
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        Analytics.track_event(user_id, 'ai_request', {
+            'model': self.model,
+            'tier': tier or 'FREE',
+            'cache_hit': False,
+            'prompt_tokens': getattr(usage, "prompt_tokens", None),
+            'completion_tokens': getattr(usage, "completion_tokens", None),
+            'cached_tokens': getattr(details, "cached_tokens", None),  # Served from the provider's prompt cache
+            'estimated_prompt_tokens': prompt['prompt_tokens'],
+            'history_used': prompt['history_used'],
+            'history_dropped': prompt['history_dropped'],
+            'latency_ms': round((time.perf_counter() - started) * 1000)
+        })
 
 
 # Example usage in message handler (Phase 2)
@@ -170,12 +212,14 @@ async def handle_message_ai(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Get user's conversation context from database
     user_context = await get_user_context(user.id)
+    db_user = await get_user_by_id(user.id)
     
-    # Call GPT-4
+    # Call GPT-4 (token budget by subscription tier)
     ai_response = await gpt_client.chat(
         message=message_text,
         context=user_context,
-        user_id=user.id
+        user_id=user.id,
+        tier=SubscriptionManager.get_user_tier(db_user).value
     )
     
     # Save to context memory
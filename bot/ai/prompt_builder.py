@@ -0,0 +1,147 @@
+"""
+Prompt Builder - Token-budgeted chat prompts
+Every request is laid out as:
+
+    [system prompt]  [summary of trimmed turns]  [recent history]  [user message]
+
+The system prompt is always the first message and byte-for-byte identical, so
+the provider's prompt cache (OpenAI caches repeated prefixes of 1024+ tokens)
+keeps serving it. Anything per-user comes after it. History is kept newest-first
+until the tier's input budget is spent. Older turns are folded into a short note
+with the user's earlier questions instead of being sent verbatim.
+
+Tokens are counted with tiktoken when it is installed. Otherwise ~3 UTF-8 bytes
+count as one token, which overestimates Vietnamese text, so budgets stay safe.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+# Chat format overhead (OpenAI cookbook): per message, and priming the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+SUMMARY_HEADER = "Tóm tắt các câu hỏi trước đó của user:"
+SUMMARY_QUESTION_CHARS = 80
+SUMMARY_TOKENS = 100  # Kept for the summary when history is trimmed (at most 1/4 of the budget)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken package not installed - estimating tokens from text length")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=1024)
+def count_tokens(text: str, model: str = settings.OPENAI_MODEL) -> int:
+    """Tokens in `text` for `model` (cached: the system prompt is counted once)"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text.encode("utf-8")) // 3)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = settings.OPENAI_MODEL) -> int:
+    """Prompt tokens for a chat request (content + per-message overhead)"""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(m.get("content") or "", model) for m in messages) + TOKENS_PER_REPLY
+
+
+class PromptBuilder:
+    """Assemble system prompt + budgeted history + message for one chat request"""
+
+    def __init__(self, system_prompt: str, model: str = settings.OPENAI_MODEL):
+        self.system_prompt = system_prompt
+        self.model = model
+        self.system_tokens = count_message_tokens([{"role": "system", "content": system_prompt}], model)
+
+    @staticmethod
+    def budget_for(tier: Optional[str]) -> Dict[str, int]:
+        """Input budget (history + message, excluding the system prompt) and reply cap for a tier"""
+        if tier in ("PREMIUM", "TRIAL"):
+            return {"input": settings.AI_CONTEXT_BUDGET_PREMIUM, "max_tokens": settings.OPENAI_MAX_TOKENS}
+        return {"input": settings.AI_CONTEXT_BUDGET_FREE, "max_tokens": settings.AI_REPLY_MAX_TOKENS_FREE}
+
+    def build(self, message: str, history: Optional[List[Dict[str, str]]] = None, tier: Optional[str] = None) -> Dict:
+        """
+        Build the request messages for `message` within the tier's budget
+
+        Returns:
+            {
+                "messages": [...],
+                "prompt_tokens": int,   # Estimated prompt tokens, system prompt included
+                "max_tokens": int,      # Reply cap for the tier
+                "history_used": int,
+                "history_dropped": int
+            }
+        """
+        budget = self.budget_for(tier)
+        current = {"role": "user", "content": message}
+        remaining = budget["input"] - count_message_tokens([current], self.model) + TOKENS_PER_REPLY
+
+        # Newest turns first; if some don't fit, keep room for the summary of the rest
+        history = list(history or [])
+        kept, left = self._fit(history, remaining)
+        if len(kept) < len(history):
+            reserve = min(SUMMARY_TOKENS, budget["input"] // 4)
+            kept, left = self._fit(history, remaining - reserve)
+            left += reserve
+        remaining = left
+        dropped = history[:len(history) - len(kept)]
+
+        messages = [{"role": "system", "content": self.system_prompt}]
+        summary = self._summarize(dropped, remaining)
+        if summary:
+            messages.append(summary)
+        messages.extend(kept)
+        messages.append(current)
+
+        return {
+            "messages": messages,
+            "prompt_tokens": self.system_tokens - TOKENS_PER_REPLY + count_message_tokens(messages[1:], self.model),
+            "max_tokens": budget["max_tokens"],
+            "history_used": len(kept),
+            "history_dropped": len(dropped),
+        }
+
+    def _fit(self, history: List[Dict[str, str]], remaining: int):
+        """Newest turns that fit in `remaining` tokens (in order), and the tokens left"""
+        kept: List[Dict[str, str]] = []
+        for turn in reversed(history):
+            cost = TOKENS_PER_MESSAGE + count_tokens(turn.get("content") or "", self.model)
+            if cost > remaining:
+                break
+            kept.append(turn)
+            remaining -= cost
+        kept.reverse()
+        return kept, remaining
+
+    def _summarize(self, dropped: List[Dict[str, str]], remaining: int) -> Optional[Dict[str, str]]:
+        """Fold trimmed turns into the user's earlier questions (newest kept first), within `remaining`"""
+        questions = [turn.get("content") or "" for turn in dropped if turn.get("role") == "user"]
+        if not questions:
+            return None
+
+        lines: List[str] = []
+        remaining -= TOKENS_PER_MESSAGE + count_tokens(SUMMARY_HEADER, self.model)
+        for question in reversed(questions):
+            line = "- " + " ".join(question.split())[:SUMMARY_QUESTION_CHARS]
+            cost = count_tokens(line, self.model) + 1
+            if cost > remaining:
+                break
+            lines.insert(0, line)
+            remaining -= cost
+        if not lines:
+            return None
+        return {"role": "system", "content": "\n".join([SUMMARY_HEADER] + lines)}
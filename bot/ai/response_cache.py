@@ -0,0 +1,177 @@
+"""
+Response Cache - Semantic cache in front of GPTClient.chat
+Most AI traffic is the same few support questions ("làm sao thêm giao dịch",
+"sao số dư bị sai"). A question whose normalized text was answered before, or
+whose embedding is within AI_CACHE_THRESHOLD cosine similarity of one, gets the
+stored answer in milliseconds without an OpenAI call.
+
+Embeddings come from the local sentence-transformers model AI_CACHE_MODEL
+(multilingual, so Vietnamese paraphrases match). Tests pass any callable
+`embed(texts) -> vectors`. Without sentence-transformers only exact
+(normalized) repeats are served.
+
+Entries expire after AI_CACHE_TTL seconds. Up to AI_CACHE_MAX_ENTRIES are kept
+and the least recently used is evicted first. Each entry counts its hits.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from config.settings import settings
+
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_question(text: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a question (diacritics kept)"""
+    text = unicodedata.normalize("NFC", text or "").lower()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+@lru_cache(maxsize=2)
+def load_sentence_embedder(model_name: str = settings.AI_CACHE_MODEL) -> Optional[Embedder]:
+    """Local sentence-transformers embedder (loaded once per model), or None when the package isn't installed"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("sentence-transformers package not installed - semantic matching disabled (exact questions only)")
+        return None
+
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, normalize_embeddings=True).tolist()
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of AI answers, looked up by question similarity"""
+
+    def __init__(
+        self,
+        embed: Optional[Embedder] = None,
+        threshold: float = settings.AI_CACHE_THRESHOLD,
+        ttl: float = settings.AI_CACHE_TTL,
+        max_entries: int = settings.AI_CACHE_MAX_ENTRIES,
+        min_chars: int = settings.AI_CACHE_MIN_CHARS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_chars = min_chars
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # normalized question -> {"answer", "vector", "expires_at", "hits"}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cacheable(self, question: str) -> bool:
+        """Short follow-ups ("còn cái kia?") depend on the conversation: never cached"""
+        return len(normalize_question(question)) >= self.min_chars
+
+    def get(self, question: str) -> Optional[str]:
+        """Cached answer for `question` (exact normalized match, then nearest embedding)"""
+        if not self.cacheable(question):
+            return None
+        key = normalize_question(question)
+
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._hit(key, entry)
+            if self.embed is None or not self._entries:
+                self.misses += 1
+                return None
+
+        vector = _unit(self.embed([key])[0])
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            for candidate, entry in self._entries.items():
+                if entry["vector"] is None:
+                    continue
+                score = sum(a * b for a, b in zip(vector, entry["vector"]))
+                if score >= best_score:
+                    best_key, best_score = candidate, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            logger.debug(f"Response cache: '{key[:50]}' ~ '{best_key[:50]}' ({best_score:.3f})")
+            return self._hit(best_key, self._entries[best_key])
+
+    def put(self, question: str, answer: str):
+        """Store an answer (replaces the entry for the same normalized question)"""
+        if not self.cacheable(question) or not answer:
+            return
+        key = normalize_question(question)
+        vector = _unit(self.embed([key])[0]) if self.embed is not None else None
+
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "vector": vector,
+                "expires_at": self.clock() + self.ttl,
+                "hits": 0,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            top = sorted(self._entries.items(), key=lambda item: item[1]["hits"], reverse=True)[:5]
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "top_questions": [(key, entry["hits"]) for key, entry in top],
+            }
+
+    def _hit(self, key: str, entry: Dict) -> str:
+        """Count a hit on `entry` (caller holds the lock)"""
+        entry["hits"] += 1
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry["answer"]
+
+    def _expire(self):
+        """Drop expired entries (caller holds the lock)"""
+        now = self.clock()
+        for key in [key for key, entry in self._entries.items() if entry["expires_at"] <= now]:
+            del self._entries[key]
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the process-wide response cache (None when AI_CACHE_ENABLED is off)"""
+    global _response_cache
+    if not settings.AI_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(embed=load_sentence_embedder())
+            logger.info(f"✅ Response cache ready (threshold {_response_cache.threshold}, {_response_cache.ttl}s TTL)")
+        return _response_cache
@@ -26,6 +26,7 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 from telegram.ext import ContextTypes
 from bot.utils.database import SessionLocal, User
+from bot.services.job_store import get_job_store, register_job_handler
 from loguru import logger
 
 
@@ -183,11 +184,8 @@ class ProgramManager:
         
         program = user.current_program
         
-        # Remove scheduled jobs
-        job_prefix = f"program_{user_id}_"
-        current_jobs = context.job_queue.get_jobs_by_name(job_prefix)
-        for job in current_jobs:
-            job.schedule_removal()
+        # Cancel pending program days (persistent job store)
+        get_job_store().cancel(f"program_{user_id}_")
         
         # Clear program data
         user.current_program = None
@@ -230,45 +228,18 @@ class ProgramManager:
         else:
             send_time = datetime.utcnow() + timedelta(hours=total_delay_hours)
         
-        # Schedule job
-        job_name = f"program_{user_id}_{program.value}_day_{day}"
-        
-        context.job_queue.run_once(
-            self._send_program_message,
-            when=send_time,
-            data={
-                "user_id": user_id,
-                "program": program.value,
-                "day": day,
-                "config": day_config
-            },
-            name=job_name
+        # Persist job (survives restarts; loaded into the JobQueue when due soon)
+        get_job_store().schedule(
+            f"program_{user_id}_{program.value}_day_{day}",
+            "program_day",
+            send_time,
+            user_id=user_id,
+            program=program.value,
+            day=day
         )
         
         logger.info(f"📅 Scheduled {program.value} day {day} for user {user_id} at {send_time}")
     
-    async def _send_program_message(self, context: ContextTypes.DEFAULT_TYPE):
-        """
-        Send program message (called by job queue)
-        """
-        job_data = context.job.data
-        user_id = job_data["user_id"]
-        program = job_data["program"]
-        day = job_data["day"]
-        config = job_data["config"]
-        
-        # Import handlers (avoid circular import)
-        if program == ProgramType.NURTURE_7_DAY.value:
-            from bot.handlers.daily_nurture import send_nurture_message
-            await send_nurture_message(context, user_id, day)
-        
-        elif program == ProgramType.ONBOARDING_7_DAY.value:
-            from bot.handlers.onboarding import send_onboarding_message
-            await send_onboarding_message(context, user_id, day)
-        
-        else:
-            logger.warning(f"Unknown program: {program}")
-    
     def _get_program_config(self, program: ProgramType) -> Dict[int, Dict[str, Any]]:
         """
         Get program configuration (message content, delays, etc.)
@@ -339,6 +310,26 @@ class ProgramManager:
 # HELPER FUNCTIONS
 # ============================================================================
 
+async def send_program_day(context: ContextTypes.DEFAULT_TYPE, user_id: int, program: str, day: int):
+    """
+    Send program message (stored "program_day" job)
+    """
+    # Import handlers (avoid circular import)
+    if program == ProgramType.NURTURE_7_DAY.value:
+        from bot.handlers.daily_nurture import send_nurture_message
+        await send_nurture_message(context, user_id, day)
+    
+    elif program == ProgramType.ONBOARDING_7_DAY.value:
+        from bot.handlers.onboarding import send_onboarding_message
+        await send_onboarding_message(context, user_id, day)
+    
+    else:
+        logger.warning(f"Unknown program: {program}")
+
+
+register_job_handler("program_day", send_program_day)
+
+
 async def enroll_user_in_program(
     user_id: int, 
     program: ProgramType,
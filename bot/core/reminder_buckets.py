@@ -0,0 +1,205 @@
+"""
+Reminder Buckets - Per-user, timezone-aware daily reminder times
+Each user gets a UTC minute-of-day bucket for the morning and the evening
+reminder: their local preferred time (default 08:00 / 20:00 in
+settings.DEFAULT_TIMEZONE) converted to UTC, plus a stable per-user offset of
+0..REMINDER_SPREAD_MINUTES-1 minutes so one popular time does not become a
+single burst. A dispatcher runs every minute and broadcasts only that minute's
+bucket, so load is spread across the day and follows each user's clock.
+"""
+import asyncio
+from datetime import datetime, timedelta, time as dt_time
+from typing import Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from loguru import logger
+from sqlalchemy import func
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, User
+from bot.handlers.daily_reminder import build_morning_reminder, build_evening_reminder
+from bot.services.broadcast import TokenBucket, register_broadcast, run_broadcast, prune_broadcast_jobs
+
+MINUTES_PER_DAY = 24 * 60
+
+# kind -> (preferred local time column, bucket column, default local time)
+REMINDER_KINDS = {
+    "morning": (User.morning_reminder_at, User.morning_reminder_bucket, "08:00"),
+    "evening": (User.evening_reminder_at, User.evening_reminder_bucket, "20:00"),
+}
+
+# Recipients of the daily reminders: VIP users with reminders enabled
+REMINDER_CRITERIA = [
+    User.user_state.in_(["VIP", "SUPER_VIP"]),
+    User.reminder_enabled == True
+]
+
+
+def _zone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or settings.DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"⚠️ Unknown timezone {name!r}, using {settings.DEFAULT_TIMEZONE}")
+        return ZoneInfo(settings.DEFAULT_TIMEZONE)
+
+
+def utc_minute(local_time: str, timezone: Optional[str], on_date=None) -> int:
+    """UTC minute of day for a local "HH:MM" in `timezone` (offset as of on_date, default today)"""
+    hour, minute = (int(part) for part in local_time.split(":"))
+    on_date = on_date or datetime.utcnow().date()
+    local = datetime.combine(on_date, dt_time(hour, minute), tzinfo=_zone(timezone))
+    utc = local.astimezone(ZoneInfo("UTC"))
+    return utc.hour * 60 + utc.minute
+
+
+def assign_reminder_buckets(
+    session_factory: Callable = SessionLocal,
+    user_ids: Optional[List[int]] = None,
+    only_missing: bool = False,
+    spread: int = settings.REMINDER_SPREAD_MINUTES
+) -> int:
+    """
+    (Re)compute reminder buckets: one UPDATE per (timezone, preferred time) group
+
+    Run daily so DST changes are picked up; only_missing=True just fills new users.
+
+    Returns:
+        Number of user rows updated
+    """
+    timezone = func.coalesce(User.timezone, settings.DEFAULT_TIMEZONE)
+    offset = (User.id % spread) if spread > 1 else 0
+
+    db = session_factory()
+    try:
+        updated = 0
+        for kind, (time_column, bucket_column, default_time) in REMINDER_KINDS.items():
+            local_time = func.coalesce(time_column, default_time)
+            scope = []
+            if user_ids is not None:
+                scope.append(User.id.in_(user_ids))
+            if only_missing:
+                scope.append(bucket_column.is_(None))
+
+            groups = db.query(timezone, local_time).filter(*scope).distinct().all()
+            for tz_name, at in groups:
+                try:
+                    base = utc_minute(at, tz_name)
+                except ValueError:
+                    logger.warning(f"⚠️ Invalid {kind} reminder time {at!r}, using {default_time}")
+                    base = utc_minute(default_time, tz_name)
+                updated += db.query(User).filter(
+                    *scope, timezone == tz_name, local_time == at
+                ).update({bucket_column: (base + offset) % MINUTES_PER_DAY}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    if updated:
+        logger.info(f"🕐 Assigned reminder buckets ({updated} updates)")
+    return updated
+
+
+def _reminder_broadcast(kind: str, build):
+    """Factory of broadcast() kwargs for one reminder bucket (re-evaluated when a run is resumed)"""
+    bucket_column = REMINDER_KINDS[kind][1]
+
+    def build_message(user):
+        text, keyboard = build(user)
+        return {"text": text, "parse_mode": "Markdown", "reply_markup": keyboard}
+
+    def spec(bucket: Optional[int] = None) -> Dict:
+        criteria = list(REMINDER_CRITERIA)
+        if bucket is not None:
+            criteria.append(bucket_column == bucket)
+        return {
+            "criteria": criteria,
+            "build_message": build_message,
+            "on_delivered": {"last_reminder_sent": datetime.utcnow()}
+        }
+    return spec
+
+
+register_broadcast("morning_reminder", _reminder_broadcast("morning", build_morning_reminder))
+register_broadcast("evening_reminder", _reminder_broadcast("evening", build_evening_reminder))
+
+
+class ReminderBucketDispatcher:
+    """Every minute: broadcast the morning/evening buckets due in that UTC minute"""
+
+    def __init__(
+        self,
+        bot,
+        session_factory: Callable = SessionLocal,
+        catchup_minutes: int = settings.REMINDER_CATCHUP_MINUTES,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        **engine_options
+    ):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.catchup_minutes = catchup_minutes
+        self.clock = clock
+        # One send budget for all buckets in flight (Telegram's limit is per bot)
+        if "limiter" not in engine_options:
+            engine_options["limiter"] = TokenBucket(
+                engine_options.pop("rate", settings.BROADCAST_RATE),
+                **{name: engine_options[name] for name in ("clock", "sleep") if name in engine_options}
+            )
+        self.engine_options = engine_options
+        self._last: Optional[datetime] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _due_minutes(self) -> List[datetime]:
+        now = self.clock().replace(second=0, microsecond=0)
+        start = self._last + timedelta(minutes=1) if self._last else now - timedelta(minutes=self.catchup_minutes)
+        self._last = now
+        minutes = []
+        while start <= now:
+            minutes.append(start)
+            start += timedelta(minutes=1)
+        return minutes
+
+    def _bucket_has_users(self, kind: str, bucket: int) -> bool:
+        db = self.session_factory()
+        try:
+            return db.query(User.id).filter(
+                REMINDER_KINDS[kind][1] == bucket, *REMINDER_CRITERIA
+            ).first() is not None
+        finally:
+            db.close()
+
+    def _maintain(self, minute: datetime):
+        """Hourly: bucket new users. Daily at 00:00 UTC: full recompute (DST) + prune checkpoints"""
+        if minute.hour == 0 and minute.minute == 0:
+            assign_reminder_buckets(self.session_factory)
+            prune_broadcast_jobs(self.session_factory)
+        elif minute.minute == 0:
+            assign_reminder_buckets(self.session_factory, only_missing=True)
+
+    async def tick(self) -> List[str]:
+        """
+        Dispatch due buckets (missed minutes since the last tick are caught up)
+
+        Returns:
+            Job keys started
+        """
+        started = []
+        for minute in self._due_minutes():
+            await asyncio.to_thread(self._maintain, minute)
+            bucket = minute.hour * 60 + minute.minute
+            for kind in REMINDER_KINDS:
+                if not await asyncio.to_thread(self._bucket_has_users, kind, bucket):
+                    continue
+                job_key = f"{kind}_reminder:{minute.date().isoformat()}:{bucket:04d}"
+                task = asyncio.ensure_future(run_broadcast(
+                    self.bot, f"{kind}_reminder", job_key, self.session_factory,
+                    {"bucket": bucket}, **self.engine_options
+                ))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                started.append(job_key)
+        return started
+
+    async def drain(self):
+        """Wait for broadcasts started by previous ticks"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -8,7 +8,7 @@ from telegram.ext import ContextTypes
 from loguru import logger
 from datetime import datetime, timedelta
 from bot.utils.database import SessionLocal, User
-from bot.handlers.daily_reminder import send_morning_reminder, send_evening_reminder
+from bot.core.reminder_buckets import ReminderBucketDispatcher, assign_reminder_buckets
 from bot.handlers.streak_tracking import check_missed_days
 
 
@@ -17,13 +17,14 @@ class DailyReminderScheduler:
     Manages daily reminder schedules for all VIP users
     
     Schedules:
-    - Morning reminder: 8:00 AM daily
-    - Evening reminder: 8:00 PM daily  
+    - Morning/evening reminders: every minute, that minute's UTC bucket
+      (each user's local 8:00 AM / 8:00 PM, spread over a few minutes)
     - Missed days check: 9:00 PM daily
     """
     
     def __init__(self, scheduler: AsyncIOScheduler):
         self.scheduler = scheduler
+        self.dispatcher = None
         logger.info("Daily Reminder Scheduler initialized")
     
     def start_daily_reminders(self, context: ContextTypes.DEFAULT_TYPE):
@@ -31,27 +32,19 @@ class DailyReminderScheduler:
         Start global daily reminder jobs
         Runs for all VIP users automatically
         """
-        # Morning reminder - 8:00 AM daily
-        self.scheduler.add_job(
-            func=self._send_all_morning_reminders,
-            trigger=CronTrigger(hour=8, minute=0),
-            args=[context],
-            id="daily_morning_reminder",
-            replace_existing=True,
-            name="Daily Morning Motivation (8:00 AM)"
-        )
-        logger.info("✅ Scheduled morning reminders at 8:00 AM daily")
+        # Users without a bucket yet (new column, new users)
+        assign_reminder_buckets(only_missing=True)
+        self.dispatcher = ReminderBucketDispatcher(context.bot)
         
-        # Evening reminder - 8:00 PM daily
+        # Reminder buckets - every minute
         self.scheduler.add_job(
-            func=self._send_all_evening_reminders,
-            trigger=CronTrigger(hour=20, minute=0),
-            args=[context],
-            id="daily_evening_reminder",
+            func=self.dispatcher.tick,
+            trigger=CronTrigger(minute="*"),
+            id="reminder_bucket_dispatch",
             replace_existing=True,
-            name="Daily Evening Check-in (8:00 PM)"
+            name="Daily Reminders (per-minute buckets)"
         )
-        logger.info("✅ Scheduled evening reminders at 8:00 PM daily")
+        logger.info("✅ Scheduled reminder bucket dispatch every minute")
         
         # Missed days check - 9:00 PM daily
         self.scheduler.add_job(
@@ -63,56 +56,6 @@ class DailyReminderScheduler:
         )
         logger.info("✅ Scheduled missed days check at 9:00 PM daily")
     
-    async def _send_all_morning_reminders(self, context: ContextTypes.DEFAULT_TYPE):
-        """Send morning reminders to all eligible users"""
-        try:
-            db = SessionLocal()
-            
-            # Get all VIP users with reminders enabled
-            users = db.query(User).filter(
-                User.user_state.in_(["VIP", "SUPER_VIP"]),
-                User.reminder_enabled == True
-            ).all()
-            
-            logger.info(f"Sending morning reminders to {len(users)} users")
-            
-            for user in users:
-                try:
-                    await send_morning_reminder(context, user.id)
-                except Exception as e:
-                    logger.error(f"Failed to send morning reminder to {user.id}: {e}")
-            
-            db.close()
-            logger.info(f"✅ Completed morning reminders for {len(users)} users")
-            
-        except Exception as e:
-            logger.error(f"Error in morning reminder batch: {e}")
-    
-    async def _send_all_evening_reminders(self, context: ContextTypes.DEFAULT_TYPE):
-        """Send evening reminders to all eligible users"""
-        try:
-            db = SessionLocal()
-            
-            # Get all VIP users with reminders enabled
-            users = db.query(User).filter(
-                User.user_state.in_(["VIP", "SUPER_VIP"]),
-                User.reminder_enabled == True
-            ).all()
-            
-            logger.info(f"Sending evening reminders to {len(users)} users")
-            
-            for user in users:
-                try:
-                    await send_evening_reminder(context, user.id)
-                except Exception as e:
-                    logger.error(f"Failed to send evening reminder to {user.id}: {e}")
-            
-            db.close()
-            logger.info(f"✅ Completed evening reminders for {len(users)} users")
-            
-        except Exception as e:
-            logger.error(f"Error in evening reminder batch: {e}")
-    
     def enable_reminders_for_user(self, user_id: int):
         """Enable daily reminders for a specific user (called when user becomes VIP)"""
         try:
@@ -127,6 +70,8 @@ class DailyReminderScheduler:
             db.commit()
             db.close()
             
+            assign_reminder_buckets(user_ids=[user_id])
+            
             logger.info(f"✅ Enabled daily reminders for user {user_id}")
             return True
             
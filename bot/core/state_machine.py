@@ -55,8 +55,14 @@ class StateManager:
         UserState.CHURNED: {UserState.REGISTERED},  # Re-activation
     }
     
-    def __init__(self):
-        self.session = SessionLocal()
+    def __init__(self, session=None):
+        """
+        Args:
+            session: Existing session to work in (e.g. a UnitOfWork's); committed and
+                closed by its owner. Default: a new session owned by this manager.
+        """
+        self._owns_session = session is None
+        self.session = session or SessionLocal()
     
     def get_user_state(self, user_id: int) -> Tuple[UserState, bool]:
         """
@@ -65,7 +71,7 @@ class StateManager:
         Returns:
             (state, is_legacy) - Tuple of state and whether it's from legacy logic
         """
-        user = self.session.query(User).filter(User.id == user_id).first()
+        user = self.session.get(User, user_id)  # Identity map: one SELECT per session
         
         if not user:
             return (UserState.VISITOR, False)
@@ -117,7 +123,7 @@ class StateManager:
         Returns:
             (success, message) - Tuple of success status and message
         """
-        user = self.session.query(User).filter(User.id == user_id).first()
+        user = self.session.get(User, user_id)  # Identity map: one SELECT per session
         
         if not user:
             return (False, "User not found")
@@ -158,7 +164,7 @@ class StateManager:
         Returns:
             New state if changed, None if no change
         """
-        user = self.session.query(User).filter(User.id == user_id).first()
+        user = self.session.get(User, user_id)  # Identity map: one SELECT per session
         
         if not user:
             return None
@@ -196,7 +202,7 @@ class StateManager:
         Returns:
             True if updated successfully, False otherwise
         """
-        user = self.session.query(User).filter(User.id == user_id).first()
+        user = self.session.get(User, user_id)  # Identity map: one SELECT per session
         
         if not user:
             return False
@@ -225,7 +231,7 @@ class StateManager:
             dict with 'action' and 'days_inactive' if action needed, None otherwise
             action can be: 'warn' or 'downgrade'
         """
-        user = self.session.query(User).filter(User.id == user_id).first()
+        user = self.session.get(User, user_id)  # Identity map: one SELECT per session
         
         if not user:
             return None
@@ -311,8 +317,8 @@ class StateManager:
         return display_names.get(state, state.value)
     
     def close(self):
-        """Close database session"""
-        if self.session:
+        """Close database session (only if this manager opened it)"""
+        if self.session and self._owns_session:
             self.session.close()
     
     def __enter__(self):
@@ -3,10 +3,27 @@ Subscription Management - FREE vs PREMIUM tier system
 Core principle: "Give Knowledge (FREE), Sell Time (PREMIUM)"
 """
 from enum import Enum
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time
 from typing import Tuple, Optional
 from loguru import logger
-from bot.utils.database import get_user_by_id, SessionLocal
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from bot.utils.database import get_user_by_id, SessionLocal, User
+
+
+def _save(user):
+    """Persist changes to `user` (users loaded by a UnitOfWork are committed with it)"""
+    session = object_session(user)
+    if session is not None and session.info.get("unit_of_work"):
+        return user
+    db = SessionLocal()
+    try:
+        user = db.merge(user)  # Merge detached object into this session
+        db.commit()
+        return user
+    finally:
+        db.close()
 
 
 class SubscriptionTier(Enum):
@@ -66,10 +83,7 @@ class SubscriptionManager:
                 # Expired premium → auto-downgrade to FREE
                 logger.warning(f"User {user.id} Premium expired, downgrading to FREE")
                 user.subscription_tier = 'FREE'
-                db = SessionLocal()
-                user = db.merge(user)
-                db.commit()
-                db.close()
+                user = _save(user)
                 return SubscriptionTier.FREE
         
         # Check TRIAL status
@@ -80,10 +94,7 @@ class SubscriptionManager:
                 # Expired trial → auto-downgrade to FREE
                 logger.warning(f"User {user.id} Trial expired, downgrading to FREE")
                 user.subscription_tier = 'FREE'
-                db = SessionLocal()
-                user = db.merge(user)
-                db.commit()
-                db.close()
+                user = _save(user)
                 return SubscriptionTier.FREE
         
         return SubscriptionTier.FREE
@@ -105,46 +116,83 @@ class SubscriptionManager:
         # FREE = check daily limit
         today = date.today()
         
-        # Reset counter if new day
+        # Counter from a previous day counts as 0 (increment_message_count resets it in SQL)
         last_reset_date = user.bot_chat_limit_date.date() if user.bot_chat_limit_date else None
-        if last_reset_date != today:
-            user.bot_chat_count = 0
-            user.bot_chat_limit_date = datetime.now()
-            db = SessionLocal()
-            user = db.merge(user)  # Merge user into session
-            db.commit()
-            db.close()
+        messages_today = (user.bot_chat_count or 0) if last_reset_date == today else 0
         
         # Check limit
-        if user.bot_chat_count >= SubscriptionManager.FREE_DAILY_MESSAGES:
-            remaining = SubscriptionManager.FREE_DAILY_MESSAGES - user.bot_chat_count
-            return False, f"⚠️ Bạn đã hết {SubscriptionManager.FREE_DAILY_MESSAGES} tin nhắn hôm nay!\n\nCòn lại: {max(0, remaining)}/{SubscriptionManager.FREE_DAILY_MESSAGES}"
+        if messages_today >= SubscriptionManager.FREE_DAILY_MESSAGES:
+            return False, SubscriptionManager.limit_reached_message()
         
         return True, ""
     
     @staticmethod
-    def increment_message_count(user):
-        """Increment daily message counter for FREE users"""
+    def limit_reached_message() -> str:
+        """Upgrade prompt text for a FREE user who used up today's messages"""
+        limit = SubscriptionManager.FREE_DAILY_MESSAGES
+        return f"⚠️ Bạn đã hết {limit} tin nhắn hôm nay!\n\nCòn lại: 0/{limit}"
+    
+    @staticmethod
+    def increment_message_count(user) -> Optional[int]:
+        """
+        Count one message for FREE users - check and increment in a single UPDATE
+        
+            UPDATE users SET bot_chat_count = CASE WHEN <new day> THEN 1 ELSE bot_chat_count + 1 END, ...
+            WHERE id = :id AND (<new day> OR bot_chat_count < :limit)
+            RETURNING bot_chat_count, bot_chat_limit_date
+        
+        Concurrent updates of the same user can't both take the last free message.
+        Users loaded by a UnitOfWork are counted in its session (committed with it).
+        
+        Returns:
+            Today's count after this message (unchanged for PREMIUM/TRIAL), or None if
+            the daily limit was already used up (e.g. by a concurrent update)
+        """
         tier = SubscriptionManager.get_user_tier(user)
         
-        if tier == SubscriptionTier.FREE:
-            today = date.today()
-            
-            # Reset if new day
-            last_reset_date = user.bot_chat_limit_date.date() if user.bot_chat_limit_date else None
-            if last_reset_date != today:
-                user.bot_chat_count = 1
-                user.bot_chat_limit_date = datetime.now()
+        if tier != SubscriptionTier.FREE:
+            return user.bot_chat_count
+        
+        now = datetime.now()
+        new_day = or_(User.bot_chat_limit_date.is_(None), User.bot_chat_limit_date < datetime.combine(now.date(), time.min))
+        count = func.coalesce(User.bot_chat_count, 0)
+        increment = update(User.__table__).where(
+            User.id == user.id, or_(new_day, count < SubscriptionManager.FREE_DAILY_MESSAGES)
+        ).values(
+            bot_chat_count=case((new_day, 1), else_=count + 1),
+            bot_chat_limit_date=case((new_day, now), else_=User.bot_chat_limit_date)
+        )
+        
+        session = object_session(user)
+        in_unit_of_work = session is not None and session.info.get("unit_of_work")
+        db = session if in_unit_of_work else SessionLocal()
+        try:
+            if db.get_bind().dialect.update_returning:
+                row = db.execute(increment.returning(User.bot_chat_count, User.bot_chat_limit_date)).first()
             else:
-                user.bot_chat_count += 1
-            
-            # Save changes to database
-            db = SessionLocal()
-            user = db.merge(user)  # Merge detached object into this session
-            db.commit()
-            db.close()
-            
-            logger.info(f"User {user.id} message count: {user.bot_chat_count}/{SubscriptionManager.FREE_DAILY_MESSAGES}")
+                updated = db.execute(increment).rowcount
+                row = db.execute(
+                    select(User.bot_chat_count, User.bot_chat_limit_date).where(User.id == user.id)
+                ).first() if updated else None
+            if not in_unit_of_work:
+                db.commit()
+        finally:
+            if not in_unit_of_work:
+                db.close()
+        
+        # Table-level UPDATE bypasses the user cache's ORM hooks: drop the stale entry
+        from bot.services.user_cache import get_user_cache  # user_cache imports bot.utils.database
+        get_user_cache().invalidate(user.id)
+        
+        if row is None:
+            logger.warning(f"User {user.id} message limit already reached")
+            return None
+        
+        # Reflect the stored values without marking the user dirty (no second UPDATE)
+        set_committed_value(user, 'bot_chat_count', row.bot_chat_count)
+        set_committed_value(user, 'bot_chat_limit_date', row.bot_chat_limit_date)
+        logger.info(f"User {user.id} message count: {row.bot_chat_count}/{SubscriptionManager.FREE_DAILY_MESSAGES}")
+        return row.bot_chat_count
     
     @staticmethod
     def can_use_feature(user, feature: str) -> Tuple[bool, str]:
@@ -171,14 +219,13 @@ class SubscriptionManager:
         return True, ""
     
     @staticmethod
-    def start_trial(user, days: int = 7, scheduler=None):
+    def start_trial(user, days: int = 7):
         """
         Start trial period for user
         
         Args:
             user: User object
             days: Trial duration in days (default 7)
-            scheduler: APScheduler instance for scheduling jobs
         """
         now = datetime.utcnow()
         trial_end = now + timedelta(days=days)
@@ -187,22 +234,18 @@ class SubscriptionManager:
         user.trial_ends_at = trial_end
         user.premium_started_at = now  # Track when they first tried premium
         
-        db = SessionLocal()
-        user = db.merge(user)
-        db.commit()
-        db.close()
+        user = _save(user)
         
         logger.info(f"User {user.id} started {days}-day trial (ends {trial_end})")
         
-        # Schedule jobs if scheduler provided
-        if scheduler:
-            # Schedule WOW moment (24h after trial start)
-            from bot.jobs.wow_moment import schedule_wow_moment_job
-            schedule_wow_moment_job(user.id, scheduler)
-            
-            # Schedule Day-6 reminder (24h before trial ends)
-            from bot.jobs.trial_churn_prevention import schedule_trial_reminder_job
-            schedule_trial_reminder_job(user.id, trial_end, scheduler)
+        # Schedule follow-up jobs (persistent job store)
+        # WOW moment (24h after trial start)
+        from bot.jobs.wow_moment import schedule_wow_moment_job
+        schedule_wow_moment_job(user.id)
+        
+        # Day-6 reminder (24h before trial ends)
+        from bot.jobs.trial_churn_prevention import schedule_trial_reminder_job
+        schedule_trial_reminder_job(user.id, trial_end)
     
     @staticmethod
     def upgrade_to_premium(user, months: int = 12):
@@ -221,10 +264,7 @@ class SubscriptionManager:
         user.premium_expires_at = expires
         user.trial_ends_at = None  # Clear trial date
         
-        db = SessionLocal()
-        user = db.merge(user)
-        db.commit()
-        db.close()
+        user = _save(user)
         
         logger.info(f"User {user.id} upgraded to PREMIUM (expires {expires})")
         
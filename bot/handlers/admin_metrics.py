@@ -32,9 +32,9 @@ async def admin_metrics_command(update: Update, context: ContextTypes.DEFAULT_TY
     loading_msg = await update.message.reply_text("⏳ Đang tính toán metrics...")
     
     try:
-        # Get metrics (force fresh calculation)
+        # Latest precomputed snapshot (--refresh recalculates and stores a new one)
         force_refresh = '--refresh' in (context.args or [])
-        metrics = metrics_service.get_all_metrics(force_refresh=force_refresh)
+        metrics = metrics_service.get_dashboard_metrics(force_refresh=force_refresh)
         
         # Format message
         message = metrics_service.format_telegram_message(metrics)
@@ -86,17 +86,30 @@ async def admin_metrics_week_command(update: Update, context: ContextTypes.DEFAU
     
     logger.info(f"📅 Admin {user_id} requested weekly summary")
     
-    # TODO: Implement weekly summary view
-    # For now, redirect to daily view
-    await update.message.reply_text(
-        "📅 <b>Weekly Summary</b>\n\n"
-        "Tính năng này đang được phát triển.\n"
-        "Hiện tại vui lòng xem dashboard hàng ngày với /admin_metrics\n\n"
-        "Hoặc truy cập Google Sheets để xem weekly summary:\n"
-        "https://docs.google.com/spreadsheets/d/1-fruHaSlCKIOpIfU5Qrkns0ze3bx3E-mKUgQ5fUF-Hg/edit",
-        parse_mode="HTML",
-        disable_web_page_preview=True
-    )
+    # Daily history from metrics_snapshots (no user scan)
+    trend = metrics_service.get_trend(days=7)
+    if not trend:
+        await update.message.reply_text(
+            "📅 <b>Weekly Summary</b>\n\n"
+            "Chưa có snapshot nào trong 7 ngày qua.\n"
+            "Dùng /admin_metrics --refresh để tạo snapshot đầu tiên.",
+            parse_mode="HTML"
+        )
+        return
+    
+    status_emoji = {'HEALTHY': '🟢', 'WARNING': '🟡', 'CRITICAL': '🔴'}
+    lines = ["📅 <b>Weekly Summary</b> (snapshot cuối mỗi ngày)", ""]
+    lines.append("<code>Ngày   Giữ30 GD/U VIP7 Conv  AI  Churn</code>")
+    for point in trend:
+        lines.append(
+            f"<code>{point['date'][5:]} "
+            f"{point['free_retention_30day']:>5.1f} {point['free_transactions_per_user']:>4.1f} "
+            f"{point['vip_weekly_active_pct']:>4.0f} {point['vip_premium_conversion_pct']:>4.0f} "
+            f"{point['premium_ai_usage_avg']:>4.1f} {point['premium_churn_90day_pct']:>5.1f}</code> "
+            f"{status_emoji.get(point['overall_status'], '⚪')}"
+        )
+    
+    await update.message.reply_text("\n".join(lines), parse_mode="HTML")
 
 
 async def admin_metrics_export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -59,8 +59,11 @@ async def _handle_callback_internal(update: Update, context: ContextTypes.DEFAUL
         return
     
     # Week 4: Update Super VIP activity tracking
+    # One session for the update; the committed user is cached for the handlers below
     from bot.core.state_machine import StateManager
-    with StateManager() as sm:
+    from bot.services.user_cache import UnitOfWork
+    with UnitOfWork() as uow, StateManager(session=uow.session) as sm:
+        uow.get_user(query.from_user.id)
         sm.update_super_vip_activity(query.from_user.id)
     
     logger.info(f"Callback: {callback_data} from user {query.from_user.id}")
@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 
 # Week 3: Import ProgramManager
 from bot.core.program_manager import ProgramManager, ProgramType
+from bot.services.job_store import get_job_store
 
 
 # Nội dung nurture theo từng ngày
@@ -124,21 +125,16 @@ async def _start_daily_nurture_legacy(user_id: int, context: ContextTypes.DEFAUL
         
         logger.info(f"Using legacy nurture scheduling for user {user_id}")
         
-        # Schedule all 5 days
+        # Schedule all 5 days (rows in scheduled_messages, sent by the job store poller)
+        now = datetime.utcnow()
         for day, data in NURTURE_MESSAGES.items():
-            delay_seconds = data["delay_hours"] * 3600
-            
-            # Schedule the message
-            context.job_queue.run_once(
-                send_nurture_message,
-                delay_seconds,
-                data={
-                    "user_id": user_id,
-                    "day": day,
-                    "title": data["title"],
-                    "content": data["content"]
-                },
-                name=f"nurture_day{day}_user{user_id}"
+            get_job_store().schedule(
+                f"program_{user_id}_{ProgramType.NURTURE_7_DAY.value}_day_{day}",
+                "program_day",
+                now + timedelta(hours=data["delay_hours"]),
+                user_id=user_id,
+                program=ProgramType.NURTURE_7_DAY.value,
+                day=day
             )
         
         logger.info(f"✅ Scheduled 5-day nurture (legacy) for user {user_id}")
@@ -147,16 +143,24 @@ async def _start_daily_nurture_legacy(user_id: int, context: ContextTypes.DEFAUL
         logger.error(f"❌ Error in legacy nurture scheduling for user {user_id}: {e}")
 
 
-async def send_nurture_message(context: ContextTypes.DEFAULT_TYPE):
+async def send_nurture_message(context: ContextTypes.DEFAULT_TYPE, user_id: int = None, day: int = None):
     """
-    Send a single nurture message (called by scheduler)
+    Send a single nurture message
+    
+    Can be called in two ways:
+    1. From ProgramManager: send_nurture_message(context, user_id, day)
+    2. From legacy scheduler: send_nurture_message(context) with job.data
     """
     try:
-        job_data = context.job.data
-        user_id = job_data["user_id"]
-        day = job_data["day"]
-        title = job_data["title"]
-        content = job_data["content"]
+        if user_id is None or day is None:
+            job_data = context.job.data
+            user_id = job_data["user_id"]
+            day = job_data["day"]
+            title = job_data["title"]
+            content = job_data["content"]
+        else:
+            title = NURTURE_MESSAGES[day]["title"]
+            content = NURTURE_MESSAGES[day]["content"]
         
         # Check if user already has 2+ referrals (stop nurture if unlocked)
         from bot.utils.database import get_user_by_id
@@ -222,13 +226,10 @@ async def cancel_remaining_nurture(user_id: int, current_day: int, context: Cont
     Cancel remaining nurture jobs when user unlocks
     """
     try:
-        jobs = context.job_queue.get_jobs_by_name(f"nurture_day*_user{user_id}")
-        for job in jobs:
-            # Extract day number from job name
-            job_day = int(job.name.split("day")[1].split("_")[0])
-            if job_day > current_day:
-                job.schedule_removal()
-                logger.info(f"Cancelled nurture day {job_day} for user {user_id}")
+        # Pending days are rows in scheduled_messages (the current one is already sent)
+        cancelled = get_job_store().cancel(f"program_{user_id}_{ProgramType.NURTURE_7_DAY.value}_")
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} nurture days after day {current_day} for user {user_id}")
     except Exception as e:
         logger.error(f"Error cancelling nurture jobs: {e}")
 
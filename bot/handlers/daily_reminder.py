@@ -93,6 +93,29 @@ def get_streak_message(streak: int) -> str:
         return f"👑 **Streak: {streak} ngày!** BẠN LÀ HUYỀN THOẠI!"
 
 
+def build_morning_reminder(user: User):
+    """Morning reminder (text, keyboard) for a loaded user"""
+    # Get user name
+    name = user.full_name or user.first_name or "bạn"
+    streak = user.streak_count or 0
+    
+    # Generate message
+    streak_message = get_streak_message(streak)
+    message = MORNING_REMINDER_TEMPLATE.format(
+        name=name,
+        streak=streak if streak > 0 else 1,
+        streak_message=streak_message
+    )
+    
+    # Keyboard
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("📝 Mở App ngay", callback_data="reminder_open_app")],
+        [InlineKeyboardButton("⏰ Nhắc tôi tối nay", callback_data="reminder_snooze_evening")],
+        [InlineKeyboardButton("🔕 Tắt nhắc nhở hôm nay", callback_data="reminder_disable_today")]
+    ])
+    return message, keyboard
+
+
 async def send_morning_reminder(context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """Send morning motivation reminder"""
     try:
@@ -103,24 +126,7 @@ async def send_morning_reminder(context: ContextTypes.DEFAULT_TYPE, user_id: int
             db.close()
             return
         
-        # Get user name
-        name = user.full_name or user.first_name or "bạn"
-        streak = user.streak_count or 0
-        
-        # Generate message
-        streak_message = get_streak_message(streak)
-        message = MORNING_REMINDER_TEMPLATE.format(
-            name=name,
-            streak=streak if streak > 0 else 1,
-            streak_message=streak_message
-        )
-        
-        # Keyboard
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("📝 Mở App ngay", callback_data="reminder_open_app")],
-            [InlineKeyboardButton("⏰ Nhắc tôi tối nay", callback_data="reminder_snooze_evening")],
-            [InlineKeyboardButton("🔕 Tắt nhắc nhở hôm nay", callback_data="reminder_disable_today")]
-        ])
+        message, keyboard = build_morning_reminder(user)
         
         # Send message
         await context.bot.send_message(
@@ -135,12 +141,53 @@ async def send_morning_reminder(context: ContextTypes.DEFAULT_TYPE, user_id: int
         db.commit()
         db.close()
         
-        logger.info(f"Sent morning reminder to user {user_id} (streak: {streak})")
+        logger.info(f"Sent morning reminder to user {user_id} (streak: {user.streak_count or 0})")
         
     except Exception as e:
         logger.error(f"Error sending morning reminder to {user_id}: {e}")
 
 
+def _recorded_today(user: User) -> bool:
+    today = datetime.utcnow().date()
+    last_transaction = user.last_transaction_date
+    return bool(last_transaction and last_transaction.date() == today)
+
+
+def build_evening_reminder(user: User):
+    """Evening reminder (text, keyboard) for a loaded user"""
+    # Get user name
+    name = user.full_name or user.first_name or "bạn"
+    streak = user.streak_count or 0
+    
+    # Check if user recorded transaction today
+    recorded_today = _recorded_today(user)
+    
+    if recorded_today:
+        streak_status = f"✅ **Tuyệt vời!** Bạn đã ghi chép hôm nay!\n\n🔥 **Streak: {streak} ngày liên tục!**"
+    else:
+        streak_status = "⚠️ **Chưa ghi chép hôm nay!**\n\nGhi ngay để giữ streak nhé!"
+    
+    # Generate message
+    message = EVENING_REMINDER_TEMPLATE.format(
+        name=name,
+        streak_status=streak_status
+    )
+    
+    # Keyboard
+    if recorded_today:
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📊 Xem báo cáo", callback_data="reminder_view_report")],
+            [InlineKeyboardButton("📝 Ghi thêm", callback_data="reminder_open_app")]
+        ])
+    else:
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("📝 Ghi ngay", callback_data="reminder_open_app")],
+            [InlineKeyboardButton("✅ Đã ghi xong", callback_data="reminder_done")],
+            [InlineKeyboardButton("⏰ Nhắc tôi sau 1h", callback_data="reminder_snooze_1h")]
+        ])
+    return message, keyboard
+
+
 async def send_evening_reminder(context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """Send evening reminder to record transactions"""
     try:
@@ -151,38 +198,7 @@ async def send_evening_reminder(context: ContextTypes.DEFAULT_TYPE, user_id: int
             db.close()
             return
         
-        # Get user name
-        name = user.full_name or user.first_name or "bạn"
-        streak = user.streak_count or 0
-        
-        # Check if user recorded transaction today
-        today = datetime.utcnow().date()
-        last_transaction = user.last_transaction_date
-        recorded_today = last_transaction and last_transaction.date() == today
-        
-        if recorded_today:
-            streak_status = f"✅ **Tuyệt vời!** Bạn đã ghi chép hôm nay!\n\n🔥 **Streak: {streak} ngày liên tục!**"
-        else:
-            streak_status = "⚠️ **Chưa ghi chép hôm nay!**\n\nGhi ngay để giữ streak nhé!"
-        
-        # Generate message
-        message = EVENING_REMINDER_TEMPLATE.format(
-            name=name,
-            streak_status=streak_status
-        )
-        
-        # Keyboard
-        if recorded_today:
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("📊 Xem báo cáo", callback_data="reminder_view_report")],
-                [InlineKeyboardButton("📝 Ghi thêm", callback_data="reminder_open_app")]
-            ])
-        else:
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("📝 Ghi ngay", callback_data="reminder_open_app")],
-                [InlineKeyboardButton("✅ Đã ghi xong", callback_data="reminder_done")],
-                [InlineKeyboardButton("⏰ Nhắc tôi sau 1h", callback_data="reminder_snooze_1h")]
-            ])
+        message, keyboard = build_evening_reminder(user)
         
         # Send message
         await context.bot.send_message(
@@ -197,7 +213,7 @@ async def send_evening_reminder(context: ContextTypes.DEFAULT_TYPE, user_id: int
         db.commit()
         db.close()
         
-        logger.info(f"Sent evening reminder to user {user_id} (recorded_today: {recorded_today})")
+        logger.info(f"Sent evening reminder to user {user_id} (recorded_today: {_recorded_today(user)})")
         
     except Exception as e:
         logger.error(f"Error sending evening reminder to {user_id}: {e}")
@@ -4,74 +4,19 @@ Message Handler - Process user messages with FAQ or AI
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from loguru import logger
-import json
 import html
-from pathlib import Path
 from datetime import datetime
 from bot.middleware.usage_tracker import check_message_limit
+from bot.knowledge.faq_matcher import get_faq_matcher
 from config.settings import settings
 
 
-# Load FAQ data
-FAQ_FILE = Path(__file__).parent.parent / "knowledge" / "faq.json"
-with open(FAQ_FILE, "r", encoding="utf-8") as f:
-    FAQ_DATA = json.load(f)
-
-
 def search_faq(query: str) -> dict:
     """
-    Search FAQ based on keywords matching
-    Returns: {"found": bool, "answer": str, "category": str}
+    Search FAQ by keywords (compiled matcher: diacritic-insensitive, best match by specificity)
+    Returns: {"found": bool, "answer": str, "category": str, "matches": [...]}
     """
-    query_lower = query.lower()
-    
-    # Check default responses first
-    default_responses = FAQ_DATA.get("default_responses", {})
-    
-    # Greeting
-    if any(word in query_lower for word in default_responses.get("greeting", [])):
-        return {
-            "found": True,
-            "answer": default_responses.get("greeting_response"),
-            "category": "greeting"
-        }
-    
-    # Thanks
-    if any(word in query_lower for word in default_responses.get("thanks", [])):
-        return {
-            "found": True,
-            "answer": default_responses.get("thanks_response"),
-            "category": "thanks"
-        }
-    
-    # Goodbye
-    if any(word in query_lower for word in default_responses.get("goodbye", [])):
-        return {
-            "found": True,
-            "answer": default_responses.get("goodbye_response"),
-            "category": "goodbye"
-        }
-    
-    # Search in FAQ categories
-    for category in FAQ_DATA.get("categories", []):
-        for question in category.get("questions", []):
-            keywords = question.get("keywords", [])
-            
-            # Check if any keyword matches
-            if any(keyword.lower() in query_lower for keyword in keywords):
-                return {
-                    "found": True,
-                    "answer": question.get("answer"),
-                    "category": category.get("name"),
-                    "icon": category.get("icon")
-                }
-    
-    # Not found
-    return {
-        "found": False,
-        "answer": None,
-        "category": None
-    }
+    return get_faq_matcher().search(query)
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -98,8 +43,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await handle_admin_rejection_reason(update, context)
         return
     
-    # Check message limit (FREE tier = 5 msg/day)
-    can_send = await check_message_limit(update, context)
+    # Check message limit (FREE tier = 5 msg/day) - user loaded once, counter committed once
+    from bot.services.user_cache import UnitOfWork
+    with UnitOfWork() as uow:
+        can_send = await check_message_limit(update, context, uow)
     if not can_send:
         return  # Middleware already sent upgrade prompt
     
@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 
 # Week 3: Import ProgramManager
 from bot.core.program_manager import ProgramManager, ProgramType
+from bot.services.job_store import get_job_store
 
 
 # 7-Day Onboarding Content with Inline Keyboards
@@ -535,20 +536,16 @@ async def _start_onboarding_journey_legacy(user_id: int, context: ContextTypes.D
         
         for day, message_data in ONBOARDING_MESSAGES.items():
             # Calculate when to send
-            send_time = datetime.now() + timedelta(hours=message_data['delay_hours'])
+            send_time = datetime.utcnow() + timedelta(hours=message_data['delay_hours'])
             
-            # Schedule message with buttons
-            context.job_queue.run_once(
-                send_onboarding_message,
-                when=send_time,
-                data={
-                    'user_id': user_id,
-                    'day': day,
-                    'title': message_data['title'],
-                    'content': message_data['content'],
-                    'buttons': message_data.get('buttons', [])  # Include buttons if available
-                },
-                name=f"onboarding_day_{day}_user_{user_id}"
+            # Persist message (sent by the job store poller)
+            get_job_store().schedule(
+                f"program_{user_id}_{ProgramType.ONBOARDING_7_DAY.value}_day_{day}",
+                "program_day",
+                send_time,
+                user_id=user_id,
+                program=ProgramType.ONBOARDING_7_DAY.value,
+                day=day
             )
             
             logger.info(f"Scheduled onboarding Day {day} for user {user_id} at {send_time}")
@@ -673,9 +670,7 @@ async def stop_onboarding_journey(user_id: int, context: ContextTypes.DEFAULT_TY
     Stop onboarding journey for a user (if they request)
     """
     try:
-        jobs = context.job_queue.get_jobs_by_name(f"onboarding_*_user_{user_id}")
-        for job in jobs:
-            job.schedule_removal()
+        get_job_store().cancel(f"program_{user_id}_{ProgramType.ONBOARDING_7_DAY.value}_")
         
         logger.info(f"Stopped onboarding for user {user_id}")
         return True
@@ -6,6 +6,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, MessageHandler, filters, ApplicationHandlerStop, CallbackQueryHandler
 from bot.utils.database import get_db, User
 from bot.services.sheets_api_client import SheetsAPIClient
+from bot.services.sheets_write_queue import get_sheets_write_queue
+from config.settings import settings
 import re
 import logging
 from datetime import datetime
@@ -887,6 +889,45 @@ async def handle_jar_selection(update: Update, context: ContextTypes.DEFAULT_TYP
     )
 
 
+async def queue_transaction_write(query, user, transaction: dict):
+    """
+    Write-behind path: persist the transaction locally and confirm immediately.
+    The queue batches it with other entries into one addTransactions call.
+    
+    Returns:
+        False if the transaction could not be queued (caller writes directly)
+    """
+    payload = SheetsAPIClient.build_transaction(
+        amount=transaction['amount'],
+        category=transaction['category'],
+        note=transaction['note'],
+        transaction_type=transaction['type'],
+        from_jar=transaction['jar'],
+        from_account=transaction['account'],
+        to_account=""
+    )
+    try:
+        await get_sheets_write_queue().enqueue(user.id, user.spreadsheet_id, user.web_app_url, payload)
+    except Exception as e:
+        logger.error(f"❌ Write-behind enqueue failed, writing directly: {e}")
+        return False
+    
+    await query.edit_message_text(
+        f"✅ **Đã ghi nhận!**\n\n"
+        f"• {transaction['type']}: **{transaction['amount']:,.0f} ₫**\n"
+        f"• Danh mục: {transaction.get('category_icon', '📝')} **{transaction['category']}**\n"
+        f"• Hũ: **{transaction['jar']}** - {get_jar_name(transaction['jar'])}\n"
+        f"• Tài khoản: **{transaction['account']}**\n"
+        f"• Ghi chú: {transaction['note']}\n"
+        f"• Thời gian: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n\n"
+        f"☁️ Đang đồng bộ lên Google Sheets (vài giây).\n"
+        f"💡 Dùng /balance để xem số dư nhé!",
+        parse_mode="Markdown"
+    )
+    logger.info(f"📥 User {user.id} quick record queued: {transaction['type']} {transaction['amount']:,.0f} - {transaction['category']} - {transaction['jar']}")
+    return True
+
+
 async def handle_account_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle account selection and write to sheet"""
     query = update.callback_query
@@ -966,6 +1007,11 @@ async def handle_account_selection(update: Update, context: ContextTypes.DEFAULT
         context.user_data.pop('pending_transaction', None)
         return
     
+    # Write-behind: acknowledge now, batch the Sheets write
+    if settings.SHEETS_WRITE_BEHIND_ENABLED and await queue_transaction_write(query, user, transaction):
+        context.user_data.pop('pending_transaction', None)
+        return
+    
     # Call API to write to sheet
     try:
         # ✅ FIX: Pass user's Web App URL to client
@@ -1058,6 +1104,11 @@ async def handle_confirm_transaction(update: Update, context: ContextTypes.DEFAU
         context.user_data.pop('pending_transaction', None)
         return
     
+    # Write-behind: acknowledge now, batch the Sheets write
+    if settings.SHEETS_WRITE_BEHIND_ENABLED and await queue_transaction_write(query, user, transaction):
+        context.user_data.pop('pending_transaction', None)
+        return
+    
     # Call API to write to sheet
     try:
         # ✅ FIX: Pass user's Web App URL to client
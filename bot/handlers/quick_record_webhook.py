@@ -9,6 +9,7 @@ from loguru import logger
 from bot.core.subscription import SubscriptionManager, SubscriptionTier
 from bot.utils.database import get_user_by_id, SessionLocal
 from bot.services.analytics import Analytics
+from bot.services.http_session import get_http_session
 import re
 import aiohttp
 from datetime import datetime
@@ -158,27 +159,27 @@ async def send_transaction_to_webhook(
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                webhook_url,
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
+        session = get_http_session()
+        async with session.post(
+            webhook_url,
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            
+            if response.status == 200:
+                result = await response.json()
                 
-                if response.status == 200:
-                    result = await response.json()
-                    
-                    if result.get('success'):
-                        logger.info(f"✅ Webhook success for user {user_id}")
-                        return True, result.get('message', 'Success')
-                    else:
-                        error_msg = result.get('error', 'Unknown error')
-                        logger.error(f"❌ Webhook returned error: {error_msg}")
-                        return False, error_msg
+                if result.get('success'):
+                    logger.info(f"✅ Webhook success for user {user_id}")
+                    return True, result.get('message', 'Success')
                 else:
-                    error_msg = f"HTTP {response.status}"
-                    logger.error(f"❌ Webhook HTTP error: {error_msg}")
+                    error_msg = result.get('error', 'Unknown error')
+                    logger.error(f"❌ Webhook returned error: {error_msg}")
                     return False, error_msg
+            else:
+                error_msg = f"HTTP {response.status}"
+                logger.error(f"❌ Webhook HTTP error: {error_msg}")
+                return False, error_msg
     
     except aiohttp.ClientTimeout:
         logger.error(f"❌ Webhook timeout for user {user_id}")
@@ -3,7 +3,9 @@ Streak Tracking System - Theo dõi và cập nhật streak
 Phát hiện khi user ghi giao dịch và update streak
 """
 from loguru import logger
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
+from typing import List
+from sqlalchemy import update
 from bot.utils.database import SessionLocal, User
 from bot.handlers.celebration import check_and_celebrate_milestone
 from bot.handlers.daily_reminder import send_skip_alert
@@ -93,46 +95,56 @@ def record_transaction_event(user_id: int, context=None):
         logger.error(f"Error recording transaction event for user {user_id}: {e}")
 
 
-def check_missed_days():
+def check_missed_days(session_factory=SessionLocal) -> List[int]:
     """
     Check all users for missed recording days
     Run this daily to detect users who need reminders
     
     Should be scheduled to run at 9 PM daily
+    
+    Breaks the streak of VIP users whose last transaction is 2+ days old in
+    one set-based UPDATE (ix_users_streak_check), instead of loading every
+    VIP user into the session.
+    
+    Returns:
+        IDs of users whose streak was reset (for notifications)
     """
+    # Missed 2+ days: last transaction before the start of yesterday
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=1), time.min)
+    criteria = [
+        User.user_state.in_(["VIP", "SUPER_VIP"]),
+        User.reminder_enabled == True,
+        User.last_transaction_date < cutoff,
+        User.streak_count > 0
+    ]
+    
+    db = session_factory()
     try:
-        db = SessionLocal()
-        
-        # Get all active VIP users
-        users = db.query(User).filter(
-            User.user_state.in_(["VIP", "SUPER_VIP"]),
-            User.reminder_enabled == True
-        ).all()
-        
-        today = datetime.utcnow().date()
-        
-        for user in users:
-            if not user.last_transaction_date:
-                continue
-            
-            last_transaction = user.last_transaction_date.date()
-            days_since_last = (today - last_transaction).days
-            
-            # If missed 2+ days and still has streak, break it
-            if days_since_last >= 2 and user.streak_count > 0:
-                logger.warning(
-                    f"User {user.id} missed {days_since_last} days, "
-                    f"breaking streak {user.streak_count}"
+        if db.get_bind().dialect.update_returning:
+            result = db.execute(
+                update(User).where(*criteria).values(streak_count=0).returning(User.id),
+                execution_options={"synchronize_session": False}
+            )
+            broken = [row[0] for row in result]
+        else:
+            broken = [row[0] for row in db.query(User.id).filter(*criteria).with_for_update()]
+            if broken:
+                db.query(User).filter(User.id.in_(broken)).update(
+                    {"streak_count": 0}, synchronize_session=False
                 )
-                user.streak_count = 0
-        
         db.commit()
-        db.close()
         
+        if broken:
+            logger.warning(f"Broke streaks of {len(broken)} users who missed 2+ days")
         logger.info("Completed daily missed days check")
+        return broken
         
     except Exception as e:
+        db.rollback()
         logger.error(f"Error checking missed days: {e}")
+        return []
+    finally:
+        db.close()
 
 
 def get_user_streak_stats(user_id: int) -> dict:
@@ -0,0 +1,46 @@
+"""
+Metrics Snapshot Job - Precompute the admin metrics dashboard
+Every METRICS_SNAPSHOT_INTERVAL minutes the 6 Phase 2 metrics are calculated
+once and stored in `metrics_snapshots`, so /admin_metrics is a single read
+and every worker/restart sees the same numbers.
+"""
+import asyncio
+from datetime import timedelta
+
+from loguru import logger
+from telegram.ext import ContextTypes
+
+from config.settings import settings
+from bot.services.metrics_service import metrics_service
+
+
+async def refresh_metrics_snapshot_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Repeating job: store a fresh metrics snapshot
+    Skipped when another worker stored one during the last half interval
+    """
+    half_interval = timedelta(minutes=settings.METRICS_SNAPSHOT_INTERVAL / 2)
+    if metrics_service.get_latest_snapshot(max_age=half_interval) is not None:
+        logger.debug("📸 Recent metrics snapshot exists, skipping")
+        return
+
+    try:
+        # The aggregation query is blocking - keep it off the event loop
+        await asyncio.to_thread(metrics_service.refresh_snapshot)
+    except Exception as e:
+        logger.error(f"❌ Metrics snapshot failed: {e}", exc_info=True)
+
+
+def setup_metrics_snapshot_job(application):
+    """
+    Schedule the metrics snapshot refresh
+    First run 1 minute after startup, then every METRICS_SNAPSHOT_INTERVAL minutes
+    """
+    application.job_queue.run_repeating(
+        refresh_metrics_snapshot_job,
+        interval=settings.METRICS_SNAPSHOT_INTERVAL * 60,
+        first=60,
+        name="metrics_snapshot"
+    )
+
+    logger.info(f"✅ Metrics snapshot job scheduled (every {settings.METRICS_SNAPSHOT_INTERVAL} min)")
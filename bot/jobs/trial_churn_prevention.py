@@ -11,6 +11,7 @@ from bot.utils.database import SessionLocal, User
 from bot.core.subscription import SubscriptionManager, SubscriptionTier
 from bot.services.roi_calculator import ROICalculator
 from bot.services.analytics import Analytics
+from bot.services.job_store import get_job_store, register_job_handler
 from loguru import logger
 from config.settings import settings
 
@@ -173,21 +174,29 @@ Gõ /upgrade để xem chi tiết!
             db.close()
 
 
-def schedule_trial_reminder_job(user_id: int, trial_end_date: datetime, scheduler):
+async def _run_trial_day6_reminder(context, user_id: int):
+    await TrialChurnPrevention.send_trial_day6_reminder(user_id)
+
+
+async def _run_trial_ended_notification(context, user_id: int):
+    await TrialChurnPrevention.send_trial_ended_notification(user_id)
+
+
+register_job_handler("trial_day6_reminder", _run_trial_day6_reminder)
+register_job_handler("trial_ended", _run_trial_ended_notification)
+
+
+def schedule_trial_reminder_job(user_id: int, trial_end_date: datetime):
     """Schedule trial day-6 reminder (24h before end)"""
     
     # Calculate reminder time (24h before trial ends)
     reminder_time = trial_end_date - timedelta(hours=24)
     
     # Only schedule if reminder time is in the future
-    if reminder_time > datetime.now():
-        scheduler.add_job(
-            TrialChurnPrevention.send_trial_day6_reminder,
-            'date',
-            run_date=reminder_time,
-            args=[user_id],
-            id=f"trial_reminder_{user_id}_{int(datetime.now().timestamp())}",
-            replace_existing=True
+    if reminder_time > datetime.utcnow():
+        # Persistent: a restart before day 6 no longer drops the reminder
+        get_job_store().schedule(
+            f"trial_reminder_{user_id}", "trial_day6_reminder", reminder_time, user_id=user_id
         )
         
         logger.info(f"Scheduled trial day-6 reminder for user {user_id} at {reminder_time}")
@@ -195,17 +204,12 @@ def schedule_trial_reminder_job(user_id: int, trial_end_date: datetime, schedule
         logger.warning(f"Trial reminder time {reminder_time} is in the past for user {user_id}")
 
 
-def schedule_trial_end_job(user_id: int, trial_end_date: datetime, scheduler):
+def schedule_trial_end_job(user_id: int, trial_end_date: datetime):
     """Schedule trial end notification"""
     
-    if trial_end_date > datetime.now():
-        scheduler.add_job(
-            TrialChurnPrevention.send_trial_ended_notification,
-            'date',
-            run_date=trial_end_date,
-            args=[user_id],
-            id=f"trial_end_{user_id}_{int(datetime.now().timestamp())}",
-            replace_existing=True
+    if trial_end_date > datetime.utcnow():
+        get_job_store().schedule(
+            f"trial_end_{user_id}", "trial_ended", trial_end_date, user_id=user_id
         )
         
         logger.info(f"Scheduled trial end notification for user {user_id} at {trial_end_date}")
@@ -7,58 +7,10 @@ from datetime import datetime, timedelta
 from loguru import logger
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-
-async def check_and_trigger_unlock_offer(context):
-    """
-    Daily job: Check users who are ready for UNLOCK flow
-    Criteria:
-    - Using FREE for 7-10 days
-    - Has logged at least 5 transactions
-    - Not yet connected Telegram
-    - Not yet received UNLOCK offer
-    """
-    from bot.utils.database import SessionLocal, User
-    
-    db = SessionLocal()
-    try:
-        # Find users eligible for UNLOCK offer
-        threshold_date = datetime.utcnow() - timedelta(days=7)
-        max_date = datetime.utcnow() - timedelta(days=10)
-        
-        eligible_users = db.query(User).filter(
-            User.created_at >= max_date,
-            User.created_at <= threshold_date,
-            User.is_free_unlocked == False,  # Not yet unlocked Telegram
-            User.unlock_offered == False,  # Not yet offered
-            User.total_transactions >= 5  # At least 5 transactions logged (use total_transactions)
-        ).all()
-        
-        logger.info(f"Found {len(eligible_users)} users eligible for UNLOCK offer")
-        
-        for user in eligible_users:
-            try:
-                await send_unlock_offer(context, user.user_id)
-                
-                # Mark as offered
-                user.unlock_offered = True
-                user.unlock_offered_at = datetime.utcnow()
-                db.commit()
-                
-                logger.info(f"✅ Sent UNLOCK offer to user {user.user_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to send UNLOCK offer to {user.user_id}: {e}")
-                
-    finally:
-        db.close()
+from bot.services.broadcast import register_broadcast, run_broadcast
 
 
-async def send_unlock_offer(context, user_id: int):
-    """
-    Send UNLOCK offer message to eligible user
-    Calm, natural transition - not a sales pitch
-    """
-    message = """
+UNLOCK_OFFER_MESSAGE = """
 Bạn đã dùng Freedom Wallet được một thời gian.
 
 Nhiều người ở giai đoạn này nhận ra:
@@ -73,18 +25,67 @@ mình có thể kết nối Telegram với Sheet của bạn.
 Bạn sẽ ghi giao dịch ngay trong chat này.
 Khoảng 5 giây.
 """
-    
+
+
+def _unlock_offer_keyboard() -> InlineKeyboardMarkup:
     keyboard = [
         [InlineKeyboardButton("Kết nối Telegram", callback_data="unlock_step2_explain")],
         [InlineKeyboardButton("Hỏi thêm", callback_data="unlock_ask_question")],
         [InlineKeyboardButton("Để sau", callback_data="unlock_skip")]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return InlineKeyboardMarkup(keyboard)
+
+
+def _unlock_offer_broadcast():
+    """
+    broadcast() kwargs for the UNLOCK offer
+    Criteria:
+    - Using FREE for 7-10 days
+    - Has logged at least 5 transactions
+    - Not yet connected Telegram
+    - Not yet received UNLOCK offer
+    """
+    from bot.utils.database import User
+    
+    threshold_date = datetime.utcnow() - timedelta(days=7)
+    max_date = datetime.utcnow() - timedelta(days=10)
     
+    return {
+        "criteria": [
+            User.created_at >= max_date,
+            User.created_at <= threshold_date,
+            User.is_free_unlocked == False,  # Not yet unlocked Telegram
+            User.unlock_offered == False,  # Not yet offered
+            User.total_transactions >= 5  # At least 5 transactions logged (use total_transactions)
+        ],
+        "build_message": lambda user: {"text": UNLOCK_OFFER_MESSAGE, "reply_markup": _unlock_offer_keyboard()},
+        # Mark as offered (same transaction as the broadcast checkpoint)
+        "on_delivered": {"unlock_offered": True, "unlock_offered_at": datetime.utcnow()}
+    }
+
+
+register_broadcast("unlock_offer", _unlock_offer_broadcast)
+
+
+async def check_and_trigger_unlock_offer(context):
+    """
+    Daily job: Send the UNLOCK offer to users who are ready for it
+    Checkpointed per day: a restart resumes the run, a second trigger sends nothing
+    """
+    job_key = f"unlock_offer:{datetime.utcnow().date().isoformat()}"
+    stats = await run_broadcast(context.bot, "unlock_offer", job_key)
+    logger.info(f"✅ UNLOCK offer sent to {stats['sent']}/{stats['total']} eligible users")
+
+
+async def send_unlock_offer(context, user_id: int):
+    """
+    Send UNLOCK offer message to eligible user
+    Calm, natural transition - not a sales pitch
+    """
     await context.bot.send_message(
         chat_id=user_id,
-        text=message,
-        reply_markup=reply_markup
+        text=UNLOCK_OFFER_MESSAGE,
+        reply_markup=_unlock_offer_keyboard()
     )
 
 
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from bot.utils.database import SessionLocal, User
 from bot.core.subscription import SubscriptionManager, SubscriptionTier
 from bot.services.analytics import Analytics
+from bot.services.job_store import get_job_store, register_job_handler
 from loguru import logger
 from config.settings import settings
 
@@ -160,19 +161,17 @@ Nhận: {stats['value']:,} VNĐ/ngày
             db.close()
 
 
-def schedule_wow_moment_job(user_id: int, scheduler):
-    """Schedule 24h WOW moment job"""
-    from datetime import datetime, timedelta
-    
-    run_date = datetime.now() + timedelta(hours=24)
+async def _run_wow_moment(context, user_id: int):
+    await WOWMomentService.send_24h_wow_moment(user_id)
+
+
+register_job_handler("wow_moment", _run_wow_moment)
+
+
+def schedule_wow_moment_job(user_id: int):
+    """Schedule 24h WOW moment job (persistent, survives restarts)"""
+    run_date = datetime.utcnow() + timedelta(hours=24)
     
-    scheduler.add_job(
-        WOWMomentService.send_24h_wow_moment,
-        'date',
-        run_date=run_date,
-        args=[user_id],
-        id=f"wow_moment_{user_id}_{int(datetime.now().timestamp())}",
-        replace_existing=True
-    )
+    get_job_store().schedule(f"wow_moment_{user_id}", "wow_moment", run_date, user_id=user_id)
     
     logger.info(f"Scheduled 24h WOW moment for user {user_id} at {run_date}")
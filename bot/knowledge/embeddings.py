@@ -1,59 +1,276 @@
-import chromadb
-from chromadb.utils import embedding_functions
+"""
+Knowledge Index - Local vector search over faq.json and bot/knowledge/docs
+Pipeline:
+1. chunk_corpus: one chunk per FAQ question, and doc paragraphs packed up to
+   KNOWLEDGE_CHUNK_CHARS characters
+2. VectorIndex.build: embed in batches of KNOWLEDGE_EMBED_BATCH. Chunks whose
+   text (and model) didn't change reuse their stored vector, so a re-index
+   only embeds what changed.
+3. Persist to KNOWLEDGE_INDEX_DIR:
+   - chunks.json: model, dimension, and id / source / hash / text per chunk
+   - vectors.f32: unit-length float32 rows
+4. VectorIndex.load maps vectors.f32 read-only (numpy memmap) once per process.
+   search() is a single matrix-vector product plus a top-k partition.
+
+Embeddings come from the same local sentence-transformers model as the
+response cache (AI_CACHE_MODEL). Without numpy, vectors are read into a float
+array and scored in Python, which is fine for a corpus of a few hundred chunks.
+"""
+import hashlib
+import heapq
+import json
+import os
+import threading
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+
 from config.settings import settings
 
-# This is a placeholder for the real implementation
-# In a real scenario, you would have a more robust embedding generation and storage solution
+try:
+    import numpy as np
+except ImportError:  # Optional: pure-Python scoring
+    np = None
 
-def get_vector_db_client():
-    """
-    Initializes and returns a ChromaDB client.
-    """
-    client = chromadb.Client()
-    return client
+KNOWLEDGE_DIR = Path(__file__).parent
+FAQ_FILE = KNOWLEDGE_DIR / "faq.json"
+DOCS_DIR = KNOWLEDGE_DIR / "docs"
+DOC_SUFFIXES = {".md", ".txt"}
+
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+def _chunk_hash(text: str, model: str) -> str:
+    return hashlib.sha1(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _pack_paragraphs(text: str, chunk_chars: int) -> List[str]:
+    """Blank-line separated paragraphs packed into chunks of at most `chunk_chars`"""
+    chunks: List[str] = []
+    current = ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        while len(paragraph) > chunk_chars:  # Oversized paragraph: hard split
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:chunk_chars])
+            paragraph = paragraph[chunk_chars:]
+        if current and len(current) + 2 + len(paragraph) > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_corpus(
+    faq_path: Path = FAQ_FILE,
+    docs_dir: Path = DOCS_DIR,
+    chunk_chars: int = settings.KNOWLEDGE_CHUNK_CHARS
+) -> List[Dict[str, str]]:
+    """Split the FAQ and docs into chunks: [{"id", "source", "text"}]"""
+    chunks: List[Dict[str, str]] = []
+
+    if faq_path.exists():
+        with open(faq_path, "r", encoding="utf-8") as f:
+            faq = json.load(f)
+        for category in faq.get("categories", []):
+            for position, question in enumerate(category.get("questions", [])):
+                keywords = ", ".join(question.get("keywords", []))
+                chunks.append({
+                    "id": f"faq:{category.get('id')}:{position}",
+                    "source": faq_path.name,
+                    "text": f"{category.get('name')}: {keywords}\n{question.get('answer', '')}",
+                })
+
+    if docs_dir.exists():
+        for path in sorted(p for p in docs_dir.rglob("*") if p.suffix in DOC_SUFFIXES and p.is_file()):
+            relative = path.relative_to(docs_dir).as_posix()
+            for position, text in enumerate(_pack_paragraphs(path.read_text(encoding="utf-8"), chunk_chars)):
+                chunks.append({"id": f"doc:{relative}:{position}", "source": relative, "text": text})
+
+    return chunks
+
+
+class VectorIndex:
+    """On-disk chunk vectors (float32 rows + JSON metadata), loaded once and searched in memory"""
+
+    def __init__(
+        self,
+        index_dir: Path = Path(settings.KNOWLEDGE_INDEX_DIR),
+        embed: Optional[Embedder] = None,
+        model: str = settings.AI_CACHE_MODEL,
+        batch_size: int = settings.KNOWLEDGE_EMBED_BATCH
+    ):
+        self.index_dir = Path(index_dir)
+        self.embed = embed
+        self.model = model
+        self.batch_size = batch_size
+        self.chunks: List[Dict[str, str]] = []
+        self.dim = 0
+        self._vectors = None  # numpy memmap (n, dim) or a flat float array
+
+    @property
+    def metadata_path(self) -> Path:
+        return self.index_dir / "chunks.json"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.index_dir / "vectors.f32"
+
+    def load(self) -> bool:
+        """Load the persisted index; False if missing or incomplete (run build)"""
+        if not self.metadata_path.exists() or not self.vectors_path.exists():
+            return False
+        with open(self.metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        chunks, dim = metadata["chunks"], metadata["dim"]
+        if self.vectors_path.stat().st_size != len(chunks) * dim * 4:
+            logger.warning(f"Knowledge index at {self.index_dir} is incomplete - rebuild it")
+            return False
+
+        if np is not None and chunks:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(chunks), dim))
+        else:
+            self._vectors = array("f")
+            with open(self.vectors_path, "rb") as f:
+                self._vectors.fromfile(f, len(chunks) * dim)
+        self.chunks, self.dim = chunks, dim
+        self.model = metadata.get("model", self.model)
+        return True
+
+    def _row(self, position: int) -> Sequence[float]:
+        if np is not None and not isinstance(self._vectors, array):
+            return self._vectors[position]
+        return self._vectors[position * self.dim:(position + 1) * self.dim]
 
-def generate_embeddings(docs_path: str):
+    def build(self, chunks: List[Dict[str, str]]) -> Dict[str, int]:
+        """
+        (Re)index `chunks`, embedding only new or changed ones
+
+        Returns:
+            {"chunks": n, "embedded": n, "reused": n, "removed": n}
+        """
+        previous = {}
+        if self.load():
+            previous = {chunk["hash"]: position for position, chunk in enumerate(self.chunks)}
+
+        records = [dict(chunk, hash=_chunk_hash(chunk["text"], self.model)) for chunk in chunks]
+        vectors: List[Optional[List[float]]] = [
+            list(self._row(previous[record["hash"]])) if record["hash"] in previous else None
+            for record in records
+        ]
+
+        pending = [position for position, vector in enumerate(vectors) if vector is None]
+        if pending and self.embed is None:
+            raise RuntimeError("No embedding model available to index the knowledge base")
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            for position, vector in zip(batch, self.embed([records[p]["text"] for p in batch])):
+                vectors[position] = _unit(vector)
+
+        dim = len(vectors[0]) if vectors else 0
+        self._write(records, vectors, dim)
+        self.load()
+
+        reused = len(records) - len(pending)
+        stats = {
+            "chunks": len(records),
+            "embedded": len(pending),
+            "reused": reused,
+            "removed": len(previous) - reused,
+        }
+        logger.info(f"📚 Knowledge index: {stats}")
+        return stats
+
+    def _write(self, records: List[Dict], vectors: List[List[float]], dim: int):
+        """Write vectors then metadata, each via a temp file + atomic rename"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        flat = array("f")
+        for vector in vectors:
+            flat.extend(vector)
+
+        tmp_vectors = self.vectors_path.with_suffix(".tmp")
+        with open(tmp_vectors, "wb") as f:
+            flat.tofile(f)
+        os.replace(tmp_vectors, self.vectors_path)
+
+        tmp_metadata = self.metadata_path.with_suffix(".tmp")
+        with open(tmp_metadata, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dim": dim, "chunks": records}, f, ensure_ascii=False)
+        os.replace(tmp_metadata, self.metadata_path)
+
+    def search(self, query: str, k: int = settings.KNOWLEDGE_TOP_K) -> List[Dict]:
+        """Top-k chunks by cosine similarity: [{"id", "source", "text", "score"}]"""
+        if not self.chunks or self.embed is None or k <= 0:
+            return []
+        query_vector = _unit(self.embed([query])[0])
+
+        if np is not None and not isinstance(self._vectors, array):
+            scores = self._vectors @ np.asarray(query_vector, dtype=np.float32)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            ranked = sorted(((float(scores[i]), int(i)) for i in top), reverse=True)
+        else:
+            ranked = heapq.nlargest(
+                k, ((sum(a * b for a, b in zip(self._row(i), query_vector)), i) for i in range(len(self.chunks)))
+            )
+
+        return [
+            {
+                "id": self.chunks[position]["id"],
+                "source": self.chunks[position]["source"],
+                "text": self.chunks[position]["text"],
+                "score": round(score, 4),
+            }
+            for score, position in ranked
+        ]
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    values = [float(x) for x in vector]
+    norm = sum(x * x for x in values) ** 0.5 or 1.0
+    return [x / norm for x in values]
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index() -> VectorIndex:
+    """Get the process-wide index (loaded from disk on first use)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            from bot.ai.response_cache import load_sentence_embedder
+            _index = VectorIndex(embed=load_sentence_embedder(settings.AI_CACHE_MODEL))
+            if _index.load():
+                logger.info(f"✅ Knowledge index loaded ({len(_index.chunks)} chunks)")
+            else:
+                logger.warning("⚠️ Knowledge index not built yet - run: python -m bot.knowledge.embeddings")
+        return _index
+
+
+def generate_embeddings(docs_path: Optional[str] = None) -> Dict[str, int]:
     """
-    Generates embeddings for the documents in the specified path and stores them in ChromaDB.
+    Chunk the FAQ and docs and (re)build the on-disk index incrementally.
     """
-    # This is a placeholder. In a real implementation, you would:
-    # 1. Read the documents from the docs_path
-    # 2. Split the documents into chunks
-    # 3. Generate embeddings for each chunk using a sentence transformer or OpenAI's API
-    # 4. Store the embeddings in ChromaDB
-    
-    print("Generating embeddings (placeholder)...")
-    
-    client = get_vector_db_client()
-    
-    # Example of creating a collection
-    # collection = client.create_collection("freedom_wallet_docs")
-    
-    # Example of adding documents
-    # collection.add(
-    #     documents=["doc1", "doc2", ...],
-    #     metadatas=[{"source": "doc1.txt"}, ...],
-    #     ids=["id1", "id2", ...]
-    # )
-    
-    print("Embeddings generated and stored (placeholder).")
-
-def search_documents(query: str):
+    index = get_knowledge_index()
+    chunks = chunk_corpus(docs_dir=Path(docs_path) if docs_path else DOCS_DIR)
+    return index.build(chunks)
+
+
+def search_documents(query: str, k: int = settings.KNOWLEDGE_TOP_K) -> List[Dict]:
     """
-    Searches for relevant documents in the vector database.
+    Searches for the chunks most relevant to the query.
     """
-    # This is a placeholder. In a real implementation, you would:
-    # 1. Generate an embedding for the query
-    # 2. Query the ChromaDB collection for the most similar documents
-    # 3. Return the content of the most relevant documents
-    
-    print(f"Searching for documents related to: {query} (placeholder)...")
-    
-    # client = get_vector_db_client()
-    # collection = client.get_collection("freedom_wallet_docs")
-    # results = collection.query(
-    #     query_texts=[query],
-    #     n_results=3
-    # )
-    
-    return "Đây là một tài liệu mẫu về " + query
+    return get_knowledge_index().search(query, k)
+
+
+if __name__ == "__main__":
+    print(generate_embeddings())
@@ -0,0 +1,206 @@
+"""
+FAQ Matcher - faq.json compiled into one word trie
+search_faq used to loop over every keyword of every question doing substring
+checks, first match wins. The matcher instead:
+- folds keywords and messages to lowercase, diacritic-free text ("Thêm giao
+  dịch" -> "them giao dich") with one str.translate
+- walks the message's words once against a trie of keyword word sequences,
+  so keywords only match whole words ("hi" no longer matches "chi tiêu").
+  Accents the user typed must agree with the keyword ("rồi" is not "roi"),
+  while unaccented typing matches accented keywords
+- scores each answer by specificity (total length of its distinct matched
+  keywords, then how many matched) and returns all matches, best first
+- recompiles when faq.json changes on disk (checked at most every
+  FAQ_RELOAD_INTERVAL seconds), so FAQ edits go live without a restart
+"""
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from config.settings import settings
+
+FAQ_FILE = Path(__file__).parent / "faq.json"
+
+# default_responses keyword lists and their answers
+DEFAULT_RESPONSES = (
+    ("greeting", "greeting_response"),
+    ("thanks", "thanks_response"),
+    ("goodbye", "goodbye_response"),
+)
+
+
+def _diacritic_table() -> Dict[int, str]:
+    """str.translate table: accented Latin letters (incl. Vietnamese) -> base letter"""
+    table = {ord("đ"): "d", ord("Đ"): "D"}
+    for codepoint in list(range(0x00C0, 0x0250)) + list(range(0x1E00, 0x1F00)):
+        base = unicodedata.normalize("NFD", chr(codepoint))[0]
+        if base != chr(codepoint) and base.isascii():
+            table[codepoint] = base
+    return table
+
+
+_DIACRITICS = _diacritic_table()
+_WORD = re.compile(r"\w+")
+
+# Message token ("quá,") -> its (word, folded word) pairs; tokens repeat across messages
+_token_cache: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+_TOKEN_CACHE_SIZE = 50_000
+
+
+def split_words(text: str) -> List[Tuple[str, str]]:
+    """(word, word without diacritics) for each word of `text`, lowercased and NFC-normalized"""
+    pairs: List[Tuple[str, str]] = []
+    for token in unicodedata.normalize("NFC", text or "").lower().split():
+        parts = _token_cache.get(token)
+        if parts is None:
+            parts = tuple((word, word.translate(_DIACRITICS)) for word in _WORD.findall(token))
+            if len(_token_cache) >= _TOKEN_CACHE_SIZE:
+                _token_cache.clear()
+            _token_cache[token] = parts
+        pairs.extend(parts)
+    return pairs
+
+
+def _accents_agree(typed: str, plain: str, written: str) -> bool:
+    """Every character the user typed with an accent must match the keyword's"""
+    return typed == plain or typed == written or all(
+        t == p or t == w for t, p, w in zip(typed, plain, written)
+    )
+
+
+class FAQMatcher:
+    """Compiled FAQ search with hot reload of the JSON file"""
+
+    def __init__(
+        self,
+        path: Path = FAQ_FILE,
+        reload_interval: float = settings.FAQ_RELOAD_INTERVAL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = clock()
+        self._compiled = self._compile(self._read())
+
+    def _read(self) -> Dict:
+        self._mtime = os.stat(self.path).st_mtime
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _compile(data: Dict):
+        """(entries, word trie); entries[i] is one answer with its keywords"""
+        entries: List[Dict] = []
+        defaults = data.get("default_responses", {})
+        for name, answer_key in DEFAULT_RESPONSES:
+            entries.append({
+                "keywords": defaults.get(name, []),
+                "result": {"found": True, "answer": defaults.get(answer_key), "category": name},
+            })
+        for category in data.get("categories", []):
+            for question in category.get("questions", []):
+                entries.append({
+                    "keywords": question.get("keywords", []),
+                    "result": {
+                        "found": True,
+                        "answer": question.get("answer"),
+                        "category": category.get("name"),
+                        "icon": category.get("icon"),
+                    },
+                })
+
+        # Word trie over folded keywords: node = (children by folded word, [(entry index, written words)])
+        trie: Dict[str, Tuple[Dict, List]] = {}
+        for index, entry in enumerate(entries):
+            for keyword in entry["keywords"]:
+                pairs = split_words(keyword)
+                if not pairs:
+                    continue
+                children, node = trie, None
+                for _, folded in pairs:
+                    node = children.setdefault(folded, ({}, []))
+                    children = node[0]
+                node[1].append((index, tuple(word for word, _ in pairs)))
+        return entries, trie
+
+    def _maybe_reload(self):
+        now = self.clock()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime == self._mtime:
+                    return
+                self._compiled = self._compile(self._read())
+                logger.info(f"🔄 FAQ reloaded from {self.path.name} ({len(self._compiled[0])} answers)")
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ FAQ reload failed, keeping the previous version: {e}")
+
+    def search(self, query: str) -> Dict:
+        """
+        Best answer for `query` plus every matching answer
+
+        Returns: {"found": bool, "answer": str, "category": str, ["icon": str],
+                  "matches": [{"category", "score", "keywords"}, ...] best first}
+        """
+        self._maybe_reload()
+        entries, trie = self._compiled
+        pairs = split_words(query)
+
+        matched: Dict[int, set] = {}
+        for first in range(len(pairs)):
+            children = trie
+            for position in range(first, len(pairs)):
+                node = children.get(pairs[position][1])
+                if node is None:
+                    break
+                children, owners = node
+                for index, written in owners:
+                    if all(
+                        _accents_agree(*pairs[first + offset], word) for offset, word in enumerate(written)
+                    ):
+                        matched.setdefault(index, set()).add(" ".join(written))
+
+        ranked = sorted(
+            matched.items(),
+            key=lambda item: (-sum(len(k) for k in item[1]), -len(item[1]), item[0])
+        )
+        if not ranked:
+            return {"found": False, "answer": None, "category": None, "matches": []}
+
+        result = dict(entries[ranked[0][0]]["result"])
+        result["matches"] = [
+            {
+                "category": entries[index]["result"]["category"],
+                "score": sum(len(k) for k in keywords),
+                "keywords": sorted(keywords),
+            }
+            for index, keywords in ranked
+        ]
+        return result
+
+
+_matcher: Optional[FAQMatcher] = None
+_matcher_lock = threading.Lock()
+
+
+def get_faq_matcher() -> FAQMatcher:
+    """Get the process-wide FAQ matcher (compiled on first use)"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = FAQMatcher()
+        return _matcher
@@ -10,10 +10,14 @@ from bot.core.subscription import SubscriptionManager, SubscriptionTier
 from bot.services.analytics import Analytics
 
 
-async def check_message_limit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+async def check_message_limit(update: Update, context: ContextTypes.DEFAULT_TYPE, uow=None) -> bool:
     """
     Middleware to check if user can send message
     
+    Args:
+        uow: Optional UnitOfWork of the current update - the user comes from it
+            (cached, no SELECT) and the counter write goes out with its commit
+    
     Returns:
         bool: True if message allowed, False if blocked
     """
@@ -21,7 +25,7 @@ async def check_message_limit(update: Update, context: ContextTypes.DEFAULT_TYPE
         return True  # Allow non-text messages
     
     user_id = update.effective_user.id
-    user = await get_user_by_id(user_id)  # FIX: Added await
+    user = uow.get_user(user_id) if uow else await get_user_by_id(user_id)  # FIX: Added await
     
     if not user:
         # New user, allow first message
@@ -43,8 +47,10 @@ async def check_message_limit(update: Update, context: ContextTypes.DEFAULT_TYPE
         logger.warning(f"User {user_id} hit message limit ({user.bot_chat_count}/{SubscriptionManager.FREE_DAILY_MESSAGES})")
         return False  # Block message
     
-    # Increment message count for FREE users
-    SubscriptionManager.increment_message_count(user)
+    # Increment message count for FREE users (atomic: a concurrent update may have taken the last one)
+    if SubscriptionManager.increment_message_count(user) is None:
+        await send_upgrade_prompt(update, context, SubscriptionManager.limit_reached_message())
+        return False
     
     # Track message sent
     remaining = SubscriptionManager.get_remaining_messages(user)
@@ -125,9 +131,8 @@ async def handle_trial_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
     
-    # Start 7-day trial (pass scheduler for job scheduling)
-    scheduler = context.application.job_queue.scheduler if hasattr(context.application, 'job_queue') else None
-    SubscriptionManager.start_trial(user, days=7, scheduler=scheduler)
+    # Start 7-day trial (schedules its follow-up jobs in the job store)
+    SubscriptionManager.start_trial(user, days=7)
     
     # Track conversion
     Analytics.track_event(user_id, 'trial_started', {
@@ -1,28 +1,46 @@
 """
 Analytics Tracking - Simple event logging for metrics
 Tracks: chat_limit_hit, trial_started, menu clicks, etc.
+
+Events are stored by EventStore (bot/services/event_store.py): buffered
+writes, one JSONL segment per day, SQLite index by event name and user_id.
 """
-import json
+import atexit
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 from loguru import logger
 
+from config.settings import settings
+from bot.services.event_store import EventStore
+from bot.services.analytics_aggregator import EventAggregator
+
 
 class Analytics:
-    """Simple analytics tracker using JSON file logging"""
+    """Simple analytics tracker backed by a segmented, indexed event store"""
     
     ANALYTICS_DIR = Path("data/analytics")
-    ANALYTICS_FILE = ANALYTICS_DIR / "events.jsonl"
+    ANALYTICS_FILE = ANALYTICS_DIR / "events.jsonl"  # Legacy single file (indexed on first start)
+    
+    _store: Optional[EventStore] = None
     
     @staticmethod
     def init():
-        """Initialize analytics directory"""
-        Analytics.ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
-        
-        if not Analytics.ANALYTICS_FILE.exists():
-            Analytics.ANALYTICS_FILE.touch()
-            logger.info(f"Created analytics file: {Analytics.ANALYTICS_FILE}")
+        """Open the event store (once per process)"""
+        if Analytics._store is None:
+            Analytics._store = EventStore(
+                Analytics.ANALYTICS_DIR,
+                flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+                max_buffer=settings.ANALYTICS_MAX_BUFFER,
+                aggregator=EventAggregator()
+            )
+            atexit.register(Analytics._store.close)
+        return Analytics._store
+    
+    @staticmethod
+    def store() -> EventStore:
+        """The process-wide event store"""
+        return Analytics._store or Analytics.init()
     
     @staticmethod
     def track_event(user_id: int, event_name: str, properties: Optional[Dict] = None):
@@ -61,11 +79,12 @@ class Analytics:
         - menu_setup_clicked: User clicked "Setup"
         - menu_support_clicked: User clicked "Hỗ trợ"
         
+        AI EVENTS:
+        - ai_request: GPT call or response cache hit (cache_hit, prompt/completion/cached tokens, latency_ms, tier)
+        
         GENERAL:
         - message_sent: User sends message
         """
-        Analytics.init()
-        
         event = {
             'timestamp': datetime.now().isoformat(),
             'user_id': user_id,
@@ -74,9 +93,8 @@ class Analytics:
         }
         
         try:
-            with open(Analytics.ANALYTICS_FILE, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(event, ensure_ascii=False) + '\n')
-            
+            # Buffered: written to today's segment by the background writer
+            Analytics.store().append(event)
             logger.debug(f"Analytics: {event_name} for user {user_id}")
         
         except Exception as e:
@@ -94,33 +112,14 @@ class Analytics:
         Returns:
             List of events
         """
-        if not Analytics.ANALYTICS_FILE.exists():
-            return []
-        
-        events = []
-        
         try:
-            with open(Analytics.ANALYTICS_FILE, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        event = json.loads(line)
-                        
-                        # Apply filters
-                        if event_name and event.get('event') != event_name:
-                            continue
-                        
-                        if user_id and event.get('user_id') != user_id:
-                            continue
-                        
-                        events.append(event)
-        
+            return Analytics.store().query(event_name=event_name, user_id=user_id)
         except Exception as e:
             logger.error(f"Failed to read events: {e}")
-        
-        return events
+            return []
     
     @staticmethod
-    def get_metric(metric_name: str) -> float:
+    def get_metric(metric_name: str, counts: Optional[Dict[str, int]] = None) -> float:
         """
         Calculate key metrics
         
@@ -128,13 +127,20 @@ class Analytics:
         - trial_conversion: % of chat_limit_hit → trial_started
         - premium_dau: Daily active Premium users
         - recommendation_ctr: % Premium users clicking "Gợi ý"
+        
+        Args:
+            counts: Precomputed {event: count} (default: all-time counters)
         """
-        events = Analytics.get_events()
+        if counts is None:
+            counts = Analytics.store().counters()
+        
+        def count(event_name: str) -> int:
+            return counts.get(event_name, 0)
         
         if metric_name == 'trial_conversion':
             # Calculate: trial_started / chat_limit_hit
-            limit_hits = len([e for e in events if e['event'] == 'chat_limit_hit'])
-            trial_starts = len([e for e in events if e['event'] == 'trial_started'])
+            limit_hits = count('chat_limit_hit')
+            trial_starts = count('trial_started')
             
             if limit_hits == 0:
                 return 0.0
@@ -144,40 +150,48 @@ class Analytics:
         elif metric_name == 'recommendation_ctr':
             # Calculate: recommendation_clicked / premium_users
             # This is simplified - real version would track unique users
-            menu_opens = len([e for e in events if e['event'] == 'premium_menu_opened'])
-            rec_clicks = len([e for e in events if e['event'] == 'recommendation_clicked'])
+            menu_opens = count('premium_menu_opened')
+            rec_clicks = count('recommendation_clicked')
             
             if menu_opens == 0:
                 return 0.0
             
             return (rec_clicks / menu_opens) * 100
         
+        elif metric_name == 'premium_dau':
+            # Distinct Premium users who sent a message today (HyperLogLog estimate)
+            today = datetime.now().strftime('%Y-%m-%d')
+            return float(Analytics.get_unique_users('message_sent', day=today, tier='PREMIUM'))
+        
         return 0.0
     
+    @staticmethod
+    def get_unique_users(event_name: str, day: str = '*', tier: str = '*') -> int:
+        """
+        Estimated number of distinct users who triggered an event
+        
+        Args:
+            day: 'YYYY-MM-DD' or '*' for all time
+            tier: Subscription tier (FREE, TRIAL, PREMIUM, ...) or '*'
+        """
+        return Analytics.store().unique_users(event_name, day=day, tier=tier.upper() if tier != '*' else tier)
+    
     @staticmethod
     def get_summary() -> Dict:
         """Get analytics summary"""
-        events = Analytics.get_events()
-        
-        # Count event types
-        event_counts = {}
-        for event in events:
-            event_name = event['event']
-            event_counts[event_name] = event_counts.get(event_name, 0) + 1
+        # Materialized all-time counters: one row per event name
+        event_counts = Analytics.store().counters()
         
         # Calculate key metrics
-        trial_conversion = Analytics.get_metric('trial_conversion')
-        recommendation_ctr = Analytics.get_metric('recommendation_ctr')
+        trial_conversion = Analytics.get_metric('trial_conversion', event_counts)
+        recommendation_ctr = Analytics.get_metric('recommendation_ctr', event_counts)
         
         return {
-            'total_events': len(events),
+            'total_events': sum(event_counts.values()),
             'event_counts': event_counts,
             'metrics': {
                 'trial_conversion': f"{trial_conversion:.1f}%",
-                'recommendation_ctr': f"{recommendation_ctr:.1f}%"
+                'recommendation_ctr': f"{recommendation_ctr:.1f}%",
+                'premium_dau': int(Analytics.get_metric('premium_dau'))
             }
         }
-
-
-# Initialize on import
-Analytics.init()
@@ -0,0 +1,122 @@
+"""
+Analytics Aggregator - Materialized counters maintained as events are flushed
+Every EventStore flush updates, in the same SQLite transaction:
+- event counts per (day, event, tier)
+- HyperLogLog unique-user sketches per (day, event, tier)
+
+Each key is also rolled up into '*' (all days / all tiers), so summaries read
+one row per event name no matter how much history exists.
+"""
+import hashlib
+import math
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+ALL = '*'
+
+
+class HyperLogLog:
+    """Fixed-size unique count estimator (~1.04/sqrt(2^p) relative error)"""
+
+    def __init__(self, precision: int = 10, registers: bytes = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.m)
+
+    def add(self, value) -> None:
+        h = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if rest == 0 else (65 - rest.bit_length())
+        rank = min(rank, 64 - self.precision + 1)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small range: linear counting is exact-ish
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_blob(self) -> bytes:
+        return zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_blob(cls, blob: bytes, precision: int = 10) -> 'HyperLogLog':
+        return cls(precision, zlib.decompress(blob))
+
+
+def _keys(day: str, event_name: str, tier: str) -> List[Tuple[str, str, str]]:
+    """Exact key + roll-ups"""
+    return [(day, event_name, tier), (day, event_name, ALL), (ALL, event_name, tier), (ALL, event_name, ALL)]
+
+
+class EventAggregator:
+    """Counters + unique-user sketches stored next to the event index"""
+
+    def __init__(self, precision: int = 10):
+        self.precision = precision
+
+    def create_schema(self, db):
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS event_counters (
+                day TEXT NOT NULL,
+                event TEXT NOT NULL,
+                tier TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                users BLOB,
+                PRIMARY KEY (day, event, tier)
+            );
+        """)
+
+    def is_empty(self, db) -> bool:
+        return db.execute("SELECT 1 FROM event_counters LIMIT 1").fetchone() is None
+
+    def apply(self, db, events: Iterable[Dict]) -> None:
+        """Fold a batch of events into the counters (caller commits)"""
+        counts = defaultdict(int)
+        users = defaultdict(set)
+        for event in events:
+            tier = str((event.get('properties') or {}).get('tier') or 'UNKNOWN').upper()
+            for key in _keys(event['timestamp'][:10], event['event'], tier):
+                counts[key] += 1
+                if event.get('user_id') is not None:
+                    users[key].add(event['user_id'])
+
+        for key, delta in counts.items():
+            row = db.execute(
+                "SELECT users FROM event_counters WHERE day = ? AND event = ? AND tier = ?", key
+            ).fetchone()
+            sketch = HyperLogLog.from_blob(row[0], self.precision) if row and row[0] else HyperLogLog(self.precision)
+            for user_id in users.get(key, ()):
+                sketch.add(user_id)
+            db.execute(
+                """
+                INSERT INTO event_counters (day, event, tier, count, users) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (day, event, tier) DO UPDATE SET count = count + excluded.count, users = excluded.users
+                """,
+                (*key, delta, sketch.to_blob())
+            )
+
+    def counts(self, db, day: str = ALL, tier: str = ALL) -> Dict[str, int]:
+        """{event: count} for one day/tier (default: all time, all tiers)"""
+        return dict(db.execute(
+            "SELECT event, count FROM event_counters WHERE day = ? AND tier = ?", (day, tier)
+        ).fetchall())
+
+    def unique_users(self, db, event_name: str, day: str = ALL, tier: str = ALL) -> int:
+        """Estimated distinct users for an event"""
+        row = db.execute(
+            "SELECT users FROM event_counters WHERE day = ? AND event = ? AND tier = ?",
+            (day, event_name, tier)
+        ).fetchone()
+        if not row or not row[0]:
+            return 0
+        return HyperLogLog.from_blob(row[0], self.precision).count()
@@ -0,0 +1,417 @@
+"""
+Broadcast Engine - Bulk Telegram messages under the global send limit
+Recipients are streamed from `users` in keyset-paginated chunks (WHERE id > last
+ORDER BY id LIMIT n), so memory stays flat however many users match. Each chunk
+is sent concurrently; every send takes a token from a shared bucket refilled at
+BROADCAST_RATE msg/s (below Telegram's ~30 msg/s), and a RetryAfter pauses the
+whole bucket for the time Telegram asks before the message is retried.
+
+Runs started with a `job_key` are checkpointed in `broadcast_jobs`: the cursor
+(last user id of a finished chunk) and counters are committed with each chunk,
+and every recipient is claimed in `broadcast_deliveries` before the send. A
+restarted process resumes registered broadcasts from the cursor and skips
+claimed users, so nobody gets the same broadcast twice (at most once: a hard
+kill between claim and send drops that message).
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from loguru import logger
+from sqlalchemy.exc import IntegrityError
+from telegram.error import Forbidden, NetworkError, RetryAfter
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, User, BroadcastJob, BroadcastDelivery
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/s, bursts up to `capacity`"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable = asyncio.sleep
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    async def acquire(self):
+        while True:
+            now = self.clock()
+            if now < self._paused_until:
+                await self.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1 - 1e-6:  # Float refill rounding must not leave us 1e-16 short forever
+                self._tokens = max(self._tokens - 1, 0.0)
+                return
+            await self.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (flood control)"""
+        now = self.clock()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class BroadcastEngine:
+    """Stream matching users and send each a message, rate limited"""
+
+    def __init__(
+        self,
+        bot,
+        session_factory: Callable = SessionLocal,
+        rate: float = settings.BROADCAST_RATE,
+        concurrency: int = settings.BROADCAST_CONCURRENCY,
+        chunk_size: int = settings.BROADCAST_CHUNK_SIZE,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable = asyncio.sleep,
+        limiter: Optional[TokenBucket] = None
+    ):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.sleep = sleep
+        # Pass a shared bucket when several broadcasts run at once (the limit is per bot)
+        self.limiter = limiter or TokenBucket(rate, clock=clock, sleep=sleep)
+
+    # ---------- database ----------
+
+    def _load_chunk(self, criteria: List, after_id: int, build_message: Callable) -> List:
+        """Next chunk of (user_id, message kwargs); messages are built while the session is open"""
+        db = self.session_factory()
+        try:
+            users = db.query(User).filter(
+                *criteria, User.id > after_id
+            ).order_by(User.id).limit(self.chunk_size).all()
+            return [(user.id, build_message(user)) for user in users]
+        finally:
+            db.close()
+
+    def _start_job(self, job_key: str, name: str, params: Optional[Dict]) -> Dict:
+        """Get or create the checkpoint row for `job_key`"""
+        db = self.session_factory()
+        try:
+            job = db.query(BroadcastJob).filter(BroadcastJob.key == job_key).first()
+            if job is None:
+                job = BroadcastJob(
+                    key=job_key, name=name, status="RUNNING", cursor=0,
+                    params=json.dumps(params) if params else None
+                )
+                db.add(job)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another worker created it first
+                    db.rollback()
+                    job = db.query(BroadcastJob).filter(BroadcastJob.key == job_key).one()
+            return {"status": job.status, "cursor": job.cursor or 0, "stats": json.loads(job.stats) if job.stats else None}
+        finally:
+            db.close()
+
+    def _claim(self, job_key: str, user_ids: List[int]) -> Set[int]:
+        """Claim recipients before sending; returns the user ids this run may send to"""
+        db = self.session_factory()
+        try:
+            taken = {
+                row.user_id for row in db.query(BroadcastDelivery.user_id).filter(
+                    BroadcastDelivery.job_key == job_key,
+                    BroadcastDelivery.user_id.in_(user_ids)
+                )
+            }
+            claimed = [user_id for user_id in user_ids if user_id not in taken]
+            db.add_all([BroadcastDelivery(job_key=job_key, user_id=user_id, status="SENDING") for user_id in claimed])
+            try:
+                db.commit()
+                return set(claimed)
+            except IntegrityError:
+                db.rollback()
+
+            # Raced with another worker: claim one by one
+            won = set()
+            for user_id in claimed:
+                try:
+                    with db.begin_nested():
+                        db.add(BroadcastDelivery(job_key=job_key, user_id=user_id, status="SENDING"))
+                    won.add(user_id)
+                except IntegrityError:
+                    pass
+            db.commit()
+            return won
+        finally:
+            db.close()
+
+    def _checkpoint(
+        self,
+        job_key: Optional[str],
+        outcomes: Dict[int, str],
+        on_delivered: Optional[Dict],
+        stats: Dict,
+        cursor: Optional[int] = None,
+        unsent: List[int] = ()
+    ):
+        """
+        One transaction per chunk: on_delivered for sent users, delivery statuses,
+        job cursor + counters. `unsent` claims are released (send never started).
+        """
+        sent = [user_id for user_id, outcome in outcomes.items() if outcome == "SENT"]
+        if job_key is None and not (on_delivered and sent):
+            return
+        db = self.session_factory()
+        try:
+            if on_delivered and sent:
+                db.query(User).filter(User.id.in_(sent)).update(on_delivered, synchronize_session=False)
+            if job_key is not None:
+                for outcome in set(outcomes.values()):
+                    db.query(BroadcastDelivery).filter(
+                        BroadcastDelivery.job_key == job_key,
+                        BroadcastDelivery.user_id.in_([u for u, o in outcomes.items() if o == outcome])
+                    ).update({"status": outcome}, synchronize_session=False)
+                if unsent:
+                    db.query(BroadcastDelivery).filter(
+                        BroadcastDelivery.job_key == job_key,
+                        BroadcastDelivery.user_id.in_(unsent)
+                    ).delete(synchronize_session=False)
+                values = {"stats": json.dumps(stats), "updated_at": datetime.utcnow()}
+                if cursor is not None:
+                    values["cursor"] = cursor
+                db.query(BroadcastJob).filter(BroadcastJob.key == job_key).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish_job(self, job_key: str, stats: Dict):
+        """Mark DONE and drop the per-user claims (the DONE row keeps the key idempotent)"""
+        db = self.session_factory()
+        try:
+            db.query(BroadcastJob).filter(BroadcastJob.key == job_key).update({
+                "status": "DONE",
+                "stats": json.dumps(stats),
+                "finished_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }, synchronize_session=False)
+            db.query(BroadcastDelivery).filter(
+                BroadcastDelivery.job_key == job_key
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    # ---------- sending ----------
+
+    async def _send(self, user_id: int, message: Dict, stats: Dict, started: Set[int]) -> str:
+        """Send with retries; returns SENT, BLOCKED or FAILED"""
+        for attempt in range(1, self.max_attempts + 1):
+            await self.limiter.acquire()
+            started.add(user_id)
+            try:
+                await self.bot.send_message(chat_id=user_id, **message)
+                stats["sent"] += 1
+                return "SENT"
+            except RetryAfter as e:
+                # Flood control applies to the whole bot: hold every sender
+                wait = _retry_after_seconds(e)
+                stats["retry_after"] += 1
+                logger.warning(f"⏳ Broadcast flood control: pausing {wait:.0f}s")
+                self.limiter.pause(wait)
+            except Forbidden:
+                stats["blocked"] += 1  # User blocked the bot / deactivated
+                return "BLOCKED"
+            except NetworkError as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Broadcast to {user_id} failed: {e}")
+                    break
+                await self.sleep(2 ** attempt)
+            except Exception as e:
+                logger.error(f"Broadcast to {user_id} failed: {e}")
+                break
+        stats["failed"] += 1
+        return "FAILED"
+
+    async def broadcast(
+        self,
+        name: str,
+        criteria: List,
+        build_message: Callable[[User], Optional[Dict]],
+        on_delivered: Optional[Dict] = None,
+        job_key: Optional[str] = None,
+        job_params: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Send a message to every user matching `criteria`
+
+        Args:
+            name: Label for logs (and the registered broadcast name for resumable runs)
+            criteria: SQLAlchemy filter expressions on User
+            build_message: user -> send_message kwargs (text, parse_mode, reply_markup), None to skip
+            on_delivered: Column values set on users who received the message (one UPDATE per chunk)
+            job_key: Idempotency key; checkpoint the run and resume/skip it if it already exists
+            job_params: Spec kwargs stored with the checkpoint (passed back on resume)
+
+        Returns:
+            {'total', 'sent', 'blocked', 'failed', 'skipped', 'retry_after', 'chunks', 'duration', 'rate'}
+        """
+        stats = {"total": 0, "sent": 0, "blocked": 0, "failed": 0, "skipped": 0, "retry_after": 0, "chunks": 0}
+        last_id = 0
+        if job_key is not None:
+            job = await asyncio.to_thread(self._start_job, job_key, name, job_params)
+            if job["status"] != "RUNNING":
+                logger.info(f"📣 Broadcast {job_key} already {job['status']}, not sending again")
+                return job["stats"] or stats
+            if job["cursor"]:
+                logger.info(f"📣 Resuming broadcast {job_key} after user {job['cursor']}")
+            stats.update(job["stats"] or {})
+            last_id = job["cursor"]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started_at = self.clock()
+        elapsed = stats.get("duration", 0)
+
+        while True:
+            chunk = await asyncio.to_thread(self._load_chunk, criteria, last_id, build_message)
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            stats["chunks"] += 1
+            stats["total"] += len(chunk)
+
+            recipients = [(user_id, message) for user_id, message in chunk if message is not None]
+            stats["skipped"] += len(chunk) - len(recipients)
+            if job_key is not None and recipients:
+                claimed = await asyncio.to_thread(self._claim, job_key, [user_id for user_id, _ in recipients])
+                stats["skipped"] += len(recipients) - len(claimed)
+                recipients = [(user_id, message) for user_id, message in recipients if user_id in claimed]
+
+            outcomes: Dict[int, str] = {}
+            started: Set[int] = set()
+
+            async def send_one(user_id: int, message: Dict):
+                async with semaphore:
+                    outcomes[user_id] = await self._send(user_id, message, stats, started)
+
+            try:
+                await asyncio.gather(*(send_one(user_id, message) for user_id, message in recipients))
+            except asyncio.CancelledError:
+                # Shutdown mid-chunk: record what went out, release claims that were never sent
+                unsent = [user_id for user_id, _ in recipients if user_id not in started]
+                self._checkpoint(job_key, outcomes, on_delivered, stats, unsent=unsent)
+                logger.warning(f"⚠️ Broadcast '{name}' interrupted after user {last_id} chunk ({len(unsent)} released)")
+                raise
+
+            stats["duration"] = round(elapsed + self.clock() - started_at, 2)
+            await asyncio.to_thread(self._checkpoint, job_key, outcomes, on_delivered, stats, last_id)
+
+            if len(chunk) < self.chunk_size:
+                break
+
+        stats["duration"] = round(elapsed + self.clock() - started_at, 2)
+        stats["rate"] = round(stats["sent"] / stats["duration"], 1) if stats["duration"] > 0 else float(stats["sent"])
+        if job_key is not None:
+            await asyncio.to_thread(self._finish_job, job_key, stats)
+        logger.info(
+            f"📣 Broadcast '{name}': {stats['sent']}/{stats['total']} sent, {stats['blocked']} blocked, "
+            f"{stats['failed']} failed, {stats['retry_after']} flood waits in {stats['duration']}s "
+            f"({stats['rate']} msg/s)"
+        )
+        return stats
+
+
+# ---------- resumable broadcasts ----------
+
+# name -> factory returning broadcast() kwargs {criteria, build_message, on_delivered}
+_registry: Dict[str, Callable[..., Dict]] = {}
+_resumed: Set[asyncio.Task] = set()
+
+
+def register_broadcast(name: str, spec: Callable[..., Dict]):
+    """Make a broadcast resumable after restarts (spec(**params) is re-evaluated on resume)"""
+    _registry[name] = spec
+
+
+async def run_broadcast(
+    bot,
+    name: str,
+    job_key: str,
+    session_factory: Callable = SessionLocal,
+    params: Optional[Dict] = None,
+    **engine_options
+) -> Dict:
+    """Run (or resume, or skip if already done) a registered broadcast"""
+    return await BroadcastEngine(bot, session_factory=session_factory, **engine_options).broadcast(
+        name, job_key=job_key, job_params=params, **_registry[name](**(params or {}))
+    )
+
+
+def prune_broadcast_jobs(session_factory: Callable = SessionLocal, older_than: timedelta = timedelta(days=7)) -> int:
+    """Delete finished checkpoints (their keys can no longer be re-triggered)"""
+    db = session_factory()
+    try:
+        deleted = db.query(BroadcastJob).filter(
+            BroadcastJob.status.in_(["DONE", "ABANDONED"]),
+            BroadcastJob.started_at < datetime.utcnow() - older_than
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+async def resume_broadcasts(
+    bot,
+    session_factory: Callable = SessionLocal,
+    max_age: timedelta = timedelta(hours=settings.BROADCAST_RESUME_MAX_AGE),
+    **engine_options
+) -> int:
+    """
+    Continue RUNNING broadcasts left by a previous process (call from post_init)
+    Runs older than max_age are marked ABANDONED instead (an 8 PM reminder is useless at 9 AM)
+
+    Returns:
+        Number of broadcasts resumed
+    """
+    db = session_factory()
+    try:
+        jobs = db.query(BroadcastJob).filter(BroadcastJob.status == "RUNNING").all()
+        resumable = []
+        for job in jobs:
+            if job.started_at < datetime.utcnow() - max_age:
+                job.status = "ABANDONED"
+                job.finished_at = datetime.utcnow()
+                logger.warning(f"⚠️ Broadcast {job.key} abandoned (interrupted {job.updated_at})")
+            elif job.name not in _registry:
+                logger.warning(f"⚠️ Broadcast {job.key}: '{job.name}' is not registered, cannot resume")
+            else:
+                resumable.append((job.name, job.key, json.loads(job.params) if job.params else None))
+        db.commit()
+    finally:
+        db.close()
+
+    for name, key, params in resumable:
+        task = asyncio.ensure_future(run_broadcast(bot, name, key, session_factory, params, **engine_options))
+        _resumed.add(task)
+        task.add_done_callback(_resumed.discard)
+        logger.info(f"📣 Resuming interrupted broadcast {key}")
+    return len(resumable)
@@ -0,0 +1,270 @@
+"""
+Event Store - Buffered, day-segmented analytics log with a SQLite index
+Events are buffered in memory and written by a background thread to one
+JSONL segment per day (`events-YYYY-MM-DD.jsonl`). Every written line is
+indexed in `index.sqlite3` by event name, user_id and day, so queries read
+only the matching lines of the matching segments, and counts never touch
+the segments at all.
+
+The old single `events.jsonl` file is imported once as a legacy segment.
+With an EventAggregator attached, each flush also updates materialized
+counters in the same transaction.
+"""
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+INDEX_FILE = "index.sqlite3"
+LEGACY_FILE = "events.jsonl"
+
+
+class EventStore:
+    """Append-only event log: daily JSONL segments + SQLite index"""
+
+    def __init__(
+        self,
+        base_dir: Path,
+        flush_interval: float = 2.0,
+        max_buffer: int = 500,
+        background: bool = True,
+        aggregator=None
+    ):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.background = background
+        self.aggregator = aggregator  # EventAggregator (materialized counters), optional
+
+        self._buffer: List[Dict] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.RLock()  # Segment files + index
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._db = sqlite3.connect(str(self.base_dir / INDEX_FILE), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                ts TEXT NOT NULL,
+                day TEXT NOT NULL,
+                event TEXT NOT NULL,
+                user_id INTEGER,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_events_event_day ON events (event, day);
+            CREATE INDEX IF NOT EXISTS ix_events_user_day ON events (user_id, day);
+            CREATE TABLE IF NOT EXISTS segments (name TEXT PRIMARY KEY, imported_at TEXT);
+        """)
+        self._import_legacy()
+        if self.aggregator is not None:
+            self.aggregator.create_schema(self._db)
+            self._backfill_aggregates()
+
+    # ---------- writes ----------
+
+    def append(self, event: Dict):
+        """Buffer an event (written within flush_interval seconds)"""
+        with self._buffer_lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.max_buffer
+
+        if self.background:
+            self._ensure_writer()
+            if full:
+                self._wake.set()
+        elif full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered events to their day segments and index them"""
+        with self._write_lock:
+            # Swap under the write lock so a reader's flush() waits for an in-progress write
+            with self._buffer_lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return 0
+
+            by_day = defaultdict(list)
+            for event in events:
+                by_day[event['timestamp'][:10]].append(event)
+
+            rows = []
+            for day, day_events in by_day.items():
+                segment = f"events-{day}.jsonl"
+                with open(self.base_dir / segment, 'ab') as f:
+                    for event in day_events:
+                        offset = f.tell()
+                        f.write((json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8'))
+                        rows.append((event['timestamp'], day, event['event'], event.get('user_id'), segment, offset))
+            self._db.executemany(
+                "INSERT INTO events (ts, day, event, user_id, segment, offset) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            if self.aggregator is not None:
+                self.aggregator.apply(self._db, events)
+            self._db.commit()
+        return len(events)
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush analytics events: {e}")
+
+    def close(self):
+        """Stop the writer thread and flush what is left"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    # ---------- reads ----------
+
+    def query(
+        self,
+        event_name: Optional[str] = None,
+        user_id: Optional[int] = None,
+        since: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Events matching the filters, oldest first
+
+        Args:
+            event_name: Exact event name
+            user_id: User ID
+            since: ISO date/datetime lower bound (inclusive)
+        """
+        self.flush()
+        where, params = self._where(event_name, user_id, since)
+
+        with self._write_lock:
+            locations = self._db.execute(
+                f"SELECT segment, offset FROM events {where} ORDER BY ts, id", params
+            ).fetchall()
+
+        by_segment = defaultdict(list)
+        for segment, offset in locations:
+            by_segment[segment].append(offset)
+
+        events = []
+        for segment, offsets in by_segment.items():
+            try:
+                with open(self.base_dir / segment, 'rb') as f:
+                    for offset in offsets:
+                        f.seek(offset)
+                        events.append(json.loads(f.readline()))
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to read analytics segment {segment}: {e}")
+
+        events.sort(key=lambda e: e.get('timestamp', ''))
+        return events
+
+    def count(self, event_name: Optional[str] = None, user_id: Optional[int] = None, since: Optional[str] = None) -> int:
+        """Number of matching events (index only)"""
+        self.flush()
+        where, params = self._where(event_name, user_id, since)
+        with self._write_lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM events {where}", params).fetchone()[0]
+
+    def count_by_event(self) -> Dict[str, int]:
+        """{event_name: count} in one index query"""
+        self.flush()
+        with self._write_lock:
+            return dict(self._db.execute("SELECT event, COUNT(*) FROM events GROUP BY event").fetchall())
+
+    def counters(self, day: str = '*', tier: str = '*') -> Dict[str, int]:
+        """{event_name: count} from the materialized counters (one row per event)"""
+        self.flush()
+        with self._write_lock:
+            return self.aggregator.counts(self._db, day=day, tier=tier)
+
+    def unique_users(self, event_name: str, day: str = '*', tier: str = '*') -> int:
+        """Estimated distinct users for an event (HyperLogLog)"""
+        self.flush()
+        with self._write_lock:
+            return self.aggregator.unique_users(self._db, event_name, day=day, tier=tier)
+
+    @staticmethod
+    def _where(event_name, user_id, since):
+        clauses, params = [], []
+        if event_name:
+            clauses.append("event = ?")
+            params.append(event_name)
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if since:
+            clauses.append("ts >= ?")
+            params.append(since)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    # ---------- legacy ----------
+
+    def _backfill_aggregates(self, chunk: int = 5000):
+        """Build counters from already indexed events (first start with an aggregator)"""
+        with self._write_lock:
+            if not self.aggregator.is_empty(self._db):
+                return
+            if self._db.execute("SELECT 1 FROM events LIMIT 1").fetchone() is None:
+                return
+
+            events = self.query()
+            for start in range(0, len(events), chunk):
+                self.aggregator.apply(self._db, events[start:start + chunk])
+            self._db.commit()
+        logger.info(f"📊 Analytics counters backfilled from {len(events)} events")
+
+    def _import_legacy(self):
+        """Index the pre-segment events.jsonl in place (once)"""
+        legacy = self.base_dir / LEGACY_FILE
+        if not legacy.exists():
+            return
+        with self._write_lock:
+            if self._db.execute("SELECT 1 FROM segments WHERE name = ?", (LEGACY_FILE,)).fetchone():
+                return
+
+            rows = []
+            with open(legacy, 'rb') as f:
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    ts = event.get('timestamp', '')
+                    rows.append((ts, ts[:10], event.get('event', ''), event.get('user_id'), LEGACY_FILE, offset))
+
+            self._db.executemany(
+                "INSERT INTO events (ts, day, event, user_id, segment, offset) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._db.execute(
+                "INSERT INTO segments (name, imported_at) VALUES (?, ?)",
+                (LEGACY_FILE, datetime.now().isoformat())
+            )
+            self._db.commit()
+        logger.info(f"📊 Indexed {len(rows)} legacy analytics events from {legacy}")
@@ -0,0 +1,90 @@
+"""
+Shared HTTP Session - Process-wide aiohttp connection pool
+Reuses TCP+TLS connections to script.google.com instead of a new handshake per call
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _build_session() -> aiohttp.ClientSession:
+    """Create a pooled session with keep-alive and DNS caching"""
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_POOL_LIMIT,
+        limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+        use_dns_cache=True,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+    )
+    logger.info(
+        f"🔌 HTTP pool created (limit={settings.HTTP_POOL_LIMIT}, "
+        f"per_host={settings.HTTP_POOL_LIMIT_PER_HOST}, dns_ttl={settings.HTTP_DNS_CACHE_TTL}s)"
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Get the shared ClientSession (created lazily on first use)
+
+    Must be called from inside a running event loop. A new session is
+    created if the previous one was closed or belongs to another loop.
+
+    Usage:
+        session = get_http_session()
+        async with session.post(url, json=payload) as response:
+            ...
+    """
+    global _session, _session_loop
+
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        if _session is not None and not _session.closed:
+            _discard_session(_session, _session_loop)
+        _session = _build_session()
+        _session_loop = loop
+    return _session
+
+
+def _discard_session(session: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]):
+    """
+    Release a session created on a different event loop
+
+    It can't be awaited from here: schedule close() on its own loop if that
+    loop is still running, otherwise close the connector's sockets directly.
+    """
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        return
+
+    connector = session.connector
+    if connector is not None and not connector.closed:
+        try:
+            # Sync part of BaseConnector.close(): drops pooled transports and
+            # marks the connector (and therefore the session) closed
+            connector._close()
+        except RuntimeError as e:
+            # Transports of an already-closed loop can't schedule their close
+            logger.debug(f"HTTP connector closed with errors: {e}")
+    logger.debug("🔌 Discarded HTTP session from a previous event loop")
+
+
+async def close_http_session():
+    """Close the shared session and its pooled connections (call on shutdown)"""
+    global _session, _session_loop
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("🔌 HTTP pool closed")
+    _session = None
+    _session_loop = None
@@ -0,0 +1,246 @@
+"""
+Job Store - Persistent one-shot messages (program days, trial reminders, WOW moment)
+Every pending message is a row in `scheduled_messages`; nothing per user lives in
+the JobQueue. One poller job wakes every JOB_STORE_POLL_INTERVAL seconds and
+claims due rows in batches of JOB_STORE_BATCH_SIZE:
+
+    UPDATE scheduled_messages SET status = 'RUNNING'
+    WHERE status = 'PENDING' AND id IN (
+        SELECT id FROM scheduled_messages WHERE status = 'PENDING' AND due_at <= :now
+        ORDER BY due_at LIMIT :batch FOR UPDATE SKIP LOCKED)
+    RETURNING id, key, handler, payload
+
+On PostgreSQL SKIP LOCKED lets several workers claim disjoint batches without
+waiting on each other. SQLite has no row locks (the clause is dropped) but runs
+the statement under its database write lock, which gives the same guarantee.
+So 100k enrolled users cost one repeating job and a range scan on
+(status, due_at) per poll instead of one in-memory job per user per day.
+
+A claimed message runs at most once (a crash mid-send drops it). Messages missed
+by more than JOB_STORE_MISFIRE_GRACE hours (bot down) are expired, not sent late.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select, update
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, ScheduledMessage
+from bot.services.broadcast import TokenBucket
+
+# handler name -> async callable(context, **payload)
+_handlers: Dict[str, Callable] = {}
+
+
+def register_job_handler(name: str, handler: Callable):
+    """Register an async `handler(context, **payload)` that stored messages can name"""
+    _handlers[name] = handler
+
+
+class JobStore:
+    """SQLAlchemy-backed one-shot messages, sent by a single due-queue poller"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        batch_size: int = settings.JOB_STORE_BATCH_SIZE,
+        misfire_grace: timedelta = timedelta(hours=settings.JOB_STORE_MISFIRE_GRACE),
+        clock: Callable[[], datetime] = datetime.utcnow,
+        limiter: Optional[TokenBucket] = None,
+        concurrency: int = settings.BROADCAST_CONCURRENCY
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.misfire_grace = misfire_grace
+        self.clock = clock
+        # Handlers send one message each: stay under the same global rate as broadcasts
+        self.limiter = limiter or TokenBucket(settings.BROADCAST_RATE)
+        self.concurrency = concurrency
+        self._polling = False
+
+    def start(self, job_queue, interval: float = settings.JOB_STORE_POLL_INTERVAL):
+        """Schedule the poller (the only JobQueue job the store needs)"""
+        job_queue.run_repeating(self.poll, interval=interval, first=1, name="job_store_poller")
+        logger.info(f"✅ Job store poller started (every {interval}s, batches of {self.batch_size})")
+
+    def schedule(self, key: str, handler: str, due_at: datetime, **payload) -> int:
+        """
+        Persist a message (replacing a pending one with the same key)
+
+        Args:
+            key: Unique key, e.g. wow_moment_123
+            handler: Registered handler name
+            due_at: UTC time to send
+            **payload: JSON-serializable kwargs for the handler (user_id is also indexed)
+
+        Returns:
+            Row id
+        """
+        db = self.session_factory()
+        try:
+            job = db.query(ScheduledMessage).filter(ScheduledMessage.key == key).first()
+            if job is None:
+                job = ScheduledMessage(key=key)
+                db.add(job)
+            job.handler = handler
+            job.user_id = payload.get("user_id")
+            job.payload = json.dumps(payload)
+            job.due_at = due_at
+            job.status = "PENDING"
+            job.error = None
+            job.claimed_at = None
+            job.finished_at = None
+            db.commit()
+            return job.id
+        finally:
+            db.close()
+
+    def cancel(self, key_prefix: str) -> int:
+        """Cancel pending messages whose key starts with `key_prefix`"""
+        db = self.session_factory()
+        try:
+            cancelled = db.query(ScheduledMessage).filter(
+                ScheduledMessage.status == "PENDING",
+                ScheduledMessage.key.startswith(key_prefix, autoescape=True)
+            ).update(
+                {ScheduledMessage.status: "CANCELLED", ScheduledMessage.finished_at: self.clock()},
+                synchronize_session=False
+            )
+            db.commit()
+            return cancelled
+        finally:
+            db.close()
+
+    def _expire_missed(self) -> int:
+        now = self.clock()
+        db = self.session_factory()
+        try:
+            expired = db.query(ScheduledMessage).filter(
+                ScheduledMessage.status == "PENDING", ScheduledMessage.due_at < now - self.misfire_grace
+            ).update(
+                {ScheduledMessage.status: "EXPIRED", ScheduledMessage.finished_at: now}, synchronize_session=False
+            )
+            db.commit()
+            return expired
+        finally:
+            db.close()
+
+    def claim_due(self) -> List[Tuple[int, str, str, Optional[str]]]:
+        """Claim up to batch_size due messages (PENDING -> RUNNING); returns (id, key, handler, payload)"""
+        now = self.clock()
+        due = select(ScheduledMessage.id).where(
+            ScheduledMessage.status == "PENDING", ScheduledMessage.due_at <= now
+        ).order_by(ScheduledMessage.due_at).limit(self.batch_size).with_for_update(skip_locked=True)
+        columns = (ScheduledMessage.id, ScheduledMessage.key, ScheduledMessage.handler, ScheduledMessage.payload)
+
+        db = self.session_factory()
+        try:
+            if db.get_bind().dialect.update_returning:
+                rows = db.execute(
+                    update(ScheduledMessage)
+                    .where(ScheduledMessage.status == "PENDING", ScheduledMessage.id.in_(due.scalar_subquery()))
+                    .values(status="RUNNING", claimed_at=now)
+                    .returning(*columns),
+                    execution_options={"synchronize_session": False}
+                ).all()
+            else:
+                # Rows stay locked (FOR UPDATE SKIP LOCKED) until the commit below
+                ids = db.execute(due).scalars().all()
+                rows = db.query(*columns).filter(ScheduledMessage.id.in_(ids)).all() if ids else []
+                if ids:
+                    db.query(ScheduledMessage).filter(ScheduledMessage.id.in_(ids)).update(
+                        {ScheduledMessage.status: "RUNNING", ScheduledMessage.claimed_at: now},
+                        synchronize_session=False
+                    )
+            db.commit()
+            return [tuple(row) for row in rows]
+        finally:
+            db.close()
+
+    def _finish(self, outcomes: Dict[int, Optional[str]]):
+        """One UPDATE for the sent messages, one per failure (error text)"""
+        now = self.clock()
+        done = [job_id for job_id, error in outcomes.items() if error is None]
+        db = self.session_factory()
+        try:
+            if done:
+                db.query(ScheduledMessage).filter(ScheduledMessage.id.in_(done)).update(
+                    {ScheduledMessage.status: "DONE", ScheduledMessage.finished_at: now}, synchronize_session=False
+                )
+            for job_id, error in outcomes.items():
+                if error is not None:
+                    db.query(ScheduledMessage).filter(ScheduledMessage.id == job_id).update(
+                        {ScheduledMessage.status: "FAILED", ScheduledMessage.error: error,
+                         ScheduledMessage.finished_at: now},
+                        synchronize_session=False
+                    )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _run(self, context, key: str, handler_name: str, payload: Optional[str]) -> Optional[str]:
+        """Run one claimed message; returns the error text, or None when sent"""
+        handler = _handlers.get(handler_name)
+        if handler is None:
+            logger.error(f"❌ No handler registered for {key} ({handler_name})")
+            return f"Unknown handler: {handler_name}"
+
+        await self.limiter.acquire()
+        try:
+            await handler(context, **json.loads(payload or "{}"))
+            return None
+        except Exception as e:
+            logger.error(f"❌ Scheduled message {key} failed: {e}", exc_info=True)
+            return str(e)
+
+    async def poll(self, context) -> int:
+        """
+        Poller job: claim and send due messages, batch after batch until none are due
+
+        Returns:
+            Number of messages run
+        """
+        if self._polling:
+            return 0  # Previous poll still draining a backlog
+        self._polling = True
+        try:
+            expired = await asyncio.to_thread(self._expire_missed)
+            if expired:
+                logger.warning(f"⚠️ Expired {expired} scheduled messages missed by more than {self.misfire_grace}")
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def run(row):
+                async with semaphore:
+                    return row[0], await self._run(context, *row[1:])
+
+            total = 0
+            while True:
+                batch = await asyncio.to_thread(self.claim_due)
+                if not batch:
+                    break
+                outcomes = dict(await asyncio.gather(*(run(row) for row in batch)))
+                await asyncio.to_thread(self._finish, outcomes)
+                total += len(batch)
+                if len(batch) < self.batch_size:
+                    break
+
+            if total:
+                logger.info(f"📬 Sent {total} scheduled messages")
+            return total
+        finally:
+            self._polling = False
+
+
+_job_store: Optional[JobStore] = None
+
+
+def get_job_store() -> JobStore:
+    """Get the process-wide job store"""
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore()
+    return _job_store
@@ -2,12 +2,18 @@
 Phase 2 Metrics Calculation Service
 Calculates the 6 behavioral metrics for 60-day testing phase
 NO optimization logic - observation only!
+
+A background job (bot/jobs/metrics_snapshot.py) stores the results in
+`metrics_snapshots`; the admin dashboard reads the latest row instead of
+scanning `users`, and the stored history feeds the weekly trend view.
 """
 from datetime import datetime, timedelta
 from sqlalchemy import func, case, and_, or_
 from loguru import logger
-from bot.utils.database import get_db, User
-from typing import Dict, Optional
+from config.settings import settings
+from bot.utils.database import SessionLocal, User, MetricsSnapshot
+from typing import Callable, Dict, List, Optional
+import json
 import time
 
 
@@ -19,7 +25,8 @@ class MetricsCalculationService:
     - PREMIUM: AI usage, 90-day churn
     """
     
-    def __init__(self):
+    def __init__(self, session_factory: Callable = SessionLocal):
+        self.session_factory = session_factory
         self.cache = {}
         self.cache_duration = 600  # 10 minutes cache
     
@@ -48,13 +55,14 @@ class MetricsCalculationService:
         
         logger.info("📊 Calculating fresh metrics...")
         
-        db = next(get_db())
+        db = self.session_factory()
         try:
+            stats = self._aggregate_users(db)
             metrics = {
                 'timestamp': datetime.utcnow(),
-                'free': self._calculate_free_metrics(db),
-                'vip': self._calculate_vip_metrics(db),
-                'premium': self._calculate_premium_metrics(db),
+                'free': self._calculate_free_metrics(stats),
+                'vip': self._calculate_vip_metrics(stats),
+                'premium': self._calculate_premium_metrics(stats),
             }
             
             # Calculate overall status
@@ -69,7 +77,162 @@ class MetricsCalculationService:
         finally:
             db.close()
     
-    def _calculate_free_metrics(self, db) -> Dict:
+    # ---------- snapshots ----------
+    
+    def refresh_snapshot(self) -> Dict:
+        """
+        Calculate fresh metrics and store them as a new snapshot
+        Snapshots older than METRICS_SNAPSHOT_RETENTION_DAYS are pruned
+        """
+        metrics = self.get_all_metrics(force_refresh=True)
+        
+        db = self.session_factory()
+        try:
+            db.add(MetricsSnapshot(
+                captured_at=metrics['timestamp'],
+                overall_status=metrics['overall_status'],
+                free_retention_30day=metrics['free']['retention_30day'],
+                free_transactions_per_user=metrics['free']['transactions_per_user'],
+                vip_weekly_active_pct=metrics['vip']['weekly_active_pct'],
+                vip_premium_conversion_pct=metrics['vip']['premium_conversion_pct'],
+                premium_ai_usage_avg=metrics['premium']['ai_usage_avg'],
+                premium_churn_90day_pct=metrics['premium']['churn_90day_pct'],
+                payload=json.dumps({**metrics, 'timestamp': metrics['timestamp'].isoformat()}, ensure_ascii=False)
+            ))
+            cutoff = datetime.utcnow() - timedelta(days=settings.METRICS_SNAPSHOT_RETENTION_DAYS)
+            db.query(MetricsSnapshot).filter(
+                MetricsSnapshot.captured_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        
+        logger.info(f"📸 Metrics snapshot saved: {metrics['overall_status']}")
+        return metrics
+    
+    def get_latest_snapshot(self, max_age: Optional[timedelta] = None) -> Optional[Dict]:
+        """
+        Latest stored metrics (one indexed read), or None
+        
+        Args:
+            max_age: Ignore snapshots older than this
+        """
+        db = self.session_factory()
+        try:
+            query = db.query(MetricsSnapshot.payload)
+            if max_age is not None:
+                query = query.filter(MetricsSnapshot.captured_at >= datetime.utcnow() - max_age)
+            row = query.order_by(MetricsSnapshot.captured_at.desc()).first()
+        finally:
+            db.close()
+        
+        if row is None:
+            return None
+        metrics = json.loads(row.payload)
+        metrics['timestamp'] = datetime.fromisoformat(metrics['timestamp'])
+        return metrics
+    
+    def get_dashboard_metrics(self, force_refresh: bool = False) -> Dict:
+        """
+        Metrics for /admin_metrics: the latest snapshot, calculated only
+        when forced or when no snapshot exists yet
+        """
+        if not force_refresh:
+            metrics = self.get_latest_snapshot()
+            if metrics is not None:
+                return metrics
+        return self.refresh_snapshot()
+    
+    def get_trend(self, days: int = 7) -> List[Dict]:
+        """
+        Daily history of the 6 headline metrics (last snapshot of each day)
+        
+        Returns:
+            [{'date': 'YYYY-MM-DD', 'overall_status': ..., 'free_retention_30day': ..., ...}, ...] oldest first
+        """
+        since = datetime.utcnow() - timedelta(days=days)
+        columns = [
+            MetricsSnapshot.captured_at,
+            MetricsSnapshot.overall_status,
+            MetricsSnapshot.free_retention_30day,
+            MetricsSnapshot.free_transactions_per_user,
+            MetricsSnapshot.vip_weekly_active_pct,
+            MetricsSnapshot.vip_premium_conversion_pct,
+            MetricsSnapshot.premium_ai_usage_avg,
+            MetricsSnapshot.premium_churn_90day_pct,
+        ]
+        
+        db = self.session_factory()
+        try:
+            rows = db.query(*columns).filter(
+                MetricsSnapshot.captured_at >= since
+            ).order_by(MetricsSnapshot.captured_at).all()
+        finally:
+            db.close()
+        
+        by_day = {}
+        for row in rows:
+            point = dict(row._mapping)
+            point['date'] = point.pop('captured_at').strftime('%Y-%m-%d')
+            by_day[point['date']] = point  # Later snapshots overwrite earlier ones
+        return list(by_day.values())
+    
+    def _aggregate_users(self, db):
+        """
+        All counts/averages behind the 6 metrics in ONE pass over `users`
+        
+        Conditional aggregation (SUM(CASE ...), AVG(CASE ...)) replaces ~20
+        separate COUNT/AVG queries; ix_users_metrics_covering (see
+        migrations/add_metrics_indexes.py) lets SQLite scan the index only.
+        """
+        now = datetime.utcnow()
+        seven_days_ago = now - timedelta(days=7)
+        thirty_days_ago = now - timedelta(days=30)
+        ninety_days_ago = now - timedelta(days=90)
+        
+        free = User.is_free_unlocked == True
+        vip = User.vip_tier.isnot(None)
+        paid = User.subscription_tier.in_(['TRIAL', 'PREMIUM'])
+        active_7d = User.last_active >= seven_days_ago
+        premium_90d = and_(paid, User.premium_started_at <= ninety_days_ago)
+        
+        def count_if(*conditions):
+            return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+        
+        def avg_if(column, *conditions):
+            return func.avg(case((and_(*conditions), column), else_=None))
+        
+        return db.query(
+            # FREE
+            count_if(free).label('free_total'),
+            count_if(free, User.created_at <= thirty_days_ago).label('free_old'),
+            count_if(free, User.created_at <= thirty_days_ago, active_7d).label('free_old_active'),
+            count_if(free, active_7d).label('free_active_7d'),
+            count_if(free, User.created_at >= seven_days_ago).label('free_new_this_week'),
+            avg_if(User.total_transactions, free, User.total_transactions > 0).label('free_avg_transactions'),
+            avg_if(User.referral_count, free).label('free_avg_referrals'),
+            # VIP
+            count_if(vip).label('vip_total'),
+            count_if(vip, active_7d).label('vip_active'),
+            count_if(vip, User.subscription_tier == 'PREMIUM').label('vip_with_premium'),
+            count_if(User.vip_tier == 'RISING_STAR').label('rising_star_count'),
+            count_if(User.vip_tier == 'SUPER_VIP').label('super_vip_count'),
+            count_if(User.vip_tier == 'LEGEND').label('legend_count'),
+            avg_if(User.referral_count, vip).label('vip_avg_referrals'),
+            # PREMIUM
+            avg_if(User.bot_chat_count, paid, User.bot_chat_count > 0).label('premium_avg_ai_usage'),
+            count_if(premium_90d).label('premium_90d_total'),
+            count_if(premium_90d, User.subscription_expires < now).label('premium_90d_churned'),
+            count_if(User.subscription_tier == 'PREMIUM').label('premium_total'),
+            count_if(User.subscription_tier == 'TRIAL').label('trial_total'),
+            count_if(paid, active_7d).label('premium_active_7d'),
+            avg_if(
+                func.julianday(func.coalesce(User.subscription_expires, now)) - func.julianday(User.premium_started_at),
+                User.premium_started_at.isnot(None)
+            ).label('premium_avg_sub_duration'),
+        ).one()
+    
+    def _calculate_free_metrics(self, stats) -> Dict:
         """
         FREE Tier Metrics:
         1. 30-day retention ≥50%
@@ -77,106 +240,42 @@ class MetricsCalculationService:
         """
         # 1. 30-Day Retention
         # Users created 30+ days ago who were active in last 7 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        
-        total_old_users = db.query(User).filter(
-            User.created_at <= thirty_days_ago,
-            User.is_free_unlocked == True
-        ).count()
-        
-        active_old_users = db.query(User).filter(
-            User.created_at <= thirty_days_ago,
-            User.is_free_unlocked == True,
-            User.last_active >= seven_days_ago
-        ).count()
-        
+        total_old_users = stats.free_old
+        active_old_users = stats.free_old_active
         retention_30day = (active_old_users / total_old_users * 100) if total_old_users > 0 else 0
         
         # 2. Transactions per User
-        avg_transactions = db.query(
-            func.avg(User.total_transactions)
-        ).filter(
-            User.is_free_unlocked == True,
-            User.total_transactions > 0
-        ).scalar() or 0
-        
-        # Supporting data
-        total_free_users = db.query(User).filter(User.is_free_unlocked == True).count()
-        active_7d = db.query(User).filter(
-            User.is_free_unlocked == True,
-            User.last_active >= seven_days_ago
-        ).count()
-        
-        new_this_week = db.query(User).filter(
-            User.is_free_unlocked == True,
-            User.created_at >= seven_days_ago
-        ).count()
-        
-        avg_referrals = db.query(
-            func.avg(User.referral_count)
-        ).filter(
-            User.is_free_unlocked == True
-        ).scalar() or 0
+        avg_transactions = stats.free_avg_transactions or 0
+        avg_referrals = stats.free_avg_referrals or 0
         
         return {
             'retention_30day': round(retention_30day, 1),
             'retention_target_met': retention_30day >= 50,
             'transactions_per_user': round(avg_transactions, 1),
             'transactions_target_met': avg_transactions >= 10,
-            'total_users': total_free_users,
-            'active_7d': active_7d,
-            'new_this_week': new_this_week,
+            'total_users': stats.free_total,
+            'active_7d': stats.free_active_7d,
+            'new_this_week': stats.free_new_this_week,
             'avg_referrals': round(avg_referrals, 1),
             'status': '🟢' if (retention_30day >= 50 and avg_transactions >= 10) else '🟡' if (retention_30day >= 45 or avg_transactions >= 9) else '🔴'
         }
     
-    def _calculate_vip_metrics(self, db) -> Dict:
+    def _calculate_vip_metrics(self, stats) -> Dict:
         """
         VIP Tier Metrics:
         3. Weekly active rate ≥70%
         4. Natural Premium conversion ~30% (25-35% OK)
         """
         # 3. Weekly Active Rate
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        
-        total_vip = db.query(User).filter(
-            User.vip_tier.isnot(None)
-        ).count()
-        
-        active_vip = db.query(User).filter(
-            User.vip_tier.isnot(None),
-            User.last_active >= seven_days_ago
-        ).count()
-        
+        total_vip = stats.vip_total
+        active_vip = stats.vip_active
         weekly_active_pct = (active_vip / total_vip * 100) if total_vip > 0 else 0
         
         # 4. Natural Premium Conversion
-        vip_with_premium = db.query(User).filter(
-            User.vip_tier.isnot(None),
-            User.subscription_tier == 'PREMIUM'
-        ).count()
-        
+        vip_with_premium = stats.vip_with_premium
         premium_conversion_pct = (vip_with_premium / total_vip * 100) if total_vip > 0 else 0
         
-        # VIP tier breakdown
-        rising_star_count = db.query(User).filter(
-            User.vip_tier == 'RISING_STAR'
-        ).count()
-        
-        super_vip_count = db.query(User).filter(
-            User.vip_tier == 'SUPER_VIP'
-        ).count()
-        
-        legend_count = db.query(User).filter(
-            User.vip_tier == 'LEGEND'
-        ).count()
-        
-        avg_refs_per_vip = db.query(
-            func.avg(User.referral_count)
-        ).filter(
-            User.vip_tier.isnot(None)
-        ).scalar() or 0
+        avg_refs_per_vip = stats.vip_avg_referrals or 0
         
         return {
             'weekly_active_pct': round(weekly_active_pct, 1),
@@ -186,76 +285,37 @@ class MetricsCalculationService:
             'total_vip': total_vip,
             'active_vip': active_vip,
             'vip_with_premium': vip_with_premium,
-            'rising_star_count': rising_star_count,
-            'super_vip_count': super_vip_count,
-            'legend_count': legend_count,
+            'rising_star_count': stats.rising_star_count,
+            'super_vip_count': stats.super_vip_count,
+            'legend_count': stats.legend_count,
             'avg_refs_per_vip': round(avg_refs_per_vip, 1),
             'status': '🟢' if (weekly_active_pct >= 70 and 25 <= premium_conversion_pct <= 35) else '🟡' if (weekly_active_pct >= 63 or 20 <= premium_conversion_pct <= 40) else '🔴'
         }
     
-    def _calculate_premium_metrics(self, db) -> Dict:
+    def _calculate_premium_metrics(self, stats) -> Dict:
         """
         PREMIUM Tier Metrics:
         5. AI usage ≥10 msg/user
         6. 90-day churn <15%
         """
         # 5. AI Usage per User
-        avg_ai_usage = db.query(
-            func.avg(User.bot_chat_count)
-        ).filter(
-            User.subscription_tier.in_(['TRIAL', 'PREMIUM']),
-            User.bot_chat_count > 0
-        ).scalar() or 0
+        avg_ai_usage = stats.premium_avg_ai_usage or 0
         
         # 6. 90-Day Churn
-        ninety_days_ago = datetime.utcnow() - timedelta(days=90)
-        
-        total_premium_90d = db.query(User).filter(
-            User.premium_started_at <= ninety_days_ago,
-            User.subscription_tier.in_(['TRIAL', 'PREMIUM'])
-        ).count()
-        
-        churned_premium = db.query(User).filter(
-            User.premium_started_at <= ninety_days_ago,
-            User.subscription_tier.in_(['TRIAL', 'PREMIUM']),
-            User.subscription_expires < datetime.utcnow()
-        ).count()
-        
+        total_premium_90d = stats.premium_90d_total
+        churned_premium = stats.premium_90d_churned
         churn_90day_pct = (churned_premium / total_premium_90d * 100) if total_premium_90d > 0 else 0
         
-        # Supporting data
-        total_premium = db.query(User).filter(
-            User.subscription_tier == 'PREMIUM'
-        ).count()
-        
-        trial_users = db.query(User).filter(
-            User.subscription_tier == 'TRIAL'
-        ).count()
-        
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        active_premium_7d = db.query(User).filter(
-            User.subscription_tier.in_(['TRIAL', 'PREMIUM']),
-            User.last_active >= seven_days_ago
-        ).count()
-        
-        # Calculate avg subscription duration
-        avg_sub_duration = db.query(
-            func.avg(
-                func.julianday(func.coalesce(User.subscription_expires, datetime.utcnow())) - 
-                func.julianday(User.premium_started_at)
-            )
-        ).filter(
-            User.premium_started_at.isnot(None)
-        ).scalar() or 0
+        avg_sub_duration = stats.premium_avg_sub_duration or 0
         
         return {
             'ai_usage_avg': round(avg_ai_usage, 1),
             'ai_usage_target_met': avg_ai_usage >= 10,
             'churn_90day_pct': round(churn_90day_pct, 1),
             'churn_target_met': churn_90day_pct < 15,
-            'total_premium': total_premium,
-            'trial_users': trial_users,
-            'active_7d': active_premium_7d,
+            'total_premium': stats.premium_total,
+            'trial_users': stats.trial_total,
+            'active_7d': stats.premium_active_7d,
             'avg_sub_duration_days': round(avg_sub_duration, 0),
             'status': '🟢' if (avg_ai_usage >= 10 and churn_90day_pct < 15) else '🟡' if (avg_ai_usage >= 9 or churn_90day_pct < 17) else '🔴'
         }
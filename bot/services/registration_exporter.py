@@ -0,0 +1,319 @@
+"""
+Registration Exporter - Batched writes to the FreedomWallet_Registrations sheet
+Registrations are persisted to the `pending_registration_exports` outbox and
+flushed on a timer: one column read to find existing users, then at most one
+batch_update (existing rows) and one append_rows (new rows) per flush.
+
+Write requests go through a per-minute rate limiter sized below Google's
+per-user write quota; a 429 puts the batch back with exponential backoff.
+Rows survive restarts (call `restore()` from post_init).
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from gspread.exceptions import APIError
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, PendingRegistrationExport
+
+logger = logging.getLogger(__name__)
+
+USER_ID_COLUMN = 2  # Column B
+
+
+class _WriteRateLimiter:
+    """Sliding one-minute window over write requests"""
+
+    def __init__(self, per_minute: int, clock: Callable[[], float] = time.monotonic, sleep: Callable = asyncio.sleep):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._sent = deque()
+
+    async def acquire(self):
+        while True:
+            now = self.clock()
+            while self._sent and now - self._sent[0] >= 60:
+                self._sent.popleft()
+            if len(self._sent) < self.per_minute:
+                self._sent.append(now)
+                return
+            wait = 60 - (now - self._sent[0])
+            logger.info(f"⏳ Registration export: write quota reached, waiting {wait:.1f}s")
+            await self.sleep(wait)
+
+
+def _is_quota_error(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    return isinstance(error, APIError) and getattr(response, "status_code", None) == 429
+
+
+class RegistrationExporter:
+    """Outbox-backed exporter for registration sheet rows"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        worksheet_factory: Optional[Callable] = None,
+        worksheet_reset: Optional[Callable] = None,
+        batch_window: float = settings.REGISTRATION_EXPORT_BATCH_WINDOW,
+        max_batch: int = settings.REGISTRATION_EXPORT_MAX_BATCH,
+        writes_per_minute: int = settings.REGISTRATION_EXPORT_WRITES_PER_MINUTE,
+        max_attempts: int = settings.REGISTRATION_EXPORT_MAX_ATTEMPTS,
+        retry_base: float = settings.REGISTRATION_EXPORT_RETRY_BASE,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if worksheet_factory is None:
+            from bot.utils.sheets_registration import get_registration_worksheet, reset_registration_worksheet
+            worksheet_factory = get_registration_worksheet
+            worksheet_reset = reset_registration_worksheet
+
+        self.session_factory = session_factory
+        self.worksheet_factory = worksheet_factory
+        self.worksheet_reset = worksheet_reset
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.limiter = _WriteRateLimiter(writes_per_minute, clock=clock)
+
+        self._scheduled: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"enqueued": 0, "flushes": 0, "appended": 0, "updated": 0, "retries": 0, "failed": 0}
+
+    # ---------- enqueue ----------
+
+    async def enqueue(self, user_id: int, row_data: List[str]) -> int:
+        """
+        Persist a registration row and schedule a batched flush
+
+        Returns:
+            Outbox row id
+        """
+        db = self.session_factory()
+        try:
+            row = PendingRegistrationExport(
+                user_id=user_id,
+                row_data=json.dumps(row_data, ensure_ascii=False),
+                status="PENDING",
+                next_attempt_at=datetime.utcnow()
+            )
+            db.add(row)
+            db.commit()
+            row_id = row.id
+        finally:
+            db.close()
+
+        self.stats["enqueued"] += 1
+        self._schedule(self.batch_window)
+        return row_id
+
+    def _schedule(self, delay: float):
+        """One pending flush at a time (later enqueues join it)"""
+        if self._scheduled is not None and not self._scheduled.done():
+            return
+        task = asyncio.ensure_future(self._flush_after(delay))
+        self._scheduled = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_after(self, delay: float):
+        await asyncio.sleep(delay)
+        self._scheduled = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"❌ Registration export flush failed: {e}", exc_info=True)
+
+    # ---------- flush ----------
+
+    def _claim(self) -> List[PendingRegistrationExport]:
+        db = self.session_factory()
+        try:
+            rows = db.query(PendingRegistrationExport).filter(
+                PendingRegistrationExport.status == "PENDING",
+                PendingRegistrationExport.next_attempt_at <= datetime.utcnow()
+            ).order_by(PendingRegistrationExport.id).limit(self.max_batch).all()
+            for row in rows:
+                row.status = "SENDING"
+            db.commit()
+            return rows
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        """
+        Write due rows to the sheet
+
+        Returns:
+            Number of users written (updated + appended)
+        """
+        async with self._flush_lock:
+            rows = self._claim()
+            if not rows:
+                return 0
+
+            # Latest row per user wins (e.g. registered then upgraded within the window)
+            latest: Dict[str, List[str]] = {}
+            for row in rows:
+                latest[str(row.user_id)] = json.loads(row.row_data)
+
+            self.stats["flushes"] += 1
+            try:
+                updated, appended = await self._write(latest)
+            except Exception as e:
+                await self._handle_failure(rows, e)
+                written = 0
+            else:
+                self._delete([r.id for r in rows])
+                self.stats["updated"] += updated
+                self.stats["appended"] += appended
+                written = updated + appended
+                logger.info(f"✅ Registration export: {appended} appended, {updated} updated")
+
+        if self._has_pending():
+            self._schedule(self._next_delay())
+        return written
+
+    async def _write(self, latest: Dict[str, List[str]]):
+        worksheet = await asyncio.to_thread(self.worksheet_factory)
+        if worksheet is None:
+            raise RuntimeError("Registration worksheet unavailable")
+
+        user_ids = await asyncio.to_thread(worksheet.col_values, USER_ID_COLUMN)
+        row_by_user = {uid: n for n, uid in enumerate(user_ids, start=1) if n > 1}
+
+        updates = [
+            {"range": f"A{row_by_user[uid]}:L{row_by_user[uid]}", "values": [data]}
+            for uid, data in latest.items() if uid in row_by_user
+        ]
+        appends = [data for uid, data in latest.items() if uid not in row_by_user]
+
+        if updates:
+            await self.limiter.acquire()
+            await asyncio.to_thread(worksheet.batch_update, updates)
+        if appends:
+            await self.limiter.acquire()
+            await asyncio.to_thread(worksheet.append_rows, appends)
+        return len(updates), len(appends)
+
+    def _delete(self, ids: List[int]):
+        db = self.session_factory()
+        try:
+            db.query(PendingRegistrationExport).filter(
+                PendingRegistrationExport.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _handle_failure(self, rows: List[PendingRegistrationExport], error: Exception):
+        """Back off and retry, or mark FAILED after max_attempts"""
+        quota = _is_quota_error(error)
+        if not quota:
+            # Re-open the spreadsheet next time (token expired, sheet moved, ...)
+            if self.worksheet_reset:
+                self.worksheet_reset()
+
+        db = self.session_factory()
+        try:
+            for row in db.query(PendingRegistrationExport).filter(
+                PendingRegistrationExport.id.in_([r.id for r in rows])
+            ).all():
+                row.attempts = (row.attempts or 0) + 1
+                row.last_error = str(error)[:500]
+                if row.attempts >= self.max_attempts:
+                    row.status = "FAILED"
+                    self.stats["failed"] += 1
+                else:
+                    row.status = "PENDING"
+                    backoff = self.retry_base * (2 ** (row.attempts - 1))
+                    row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+                    self.stats["retries"] += 1
+            db.commit()
+        finally:
+            db.close()
+
+        if quota:
+            logger.warning(f"⚠️ Registration export hit the Sheets write quota, backing off ({len(rows)} rows)")
+        else:
+            logger.warning(f"⚠️ Registration export failed ({len(rows)} rows): {error}")
+
+    def _has_pending(self) -> bool:
+        db = self.session_factory()
+        try:
+            return db.query(PendingRegistrationExport.id).filter(
+                PendingRegistrationExport.status == "PENDING"
+            ).first() is not None
+        finally:
+            db.close()
+
+    def _next_delay(self) -> float:
+        db = self.session_factory()
+        try:
+            row = db.query(PendingRegistrationExport).filter(
+                PendingRegistrationExport.status == "PENDING"
+            ).order_by(PendingRegistrationExport.next_attempt_at).first()
+            if row is None:
+                return self.batch_window
+            due_in = (row.next_attempt_at - datetime.utcnow()).total_seconds()
+            return max(self.batch_window if due_in <= 0 else due_in, 0.0)
+        finally:
+            db.close()
+
+    # ---------- lifecycle ----------
+
+    async def restore(self) -> int:
+        """
+        Re-schedule rows left by a previous run (call from post_init)
+
+        Returns:
+            Number of pending rows
+        """
+        db = self.session_factory()
+        try:
+            db.query(PendingRegistrationExport).filter(
+                PendingRegistrationExport.status == "SENDING"
+            ).update({"status": "PENDING"}, synchronize_session=False)
+            db.commit()
+            count = db.query(PendingRegistrationExport).filter(
+                PendingRegistrationExport.status == "PENDING"
+            ).count()
+        finally:
+            db.close()
+
+        if count:
+            self._schedule(self._next_delay())
+            logger.info(f"📤 Registration export: restored {count} pending row(s)")
+        return count
+
+    async def shutdown(self):
+        """Flush what is due now; the rest stays in the outbox"""
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"❌ Registration export flush on shutdown failed: {e}")
+        if self._scheduled is not None:
+            self._scheduled.cancel()
+            self._scheduled = None
+
+
+_exporter: Optional[RegistrationExporter] = None
+
+
+def get_registration_exporter() -> RegistrationExporter:
+    """Get the process-wide registration exporter"""
+    global _exporter
+
+    if _exporter is None:
+        _exporter = RegistrationExporter()
+    return _exporter
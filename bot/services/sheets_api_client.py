@@ -4,11 +4,15 @@ Gọi API từ Google Sheets Web App đã deploy
 Version 2.0 - Added authentication & caching (Phase 1.5)
 """
 import aiohttp
+import asyncio
 import logging
 import os
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 from datetime import datetime
 
+from bot.services.http_session import get_http_session
+from bot.services.sheets_cache import get_sheets_cache
+
 logger = logging.getLogger(__name__)
 
 # Web App URL - Bot API Handler (Vietnamese sheet support + dd/MM/yyyy date format + Authentication)
@@ -23,9 +27,35 @@ SHEETS_API_KEY = os.getenv("FREEDOM_WALLET_API_KEY", "")
 # Freedom Wallet Template URL for users to copy
 TEMPLATE_URL = "https://docs.google.com/spreadsheets/d/YOUR_TEMPLATE_ID/copy"
 
+# Upstream reads in flight, shared by all clients (single-flight)
+# {(spreadsheet_id, action): Task} - only valid for the loop in _inflight_loop
+_inflight_reads: Dict[Tuple[str, str], asyncio.Task] = {}
+_inflight_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Strong references to every refresh task until it finishes
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+def _get_inflight_reads() -> Dict[Tuple[str, str], asyncio.Task]:
+    """In-flight reads for the running loop (tasks from a previous loop are dropped)"""
+    global _inflight_loop
+
+    loop = asyncio.get_running_loop()
+    if _inflight_loop is not loop:
+        _inflight_reads.clear()
+        _inflight_loop = loop
+    return _inflight_reads
+
+
+def _on_refresh_done(task: asyncio.Task):
+    """Release the task and surface any error from a detached refresh"""
+    _refresh_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background Sheets refresh failed: {task.exception()}")
+
 
 class SheetsAPIClient:
-    """Client to interact with Freedom Wallet API with in-memory caching"""
+    """Client to interact with Freedom Wallet API with shared response caching"""
     
     def __init__(self, spreadsheet_id: str, webapp_url: Optional[str] = None):
         self.spreadsheet_id = spreadsheet_id
@@ -38,35 +68,65 @@ class SheetsAPIClient:
         logger.info(f"   🌐 API URL: {self.api_url[:80]}...")
         logger.info(f"   ✅ Using {'USER' if webapp_url else 'DEFAULT'} URL")
         
-        # Simple in-memory cache (Phase 1.5 optimization)
-        self._cache = {}  # {key: (data, timestamp)}
-        self._cache_ttl = 300  # 5 minutes
+        # Process-wide cache shared by all instances (see sheets_cache.py)
+        self._cache = get_sheets_cache()
         
-    def _get_cache(self, key: str) -> Optional[Dict[str, Any]]:
-        """Get cached data if still valid"""
-        if key in self._cache:
-            data, timestamp = self._cache[key]
-            import time
-            if time.time() - timestamp < self._cache_ttl:
-                logger.debug(f"📦 Cache hit: {key}")
-                return data
-            else:
-                # Cache expired
-                del self._cache[key]
-                logger.debug(f"⏰ Cache expired: {key}")
-        return None
-    
-    def _set_cache(self, key: str, data: Dict[str, Any]):
-        """Store data in cache with timestamp"""
-        import time
-        self._cache[key] = (data, time.time())
-        logger.debug(f"💾 Cached: {key}")
+    async def _set_cache(self, action: str, data: Dict[str, Any]):
+        """Store response for this spreadsheet"""
+        await self._cache.set(self.spreadsheet_id, action, data)
     
-    def _invalidate_cache(self, key: str):
+    async def _invalidate_cache(self, action: str):
         """Remove cached data after write operations"""
-        if key in self._cache:
-            del self._cache[key]
-            logger.debug(f"🗑️ Cache invalidated: {key}")
+        await self._cache.invalidate(self.spreadsheet_id, action)
+        # Detach any refresh started before the write so it can't re-cache old data
+        # (the task itself stays referenced in _refresh_tasks until it finishes)
+        _get_inflight_reads().pop((self.spreadsheet_id, action), None)
+    
+    def _start_refresh(self, action: str) -> asyncio.Task:
+        """Start (or join) the single upstream read for this spreadsheet/action"""
+        inflight = _get_inflight_reads()
+        key = (self.spreadsheet_id, action)
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(action))
+            inflight[key] = task
+            _refresh_tasks.add(task)
+            task.add_done_callback(_on_refresh_done)
+        return task
+    
+    async def _refresh(self, action: str) -> Dict[str, Any]:
+        """Call API and update cache, unless invalidated meanwhile"""
+        inflight = _get_inflight_reads()
+        key = (self.spreadsheet_id, action)
+        this_task = asyncio.current_task()
+        try:
+            result = await self._call_api(action)
+            if result.get('success') and inflight.get(key) is this_task:
+                await self._set_cache(action, result)
+            return result
+        finally:
+            if inflight.get(key) is this_task:
+                del inflight[key]
+    
+    async def _cached_read(self, action: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Stale-while-revalidate read
+        
+        - fresh (< SHEETS_CACHE_TTL): return cached value
+        - stale (< SHEETS_CACHE_MAX_AGE): return cached value, refresh in background
+        - missing/too old: wait for upstream (concurrent callers share one call)
+        """
+        if use_cache:
+            entry = await self._cache.get_entry(self.spreadsheet_id, action)
+            if entry is not None:
+                data, age = entry
+                if age >= self._cache.ttl:
+                    logger.debug(f"🔄 Serving stale {action} ({age:.0f}s), refreshing in background")
+                    self._start_refresh(action)
+                return data
+        
+        # Shield so a cancelled caller doesn't cancel the shared upstream call
+        return await asyncio.shield(self._start_refresh(action))
     
     async def _call_api(self, action: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -94,23 +154,24 @@ class SheetsAPIClient:
         logger.info(f"   📦 Payload keys: {list(payload.keys())}")
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        logger.info(f"📥 API Response SUCCESS: {result.get('success')}, action={action}")
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"API error {response.status}: {error_text[:500]}")
-                        return {
-                            "success": False,
-                            "error": f"HTTP {response.status}: {error_text[:200]}"
-                        }
+            # Shared pooled session - keeps TLS connections to Apps Script alive
+            session = get_http_session()
+            async with session.post(
+                self.api_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    logger.info(f"📥 API Response SUCCESS: {result.get('success')}, action={action}")
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"API error {response.status}: {error_text[:500]}")
+                    return {
+                        "success": False,
+                        "error": f"HTTP {response.status}: {error_text[:200]}"
+                    }
         except aiohttp.ClientError as e:
             logger.error(f"Network error calling API: {e}")
             return {
@@ -135,7 +196,7 @@ class SheetsAPIClient:
     
     async def get_balance(self, use_cache: bool = True) -> Dict[str, Any]:
         """
-        Get balance of all jars and accounts (with caching)
+        Get balance of all jars and accounts (stale-while-revalidate cache)
         
         Args:
             use_cache: If True, return cached data if available (default: True)
@@ -148,21 +209,33 @@ class SheetsAPIClient:
                 "totalBalance": 1234567890
             }
         """
-        # Check cache first
-        if use_cache:
-            cached = self._get_cache('balance')
-            if cached:
-                return cached
-        
-        # Cache miss - call API
-        logger.debug("📡 API call: getBalance")
-        result = await self._call_api("getBalance")
-        
-        # Store in cache if successful
-        if result.get('success'):
-            self._set_cache('balance', result)
+        return await self._cached_read("getBalance", use_cache)
+    
+    @staticmethod
+    def build_transaction(
+        amount: float,
+        category: str,
+        note: str = "",
+        transaction_date: Optional[str] = None,
+        transaction_type: str = "Chi",
+        from_jar: str = "NEC",
+        from_account: str = "Cash",
+        to_account: str = ""
+    ) -> Dict[str, Any]:
+        """Build the transaction payload expected by addTransaction/addTransactions"""
+        if transaction_date is None:
+            transaction_date = datetime.now().strftime("%Y-%m-%d")
         
-        return result
+        return {
+            "date": transaction_date,
+            "type": transaction_type,  # ✅ FIX: Use parameter instead of hardcoded
+            "amount": abs(amount),
+            "category": category,
+            "fromJar": from_jar,
+            "fromAccount": from_account,
+            "toAccount": to_account,
+            "note": note
+        }
     
     async def add_transaction(
         self,
@@ -191,24 +264,17 @@ class SheetsAPIClient:
         Returns:
             {"success": True, "message": "...", "transactionId": "..."}
         """
-        if transaction_date is None:
-            transaction_date = datetime.now().strftime("%Y-%m-%d")
+        transaction = self.build_transaction(
+            amount, category, note, transaction_date,
+            transaction_type, from_jar, from_account, to_account
+        )
         
-        transaction = {
-            "date": transaction_date,
-            "type": transaction_type,  # ✅ FIX: Use parameter instead of hardcoded
-            "amount": abs(amount),
-            "category": category,
-            "fromJar": from_jar,
-            "fromAccount": from_account,
-            "toAccount": to_account,
-            "note": note
-        }
+        result = await self._call_api("addTransaction", {"data": transaction})
         
         # Invalidate balance cache after write
-        self._invalidate_cache('balance')
+        await self._invalidate_cache("getBalance")
         
-        return await self._call_api("addTransaction", {"data": transaction})
+        return result
     
     async def add_transactions(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -220,7 +286,12 @@ class SheetsAPIClient:
         Returns:
             {"success": True, "message": "...", "count": 5}
         """
-        return await self._call_api("addTransactions", {"data": transactions})
+        result = await self._call_api("addTransactions", {"data": transactions})
+        
+        # Invalidate balance cache after write
+        await self._invalidate_cache("getBalance")
+        
+        return result
     
     async def get_recent_transactions(self, limit: int = 10) -> Dict[str, Any]:
         """
@@ -238,9 +309,12 @@ class SheetsAPIClient:
         """
         return await self._call_api("getTransactions", {"data": {"limit": limit}})
     
-    async def get_categories(self) -> Dict[str, Any]:
+    async def get_categories(self, use_cache: bool = True) -> Dict[str, Any]:
         """
-        Get all categories from sheet
+        Get all categories from sheet (stale-while-revalidate cache)
+        
+        Args:
+            use_cache: If True, return cached data if available (default: True)
         
         Returns:
             {
@@ -260,7 +334,7 @@ class SheetsAPIClient:
                 "count": 50
             }
         """
-        return await self._call_api("getCategories")
+        return await self._cached_read("getCategories", use_cache)
 
 
 def extract_spreadsheet_id(url_or_id: str) -> Optional[str]:
@@ -0,0 +1,224 @@
+"""
+Sheets Response Cache - Process-wide cache for Apps Script reads
+Shared by every SheetsAPIClient instance, keyed by (spreadsheet_id, action)
+
+Backends:
+- memory: bounded LRU + TTL (default)
+- redis:  shared across workers, uses settings.REDIS_URL
+
+Entries are "fresh" for `ttl` seconds and kept until `max_age` so callers can
+serve a stale value while refreshing it (stale-while-revalidate).
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySheetsCache:
+    """Bounded LRU cache with per-entry TTL"""
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl: float = 300,
+        max_age: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_age = max(max_age or ttl, ttl)
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_entry(self, spreadsheet_id: str, action: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (response, age in seconds) if younger than max_age, else None"""
+        key = (spreadsheet_id, action)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        data, stored_at = entry
+        age = self._clock() - stored_at
+        if age >= self.max_age:
+            del self._entries[key]
+            self.misses += 1
+            logger.debug(f"⏰ Cache expired: {action}")
+            return None
+
+        self._entries.move_to_end(key)
+        if age < self.ttl:
+            self.hits += 1
+            logger.debug(f"📦 Cache hit: {action}")
+        else:
+            self.stale_hits += 1
+            logger.debug(f"📦 Cache hit (stale {age:.0f}s): {action}")
+        return data, age
+
+    async def set(self, spreadsheet_id: str, action: str, data: Dict[str, Any]):
+        """Store response, evicting the least recently used entry when full"""
+        key = (spreadsheet_id, action)
+        self._entries[key] = (data, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        logger.debug(f"💾 Cached: {action}")
+
+    async def invalidate(self, spreadsheet_id: str, action: Optional[str] = None):
+        """Drop one action (or every action) cached for a spreadsheet"""
+        if action is not None:
+            keys = [(spreadsheet_id, action)]
+        else:
+            keys = [key for key in self._entries if key[0] == spreadsheet_id]
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                logger.debug(f"🗑️ Cache invalidated: {key[1]}")
+
+    async def clear(self):
+        """Drop all entries and reset counters"""
+        self._entries.clear()
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": ((self.hits + self.stale_hits) / total * 100) if total else 0.0,
+        }
+
+
+class RedisSheetsCache:
+    """Redis-backed cache shared across bot processes (max_age handled by Redis)"""
+
+    KEY_PREFIX = "fw:sheets"
+
+    def __init__(
+        self,
+        redis_url: str,
+        ttl: int = 300,
+        max_age: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+        client=None
+    ):
+        self.ttl = ttl
+        self.max_age = max(max_age or ttl, ttl)
+        self._clock = clock
+        if client is None:
+            import redis.asyncio as aioredis
+            client = aioredis.from_url(redis_url, decode_responses=True)
+        self._redis = client
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _key(self, spreadsheet_id: str, action: str) -> str:
+        return f"{self.KEY_PREFIX}:{spreadsheet_id}:{action}"
+
+    async def get_entry(self, spreadsheet_id: str, action: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        try:
+            raw = await self._redis.get(self._key(spreadsheet_id, action))
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            raw = None
+
+        try:
+            entry = json.loads(raw) if raw is not None else None
+            data, age = entry["data"], max(0.0, self._clock() - float(entry["stored_at"]))
+        except (ValueError, TypeError, KeyError):
+            # Missing, corrupt or pre-SWR payload (bare response dict) - treat as a miss
+            data = None
+
+        if data is None:
+            self.misses += 1
+            return None
+
+        if age < self.ttl:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return data, age
+
+    async def set(self, spreadsheet_id: str, action: str, data: Dict[str, Any]):
+        try:
+            await self._redis.set(
+                self._key(spreadsheet_id, action),
+                json.dumps({"data": data, "stored_at": self._clock()}, ensure_ascii=False),
+                ex=self.max_age
+            )
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+
+    async def invalidate(self, spreadsheet_id: str, action: Optional[str] = None):
+        try:
+            if action is not None:
+                await self._redis.delete(self._key(spreadsheet_id, action))
+            else:
+                keys = [k async for k in self._redis.scan_iter(f"{self.KEY_PREFIX}:{spreadsheet_id}:*")]
+                if keys:
+                    await self._redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Redis cache invalidate failed: {e}")
+
+    async def clear(self):
+        try:
+            keys = [k async for k in self._redis.scan_iter(f"{self.KEY_PREFIX}:*")]
+            if keys:
+                await self._redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Redis cache clear failed: {e}")
+        self.hits = self.stale_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.hits + self.stale_hits) / total * 100) if total else 0.0,
+        }
+
+
+_cache = None
+
+
+def get_sheets_cache():
+    """Get the process-wide cache (backend chosen by settings.SHEETS_CACHE_BACKEND)"""
+    global _cache
+
+    if _cache is None:
+        if settings.SHEETS_CACHE_BACKEND == "redis" and settings.REDIS_URL:
+            try:
+                _cache = RedisSheetsCache(
+                    settings.REDIS_URL,
+                    ttl=settings.SHEETS_CACHE_TTL,
+                    max_age=settings.SHEETS_CACHE_MAX_AGE
+                )
+                logger.info("📦 Sheets cache: redis")
+            except ImportError:
+                logger.warning("redis package not installed - falling back to memory cache")
+
+        if _cache is None:
+            _cache = MemorySheetsCache(
+                max_entries=settings.SHEETS_CACHE_MAX_ENTRIES,
+                ttl=settings.SHEETS_CACHE_TTL,
+                max_age=settings.SHEETS_CACHE_MAX_AGE
+            )
+    return _cache
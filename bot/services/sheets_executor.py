@@ -0,0 +1,108 @@
+"""
+Sheets Executor - Run blocking googleapiclient calls off the event loop
+`.execute()` does synchronous HTTP; calling it inside a handler stalls every
+user. Requests are executed in a bounded thread pool, limited globally and
+per spreadsheet.
+
+httplib2 is not thread-safe, so each worker thread gets its own authorized
+Http object instead of sharing the one inside the service.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import google_auth_httplib2
+import httplib2
+from loguru import logger
+
+from config.settings import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_thread_local = threading.local()
+
+# Limits are bound to the running loop (recreated if the loop changes)
+_limits_loop: Optional[asyncio.AbstractEventLoop] = None
+_global_limit: Optional[asyncio.Semaphore] = None
+_sheet_limits: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.SHEETS_EXECUTOR_WORKERS,
+            thread_name_prefix="sheets-api"
+        )
+    return _executor
+
+
+def _get_limits(spreadsheet_id: str):
+    """Global + per-spreadsheet semaphores for the running loop"""
+    global _limits_loop, _global_limit, _sheet_limits
+
+    loop = asyncio.get_running_loop()
+    if _limits_loop is not loop:
+        _limits_loop = loop
+        _global_limit = asyncio.Semaphore(settings.SHEETS_MAX_CONCURRENT)
+        _sheet_limits = weakref.WeakValueDictionary()
+
+    sheet_limit = _sheet_limits.get(spreadsheet_id)
+    if sheet_limit is None:
+        sheet_limit = asyncio.Semaphore(settings.SHEETS_MAX_CONCURRENT_PER_SHEET)
+        _sheet_limits[spreadsheet_id] = sheet_limit
+    return _global_limit, sheet_limit
+
+
+def _thread_http(credentials) -> Optional[httplib2.Http]:
+    """Authorized Http owned by the current worker thread (one per credentials)"""
+    if credentials is None:
+        return None
+
+    cache = getattr(_thread_local, "http_by_creds", None)
+    if cache is None:
+        cache = _thread_local.http_by_creds = {}
+
+    http = cache.get(id(credentials))
+    if http is None:
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        cache[id(credentials)] = http
+    return http
+
+
+def _execute(request, credentials) -> Any:
+    http = _thread_http(credentials)
+    if http is None:
+        return request.execute()
+    return request.execute(http=http)
+
+
+async def execute_request(spreadsheet_id: str, request, credentials=None) -> Any:
+    """
+    Execute a googleapiclient HttpRequest without blocking the event loop
+
+    Args:
+        spreadsheet_id: Spreadsheet the request targets (per-sheet limit)
+        request: Built request, e.g. service.spreadsheets().values().get(...)
+        credentials: Credentials for the per-thread Http (None = request's own Http)
+
+    Returns:
+        Parsed API response (same as request.execute())
+    """
+    global_limit, sheet_limit = _get_limits(spreadsheet_id)
+    async with sheet_limit:
+        async with global_limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_get_executor(), _execute, request, credentials)
+
+
+def shutdown_executor():
+    """Stop worker threads (call on shutdown)"""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.info("🧵 Sheets executor stopped")
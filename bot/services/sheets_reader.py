@@ -2,13 +2,13 @@
 Google Sheets Reader - Premium Feature
 Read user's financial data from their Google Sheets
 """
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from typing import Optional, Dict, List
 from loguru import logger
 from datetime import datetime, date
-import os
+
+from bot.services.sheets_executor import execute_request
+from bot.services.sheets_service import get_sheets_service
 
 
 class SheetsReader:
@@ -26,19 +26,22 @@ class SheetsReader:
         """
         self.spreadsheet_id = spreadsheet_id
         self.service = None
+        self.credentials = None
         self._initialize_service()
     
     def _initialize_service(self):
-        """Initialize Google Sheets API service"""
+        """Attach the shared Google Sheets API service (built once per process)"""
         try:
-            creds_path = os.getenv('GOOGLE_SHEETS_CREDENTIALS', 'google_service_account.json')
-            creds = Credentials.from_service_account_file(creds_path, scopes=self.SCOPES)
-            self.service = build('sheets', 'v4', credentials=creds)
-            logger.info(f"✅ Sheets service initialized for {self.spreadsheet_id[:10]}...")
+            self.credentials, self.service = get_sheets_service(self.SCOPES)
+            logger.debug(f"✅ Sheets service ready for {self.spreadsheet_id[:10]}...")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Sheets service: {e}")
             raise
     
+    async def _execute(self, request):
+        """Run a built API request in the Sheets thread pool (never blocks the event loop)"""
+        return await execute_request(self.spreadsheet_id, request, self.credentials)
+    
     async def test_connection(self) -> bool:
         """
         Test if bot can access the spreadsheet
@@ -49,9 +52,9 @@ class SheetsReader:
         try:
             # Get spreadsheet metadata (lighter than reading cells)
             # This verifies: 1) Spreadsheet exists, 2) Service account has access
-            spreadsheet = self.service.spreadsheets().get(
+            spreadsheet = await self._execute(self.service.spreadsheets().get(
                 spreadsheetId=self.spreadsheet_id
-            ).execute()
+            ))
             
             sheet_names = [sheet['properties']['title'] for sheet in spreadsheet.get('sheets', [])]
             logger.info(f"✅ Connection test successful: {self.spreadsheet_id[:10]}...")
@@ -84,10 +87,10 @@ class SheetsReader:
             # A3: Education, B3: Balance
             # ... etc
             
-            result = self.service.spreadsheets().values().get(
+            result = await self._execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range='Dashboard!A2:B7'  # 6 jars
-            ).execute()
+            ))
             
             values = result.get('values', [])
             if not values:
@@ -120,10 +123,10 @@ class SheetsReader:
         try:
             # Read from "Transactions" sheet
             # Assuming columns: Date, Category, Amount, Jar, Note, Method
-            result = self.service.spreadsheets().values().get(
+            result = await self._execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range='Transactions!A2:F100'  # Header in row 1, data from row 2
-            ).execute()
+            ))
             
             values = result.get('values', [])
             if not values:
@@ -167,10 +170,10 @@ class SheetsReader:
         
         try:
             # Read all transactions
-            result = self.service.spreadsheets().values().get(
+            result = await self._execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range='Transactions!A2:C1000'  # Date, Category, Amount
-            ).execute()
+            ))
             
             values = result.get('values', [])
             if not values:
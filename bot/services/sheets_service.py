@@ -0,0 +1,57 @@
+"""
+Sheets Service Factory - Process-wide googleapiclient service objects
+Credentials are loaded and the Sheets v4 service is built once per scope set,
+using the discovery document bundled with google-api-python-client (no
+network fetch). SheetsReader/SheetsWriter are thin per-spreadsheet wrappers
+around the shared objects.
+
+Sharing the service is safe because requests are executed with a per-thread
+Http (see sheets_executor.py); the service itself only builds requests.
+"""
+import os
+import threading
+from typing import Dict, Iterable, Tuple
+
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+from loguru import logger
+
+_services: Dict[Tuple[str, ...], tuple] = {}  # {scopes: (credentials, service)}
+_lock = threading.Lock()
+
+
+def get_sheets_service(scopes: Iterable[str]):
+    """
+    Get shared (credentials, service) for the given OAuth scopes
+
+    Args:
+        scopes: OAuth scopes, e.g. SheetsReader.SCOPES
+
+    Returns:
+        Tuple of (Credentials, googleapiclient Resource for sheets v4)
+    """
+    key = tuple(sorted(scopes))
+    cached = _services.get(key)
+    if cached is not None:
+        return cached
+
+    with _lock:
+        cached = _services.get(key)
+        if cached is None:
+            creds_path = os.getenv('GOOGLE_SHEETS_CREDENTIALS', 'google_service_account.json')
+            creds = Credentials.from_service_account_file(creds_path, scopes=list(key))
+            service = build(
+                'sheets', 'v4',
+                credentials=creds,
+                cache_discovery=False,
+                static_discovery=True
+            )
+            cached = _services[key] = (creds, service)
+            logger.info(f"✅ Sheets service built (scopes: {', '.join(s.rsplit('/', 1)[-1] for s in key)})")
+    return cached
+
+
+def clear_sheets_services():
+    """Drop cached services (e.g. after rotating the service account key)"""
+    with _lock:
+        _services.clear()
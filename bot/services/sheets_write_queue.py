@@ -0,0 +1,293 @@
+"""
+Sheets Write-Behind Queue - Batched quick-record writes
+User is acknowledged as soon as the transaction is persisted locally; rows for
+the same spreadsheet arriving within SHEETS_WRITE_BATCH_WINDOW are sent in a
+single addTransactions call, retried with exponential backoff.
+
+Outbox rows live in the `pending_sheet_writes` table, so nothing is lost on
+restart (call `restore()` from post_init). Delivery is at-least-once: a crash
+mid-flush re-sends that batch on restart.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, PendingSheetWrite
+from bot.services.sheets_api_client import SheetsAPIClient
+
+logger = logging.getLogger(__name__)
+
+
+class SheetsWriteQueue:
+    """Per-spreadsheet write-behind queue backed by the local DB"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        batch_window: float = settings.SHEETS_WRITE_BATCH_WINDOW,
+        max_batch: int = settings.SHEETS_WRITE_MAX_BATCH,
+        max_attempts: int = settings.SHEETS_WRITE_MAX_ATTEMPTS,
+        retry_base: float = settings.SHEETS_WRITE_RETRY_BASE,
+        client_factory: Callable = SheetsAPIClient
+    ):
+        self.session_factory = session_factory
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.client_factory = client_factory
+        self.bot = None  # Set in post_init to notify users about failed writes
+
+        self._scheduled: Dict[str, asyncio.Task] = {}  # {spreadsheet_id: flush task}
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"enqueued": 0, "batches": 0, "sent": 0, "retries": 0, "failed": 0}
+
+    # ---------- enqueue ----------
+
+    async def enqueue(
+        self,
+        user_id: int,
+        spreadsheet_id: str,
+        webapp_url: Optional[str],
+        transaction: Dict[str, Any]
+    ) -> int:
+        """
+        Persist a transaction and schedule a batched flush
+
+        Returns:
+            Outbox row id
+        """
+        db = self.session_factory()
+        try:
+            row = PendingSheetWrite(
+                user_id=user_id,
+                spreadsheet_id=spreadsheet_id,
+                webapp_url=webapp_url,
+                payload=json.dumps(transaction, ensure_ascii=False),
+                status="PENDING",
+                next_attempt_at=datetime.utcnow()
+            )
+            db.add(row)
+            db.commit()
+            row_id = row.id
+        finally:
+            db.close()
+
+        self.stats["enqueued"] += 1
+        self._schedule(spreadsheet_id, self.batch_window)
+        return row_id
+
+    def _schedule(self, spreadsheet_id: str, delay: float):
+        """Schedule one flush per spreadsheet (later enqueues join it)"""
+        if spreadsheet_id in self._scheduled:
+            return
+        task = asyncio.ensure_future(self._flush_after(spreadsheet_id, delay))
+        self._scheduled[spreadsheet_id] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_after(self, spreadsheet_id: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            # Enqueues from now on start a new window
+            self._scheduled.pop(spreadsheet_id, None)
+        try:
+            await self.flush(spreadsheet_id)
+        except Exception as e:
+            logger.error(f"❌ Write-behind flush failed for {spreadsheet_id[:10]}...: {e}", exc_info=True)
+
+    # ---------- flush ----------
+
+    def _claim(self, spreadsheet_id: str) -> List[PendingSheetWrite]:
+        """Mark due PENDING rows as SENDING so overlapping flushes can't resend them"""
+        db = self.session_factory()
+        try:
+            rows = db.query(PendingSheetWrite).filter(
+                PendingSheetWrite.spreadsheet_id == spreadsheet_id,
+                PendingSheetWrite.status == "PENDING",
+                PendingSheetWrite.next_attempt_at <= datetime.utcnow()
+            ).order_by(PendingSheetWrite.id).limit(self.max_batch).all()
+            for row in rows:
+                row.status = "SENDING"
+            db.commit()
+            return rows
+        finally:
+            db.close()
+
+    async def flush(self, spreadsheet_id: str) -> int:
+        """
+        Send due rows for one spreadsheet in a single addTransactions call
+
+        Returns:
+            Number of transactions written
+        """
+        rows = self._claim(spreadsheet_id)
+        if not rows:
+            return 0
+
+        # Newest URL wins if the user re-connected their Web App meanwhile
+        webapp_url = next((r.webapp_url for r in reversed(rows) if r.webapp_url), None)
+        client = self.client_factory(spreadsheet_id, webapp_url)
+        transactions = [json.loads(r.payload) for r in rows]
+
+        self.stats["batches"] += 1
+        result = await client.add_transactions(transactions)
+
+        if result.get("success"):
+            self._delete([r.id for r in rows])
+            self.stats["sent"] += len(rows)
+            logger.info(f"✅ Write-behind: {len(rows)} transaction(s) → {spreadsheet_id[:10]}...")
+        else:
+            await self._handle_failure(spreadsheet_id, rows, result.get("error", "Unknown error"))
+
+        # More rows may have been due (batch limit) or enqueued while sending
+        if self._has_pending(spreadsheet_id):
+            self._schedule(spreadsheet_id, self._next_delay(spreadsheet_id))
+        return len(rows) if result.get("success") else 0
+
+    def _delete(self, ids: List[int]):
+        db = self.session_factory()
+        try:
+            db.query(PendingSheetWrite).filter(PendingSheetWrite.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _handle_failure(self, spreadsheet_id: str, rows: List[PendingSheetWrite], error: str):
+        """Back off and retry, or give up after max_attempts"""
+        failed_users = set()
+        db = self.session_factory()
+        try:
+            for row in db.query(PendingSheetWrite).filter(
+                PendingSheetWrite.id.in_([r.id for r in rows])
+            ).all():
+                row.attempts = (row.attempts or 0) + 1
+                row.last_error = error[:500]
+                if row.attempts >= self.max_attempts:
+                    row.status = "FAILED"
+                    failed_users.add(row.user_id)
+                    self.stats["failed"] += 1
+                else:
+                    row.status = "PENDING"
+                    backoff = self.retry_base * (2 ** (row.attempts - 1))
+                    row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+                    self.stats["retries"] += 1
+            db.commit()
+        finally:
+            db.close()
+
+        logger.warning(f"⚠️ Write-behind batch failed for {spreadsheet_id[:10]}...: {error}")
+        for user_id in failed_users:
+            await self._notify_failure(user_id, error)
+
+    async def _notify_failure(self, user_id: int, error: str):
+        if not self.bot:
+            return
+        try:
+            await self.bot.send_message(
+                chat_id=user_id,
+                text=(
+                    "❌ Một số giao dịch chưa ghi được vào Google Sheets.\n\n"
+                    f"Lỗi: {error[:200]}\n\n"
+                    "Vui lòng kiểm tra kết nối Sheets (/connectsheets) và ghi lại nhé. 😢"
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to notify user {user_id} about write failure: {e}")
+
+    def _has_pending(self, spreadsheet_id: str) -> bool:
+        db = self.session_factory()
+        try:
+            return db.query(PendingSheetWrite.id).filter(
+                PendingSheetWrite.spreadsheet_id == spreadsheet_id,
+                PendingSheetWrite.status == "PENDING"
+            ).first() is not None
+        finally:
+            db.close()
+
+    def _next_delay(self, spreadsheet_id: str) -> float:
+        """Seconds until the earliest pending row for this spreadsheet is due"""
+        db = self.session_factory()
+        try:
+            row = db.query(PendingSheetWrite).filter(
+                PendingSheetWrite.spreadsheet_id == spreadsheet_id,
+                PendingSheetWrite.status == "PENDING"
+            ).order_by(PendingSheetWrite.next_attempt_at).first()
+            if row is None:
+                return self.batch_window
+            return max(0.0, (row.next_attempt_at - datetime.utcnow()).total_seconds())
+        finally:
+            db.close()
+
+    # ---------- lifecycle ----------
+
+    async def restore(self) -> int:
+        """
+        Re-schedule persisted rows after a restart (call from post_init)
+
+        Rows left in SENDING by a crash are re-queued.
+
+        Returns:
+            Number of spreadsheets with pending writes
+        """
+        db = self.session_factory()
+        try:
+            db.query(PendingSheetWrite).filter(
+                PendingSheetWrite.status == "SENDING"
+            ).update({"status": "PENDING"}, synchronize_session=False)
+            db.commit()
+            sheet_ids = [
+                sid for (sid,) in db.query(PendingSheetWrite.spreadsheet_id).filter(
+                    PendingSheetWrite.status == "PENDING"
+                ).distinct().all()
+            ]
+        finally:
+            db.close()
+
+        for sheet_id in sheet_ids:
+            self._schedule(sheet_id, self._next_delay(sheet_id))
+        if sheet_ids:
+            logger.info(f"📤 Write-behind: restored pending writes for {len(sheet_ids)} spreadsheet(s)")
+        return len(sheet_ids)
+
+    async def shutdown(self):
+        """Flush what is due now; anything left stays in the outbox for restore()"""
+        for task in list(self._scheduled.values()):
+            task.cancel()
+        self._scheduled.clear()
+        for sheet_id in list(self._pending_sheet_ids()):
+            try:
+                await self.flush(sheet_id)
+            except Exception as e:
+                logger.error(f"❌ Write-behind flush on shutdown failed: {e}")
+        for task in list(self._scheduled.values()):
+            task.cancel()
+        self._scheduled.clear()
+
+    def _pending_sheet_ids(self) -> List[str]:
+        db = self.session_factory()
+        try:
+            return [
+                sid for (sid,) in db.query(PendingSheetWrite.spreadsheet_id).filter(
+                    PendingSheetWrite.status == "PENDING",
+                    PendingSheetWrite.next_attempt_at <= datetime.utcnow()
+                ).distinct().all()
+            ]
+        finally:
+            db.close()
+
+
+_queue: Optional[SheetsWriteQueue] = None
+
+
+def get_sheets_write_queue() -> SheetsWriteQueue:
+    """Get the process-wide write-behind queue"""
+    global _queue
+
+    if _queue is None:
+        _queue = SheetsWriteQueue()
+    return _queue
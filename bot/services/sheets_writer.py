@@ -3,13 +3,13 @@ Google Sheets Writer - Premium Feature (OPTION 1)
 Write transactions to user's Google Sheets
 Requires EDITOR permission from user
 """
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from typing import Optional, Dict
 from loguru import logger
 from datetime import datetime
-import os
+
+from bot.services.sheets_executor import execute_request
+from bot.services.sheets_service import get_sheets_service
 
 
 class SheetsWriter:
@@ -27,19 +27,22 @@ class SheetsWriter:
         """
         self.spreadsheet_id = spreadsheet_id
         self.service = None
+        self.credentials = None
         self._initialize_service()
     
     def _initialize_service(self):
-        """Initialize Google Sheets API service"""
+        """Attach the shared Google Sheets API service (built once per process)"""
         try:
-            creds_path = os.getenv('GOOGLE_SHEETS_CREDENTIALS', 'google_service_account.json')
-            creds = Credentials.from_service_account_file(creds_path, scopes=self.SCOPES)
-            self.service = build('sheets', 'v4', credentials=creds)
-            logger.info(f"✅ Sheets writer initialized for {self.spreadsheet_id[:10]}...")
+            self.credentials, self.service = get_sheets_service(self.SCOPES)
+            logger.debug(f"✅ Sheets writer ready for {self.spreadsheet_id[:10]}...")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Sheets writer: {e}")
             raise
     
+    async def _execute(self, request):
+        """Run a built API request in the Sheets thread pool (never blocks the event loop)"""
+        return await execute_request(self.spreadsheet_id, request, self.credentials)
+    
     async def test_write_permission(self) -> bool:
         """
         Test if bot has WRITE access to the spreadsheet
@@ -53,12 +56,12 @@ class SheetsWriter:
             test_value = [['TEST_BOT_ACCESS']]
             
             body = {'values': test_value}
-            result = self.service.spreadsheets().values().append(
+            result = await self._execute(self.service.spreadsheets().values().append(
                 spreadsheetId=self.spreadsheet_id,
                 range=test_range,
                 valueInputOption='USER_ENTERED',
                 body=body
-            ).execute()
+            ))
             
             # Remove test row immediately
             # (In production, just test read permission instead)
@@ -102,13 +105,13 @@ class SheetsWriter:
             range_name = 'Transactions!A:F'
             body = {'values': [row]}
             
-            result = self.service.spreadsheets().values().append(
+            result = await self._execute(self.service.spreadsheets().values().append(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name,
                 valueInputOption='USER_ENTERED',
                 insertDataOption='INSERT_ROWS',
                 body=body
-            ).execute()
+            ))
             
             updates = result.get('updates', {})
             updated_rows = updates.get('updatedRows', 0)
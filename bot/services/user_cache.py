@@ -0,0 +1,179 @@
+"""
+User Cache - Per-update unit of work over a short-lived in-process `users` cache
+One incoming update used to look its user up 3-5 times (usage middleware,
+subscription checks merging into fresh sessions, state tracking, the handler
+itself). A UnitOfWork gives the update one session: each user is loaded once
+(from the cache when possible, without any SQL), mutated in place, and written
+with a single commit.
+
+Cached entries are column snapshots. Every reader gets its own detached copy, so
+one handler mutating its User never leaks into another. Entries expire after
+USER_CACHE_TTL seconds (LRU, USER_CACHE_SIZE users) and are invalidated
+explicitly whenever a session from the same session factory writes users:
+ORM flushes drop the flushed rows, and bulk UPDATE/DELETE on users clears the
+cache. Raw SQL writes should call invalidate(); otherwise the TTL bounds staleness,
+including writes from other processes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, User
+
+_COLUMNS = [column.key for column in User.__mapper__.column_attrs]
+
+
+class UserCache:
+    """Thread-safe TTL + LRU cache of User rows, invalidated by writes through `session_factory`"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        maxsize: int = settings.USER_CACHE_SIZE,
+        ttl: float = settings.USER_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        event.listen(session_factory, "after_flush", self._after_flush)
+        event.listen(session_factory, "after_commit", self._after_commit)
+        event.listen(session_factory, "do_orm_execute", self._do_orm_execute)
+
+    def get(self, user_id: int) -> Optional[User]:
+        """Detached copy of the cached user, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            values = entry[1]
+
+        user = User(**values)
+        make_transient_to_detached(user)  # Persistent identity, all columns loaded: no SELECT when attached
+        return user
+
+    def put(self, user: Optional[User]):
+        if user is None:
+            return
+        values = {key: user.__dict__[key] for key in _COLUMNS if key in user.__dict__}
+        if len(values) != len(_COLUMNS):
+            return  # Partially loaded (deferred/expired columns): not a full snapshot
+        with self._lock:
+            self._entries[user.id] = (self.clock() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, session, user_id: int) -> Optional[User]:
+        """User attached to `session`: cache hit -> no SQL, miss -> one SELECT (then cached)"""
+        cached = self.get(user_id)
+        if cached is not None:
+            return session.merge(cached, load=False)
+        user = session.get(User, user_id)
+        self.put(user)
+        return user
+
+    # Invalidation on writes ------------------------------------------------
+
+    def _after_flush(self, session, flush_context):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, User) and obj.id is not None:
+                self.invalidate(obj.id)
+                session.info.setdefault("user_cache_written", set()).add(obj.id)
+
+    def _after_commit(self, session):
+        # Again after commit: a reader between flush and commit may have cached the old row
+        for user_id in session.info.pop("user_cache_written", ()):
+            self.invalidate(user_id)
+        if session.info.pop("user_cache_bulk_write", False):
+            self.clear()
+
+    def _do_orm_execute(self, state):
+        if (state.is_update or state.is_delete) and any(mapper.class_ is User for mapper in state.all_mappers):
+            self.clear()
+            state.session.info["user_cache_bulk_write"] = True
+
+
+class UnitOfWork:
+    """
+    Request-scoped session: users loaded once (cache first), changes committed once
+
+    Usage:
+        with UnitOfWork() as uow:
+            user = uow.get_user(user_id)
+            user.last_active = datetime.utcnow()
+        # committed on exit (rolled back on error); fresh state goes back to the cache
+    """
+
+    def __init__(self, session_factory: Callable = SessionLocal, cache: Optional[UserCache] = None):
+        self.session = session_factory()
+        self.session.info["unit_of_work"] = True  # Writers leave the commit to us (SubscriptionManager)
+        self.cache = cache or get_user_cache()
+        self._users: Dict[int, Optional[User]] = {}
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        if user_id not in self._users:
+            self._users[user_id] = self.cache.load(self.session, user_id)
+        return self._users[user_id]
+
+    def commit(self):
+        self.session.commit()
+        for user in self._users.values():
+            self.cache.put(user)  # Committed values (expire_on_commit=False) save the next update's SELECT
+
+    def rollback(self):
+        self.session.rollback()
+        self._users.clear()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+
+
+_user_cache: Optional[UserCache] = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache() -> UserCache:
+    """Get the process-wide user cache (bound to SessionLocal)"""
+    global _user_cache
+    with _user_cache_lock:
+        if _user_cache is None:
+            _user_cache = UserCache()
+            logger.info(f"✅ User cache ready ({_user_cache.maxsize} users, {_user_cache.ttl}s TTL)")
+        return _user_cache
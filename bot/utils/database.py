@@ -2,7 +2,7 @@
 Database Models for Bot
 Phase 2: Context Memory + Referral System
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -113,11 +113,33 @@ class User(Base):
     last_reminder_sent = Column(DateTime, nullable=True)  # Last reminder timestamp
     reminder_enabled = Column(Boolean, default=True)  # User preference for reminders
     
+    # REMINDER TIME BUCKETS (bot/core/reminder_buckets.py)
+    timezone = Column(String(50), nullable=True)  # IANA name, NULL = settings.DEFAULT_TIMEZONE
+    morning_reminder_at = Column(String(5), nullable=True)  # Local "HH:MM", NULL = 08:00
+    evening_reminder_at = Column(String(5), nullable=True)  # Local "HH:MM", NULL = 20:00
+    morning_reminder_bucket = Column(Integer, nullable=True)  # UTC minute of day (0-1439) the reminder is sent
+    evening_reminder_bucket = Column(Integer, nullable=True)
+    
     # UNLOCK FLOW TRACKING (Feb 2026)
     unlock_offered = Column(Boolean, default=False)  # Whether UNLOCKoffer was sent
     unlock_offered_at = Column(DateTime, nullable=True)  # When UNLOCK offer was sent
     last_checkin = Column(DateTime, nullable=True)  # Last check-in message sent
     
+    __table_args__ = (
+        # Admin metrics (MetricsCalculationService) aggregate only these columns:
+        # a covering index lets the single-pass query scan the index, not the table
+        Index(
+            "ix_users_metrics_covering",
+            "is_free_unlocked", "vip_tier", "subscription_tier", "created_at", "last_active",
+            "premium_started_at", "subscription_expires", "total_transactions", "referral_count", "bot_chat_count"
+        ),
+        # Daily streak check (check_missed_days): one range scan per state
+        Index("ix_users_streak_check", "user_state", "reminder_enabled", "last_transaction_date"),
+        # Per-minute reminder dispatch reads one bucket at a time
+        Index("ix_users_morning_reminder_bucket", "morning_reminder_bucket"),
+        Index("ix_users_evening_reminder_bucket", "evening_reminder_bucket"),
+    )
+    
     def __repr__(self):
         return f"<User {self.id} ({self.username}) state={self.user_state} streak={self.streak_count}>"
 
@@ -125,9 +147,13 @@ class User(Base):
 class ConversationContext(Base):
     """Store conversation context for AI"""
     __tablename__ = "conversation_contexts"
+    __table_args__ = (
+        # Context memory: last N turns per user (ORDER BY timestamp DESC LIMIT n) and per-user pruning
+        Index("ix_conversation_contexts_user_time", "user_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, index=True)  # Telegram user ID
+    user_id = Column(Integer)  # Telegram user ID
     role = Column(String(20))  # "user" or "assistant"
     content = Column(Text)  # Message content
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -232,6 +258,151 @@ class PaymentVerification(Base):
         return f"<PaymentVerification user={self.user_id} status={self.status}>"
 
 
+class PendingSheetWrite(Base):
+    """Write-behind outbox for quick-record transactions (flushed in batches to Sheets)"""
+    __tablename__ = "pending_sheet_writes"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, index=True)  # Who recorded the transaction
+    spreadsheet_id = Column(String(100), index=True)
+    webapp_url = Column(String(500), nullable=True)  # User's Apps Script URL at enqueue time
+    payload = Column(Text)  # JSON transaction (SheetsAPIClient.build_transaction)
+    status = Column(String(20), default="PENDING", index=True)  # PENDING, SENDING, FAILED
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<PendingSheetWrite {self.id} sheet={self.spreadsheet_id[:10]} status={self.status}>"
+
+
+class PendingRegistrationExport(Base):
+    """Outbox of rows for the FreedomWallet_Registrations sheet (appended in batches)"""
+    __tablename__ = "pending_registration_exports"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, index=True)
+    row_data = Column(Text)  # JSON list, columns A:L of the registration sheet
+    status = Column(String(20), default="PENDING", index=True)  # PENDING, SENDING, FAILED
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<PendingRegistrationExport {self.id} user={self.user_id} status={self.status}>"
+
+
+class WebRegistration(Base):
+    """Local mirror of the web registration sheet, keyed by referral code (WEB_<code> deep links)"""
+    __tablename__ = "web_registrations"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    spreadsheet_id = Column(String(100), index=True)
+    referral_code = Column(String(50), index=True)  # "🔗 Link giới thiệu" column
+    row_number = Column(Integer)  # Sheet row (header = 1)
+    payload = Column(Text)  # JSON user data (full_name, email, phone, plan, timestamp, referral_count)
+    synced_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<WebRegistration {self.referral_code} row={self.row_number}>"
+
+
+class RegistrationIndexState(Base):
+    """Sync position of the WebRegistration mirror for one worksheet"""
+    __tablename__ = "registration_index_state"
+    
+    spreadsheet_id = Column(String(100), primary_key=True)
+    worksheet = Column(String(100))
+    headers = Column(Text, nullable=True)  # JSON header row
+    rows_indexed = Column(Integer, default=0)  # Data rows mirrored (incremental refresh resumes after them)
+    last_modified = Column(String(50), nullable=True)  # Drive modifiedTime at last refresh
+    checked_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<RegistrationIndexState {self.spreadsheet_id[:10]} rows={self.rows_indexed}>"
+
+
+class MetricsSnapshot(Base):
+    """Precomputed admin metrics (written every METRICS_SNAPSHOT_INTERVAL minutes)"""
+    __tablename__ = "metrics_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    captured_at = Column(DateTime, default=datetime.utcnow, index=True)
+    overall_status = Column(String(20))  # HEALTHY, WARNING, CRITICAL
+    
+    # The 6 headline metrics, flattened for trend queries
+    free_retention_30day = Column(Float)
+    free_transactions_per_user = Column(Float)
+    vip_weekly_active_pct = Column(Float)
+    vip_premium_conversion_pct = Column(Float)
+    premium_ai_usage_avg = Column(Float)
+    premium_churn_90day_pct = Column(Float)
+    
+    payload = Column(Text)  # JSON: full MetricsCalculationService.get_all_metrics() result
+    
+    def __repr__(self):
+        return f"<MetricsSnapshot {self.captured_at} {self.overall_status}>"
+
+
+class BroadcastJob(Base):
+    """Checkpoint of a bulk send (daily reminders, UNLOCK offers) - resumed after a restart"""
+    __tablename__ = "broadcast_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(100), unique=True, nullable=False)  # Idempotency key, e.g. evening_reminder:2026-02-10
+    name = Column(String(50), nullable=False)  # Registered broadcast (bot/services/broadcast.py)
+    params = Column(Text, nullable=True)  # JSON kwargs for the registered spec (e.g. reminder bucket)
+    status = Column(String(20), default="RUNNING", index=True)  # RUNNING, DONE, ABANDONED
+    cursor = Column(Integer, default=0)  # Last user id whose chunk was fully processed
+    stats = Column(Text, nullable=True)  # JSON counters so far
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<BroadcastJob {self.key} {self.status} cursor={self.cursor}>"
+
+
+class BroadcastDelivery(Base):
+    """One recipient of a running broadcast (idempotency: claimed before sending)"""
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (UniqueConstraint("job_key", "user_id", name="uq_broadcast_delivery"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_key = Column(String(100), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    status = Column(String(20), default="SENDING")  # SENDING, SENT, BLOCKED, FAILED
+    
+    def __repr__(self):
+        return f"<BroadcastDelivery {self.job_key} user={self.user_id} {self.status}>"
+
+
+class ScheduledMessage(Base):
+    """One-shot per-user message (program day, trial reminder, WOW moment) - claimed by the due-queue poller"""
+    __tablename__ = "scheduled_messages"
+    __table_args__ = (
+        # Poller claims: WHERE status = 'PENDING' AND due_at <= :now ORDER BY due_at LIMIT :batch
+        Index("ix_scheduled_messages_due", "status", "due_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(100), unique=True, nullable=False)  # e.g. program_123_NURTURE_7_DAY_day_1
+    handler = Column(String(50), nullable=False)  # Registered handler (bot/services/job_store.py)
+    user_id = Column(Integer, nullable=True, index=True)
+    payload = Column(Text, nullable=True)  # JSON kwargs for the handler
+    due_at = Column(DateTime, nullable=False)  # UTC
+    status = Column(String(20), default="PENDING")  # PENDING, RUNNING, DONE, FAILED, CANCELLED, EXPIRED
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ScheduledMessage {self.key} {self.status} due={self.due_at}>"
+
+
 # Create tables
 Base.metadata.create_all(engine)
 
@@ -271,48 +442,15 @@ async def save_user_to_db(user):
 
 
 async def get_user_context(user_id: int, limit: int = 5):
-    """Get last N messages from conversation context"""
-    session = SessionLocal()
-    try:
-        contexts = session.query(ConversationContext)\
-            .filter(ConversationContext.user_id == user_id)\
-            .order_by(ConversationContext.timestamp.desc())\
-            .limit(limit)\
-            .all()
-        
-        # Convert to OpenAI message format
-        messages = [
-            {"role": context.role, "content": context.content}
-            for context in reversed(contexts)
-        ]
-        return messages
-    finally:
-        session.close()
+    """Get last N messages from conversation context (bounded memory tier, then DB)"""
+    from bot.ai.context import get_context_memory  # context imports this module
+    return get_context_memory().get(user_id, limit)
 
 
 async def save_message_to_context(user_id: int, user_message: str, ai_response: str):
-    """Save user message and AI response to context"""
-    session = SessionLocal()
-    try:
-        # Save user message
-        user_context = ConversationContext(
-            user_id=user_id,
-            role="user",
-            content=user_message
-        )
-        session.add(user_context)
-        
-        # Save AI response
-        ai_context = ConversationContext(
-            user_id=user_id,
-            role="assistant",
-            content=ai_response
-        )
-        session.add(ai_context)
-        
-        session.commit()
-    finally:
-        session.close()
+    """Save user message and AI response to context (oldest turns beyond the per-user cap are pruned)"""
+    from bot.ai.context import get_context_memory  # context imports this module
+    get_context_memory().append(user_id, user_message, ai_response)
 
 
 # ============= REFERRAL SYSTEM FUNCTIONS =============
@@ -327,12 +465,19 @@ def generate_referral_code(user_id: int) -> str:
 
 
 async def get_user_by_id(user_id: int):
-    """Get user from database"""
+    """Get user from database (served from the in-process user cache when fresh)"""
+    from bot.services.user_cache import get_user_cache  # user_cache imports this module
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is not None:
+        return user  # Detached copy of the cached row
+    
     session = SessionLocal()
     try:
         user = session.query(User).filter(User.id == user_id).first()
         # Don't expunge - keep user attached to avoid DetachedInstanceError
         # Session will be closed but object remains usable for basic attribute access
+        cache.put(user)
         return user
     finally:
         session.close()
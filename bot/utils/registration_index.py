@@ -0,0 +1,234 @@
+"""
+Web Registration Index - Local mirror of the registration sheet
+WEB_<code> deep links are resolved from the `web_registrations` table instead
+of downloading and scanning the whole sheet on every /start.
+
+The mirror is refreshed incrementally: when the spreadsheet's Drive
+modifiedTime changes, only rows after the last indexed row are fetched. If
+nothing was appended, rows were edited or deleted in place and the index is
+rebuilt from one get_all_values() call. Checks are throttled to one per
+REGISTRATION_INDEX_REFRESH_INTERVAL seconds.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from gspread.utils import rowcol_to_a1
+from loguru import logger
+
+from config.settings import settings
+from bot.utils.database import SessionLocal, WebRegistration, RegistrationIndexState
+
+REFERRAL_CODE_HEADERS = ('🔗 Link giới thiệu', 'Link giới thiệu', 'Referral Code', '🔗 Link giới thiệu ')
+
+
+def extract_referral_code(record: Dict) -> str:
+    """Referral code of a sheet record (landing page generates it from the email)"""
+    for header in REFERRAL_CODE_HEADERS:
+        if header in record:
+            return str(record[header]).strip()
+    return ''
+
+
+def record_to_user_data(record: Dict) -> Dict:
+    """Map a registration sheet record to the user data returned to /start"""
+    referral_count_str = str(record.get('👥 Số người đã giới thiệu', record.get('Số người đã giới thiệu', '0')))
+    try:
+        referral_count = int(referral_count_str) if referral_count_str.strip() else 0
+    except (ValueError, AttributeError):
+        referral_count = 0
+
+    return {
+        'full_name': record.get('Họ & Tên', record.get('Họ tên', record.get('Full Name', record.get('fullName', '')))),
+        'email': record.get('📧 Email', record.get('Email', '')),
+        'phone': record.get('👤 Điện thoại', record.get('Số điện thoại', record.get('Phone', record.get('phone', '')))),
+        'plan': record.get('💎 Gói', record.get('Gói', record.get('Plan', record.get('plan', 'FREE')))),
+        'timestamp': record.get('📅 Ngày đăng ký', record.get('Timestamp', record.get('timestamp', ''))),
+        'referral_count': referral_count,
+    }
+
+
+def row_to_record(headers: List[str], row: List[str]) -> Dict:
+    """Zip a raw sheet row with the header row (short rows are padded)"""
+    return {header: (row[i] if i < len(row) else '') for i, header in enumerate(headers)}
+
+
+class RegistrationIndex:
+    """Referral code → registration lookups backed by the local DB"""
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        refresh_interval: int = settings.REGISTRATION_INDEX_REFRESH_INTERVAL,
+        clock: Callable[[], datetime] = datetime.utcnow
+    ):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+
+    # ---------- lookups ----------
+
+    def lookup(self, spreadsheet_id: str, referral_code: str) -> Optional[Dict]:
+        """Indexed user data for a referral code, or None"""
+        db = self.session_factory()
+        try:
+            entry = db.query(WebRegistration).filter(
+                WebRegistration.spreadsheet_id == spreadsheet_id,
+                WebRegistration.referral_code == referral_code
+            ).order_by(WebRegistration.row_number.desc()).first()
+            return json.loads(entry.payload) if entry else None
+        finally:
+            db.close()
+
+    def find_in_sheet(self, worksheet, referral_code: str) -> Optional[Dict]:
+        """
+        Fallback for index misses: single-cell find() instead of a full scan
+
+        A match is added to the index so the next lookup is local.
+        """
+        spreadsheet_id = worksheet.spreadsheet.id
+        headers = self._headers(spreadsheet_id) or worksheet.row_values(1)
+        column = next((headers.index(h) + 1 for h in REFERRAL_CODE_HEADERS if h in headers), None)
+
+        cell = worksheet.find(referral_code, in_column=column) if column else worksheet.find(referral_code)
+        if not cell or cell.row == 1:
+            return None
+
+        record = row_to_record(headers, worksheet.row_values(cell.row))
+        if extract_referral_code(record) != referral_code:
+            return None
+
+        db = self.session_factory()
+        try:
+            self._upsert(db, spreadsheet_id, cell.row, record)
+            db.commit()
+        finally:
+            db.close()
+        return record_to_user_data(record)
+
+    # ---------- refresh ----------
+
+    def refresh(self, worksheet, force: bool = False) -> int:
+        """
+        Bring the mirror up to date with the sheet
+
+        Returns:
+            Number of rows (re)indexed
+        """
+        spreadsheet = worksheet.spreadsheet
+        spreadsheet_id = spreadsheet.id
+        now = self.clock()
+
+        db = self.session_factory()
+        try:
+            state = db.get(RegistrationIndexState, spreadsheet_id)
+            if (
+                not force and state is not None and state.checked_at is not None
+                and now - state.checked_at < timedelta(seconds=self.refresh_interval)
+            ):
+                return 0
+
+            modified = self._last_modified(spreadsheet)
+            if state is None:
+                state = RegistrationIndexState(spreadsheet_id=spreadsheet_id, rows_indexed=0)
+                db.add(state)
+
+            if (
+                not force and state.headers and state.worksheet == worksheet.title
+                and modified is not None and modified == state.last_modified
+            ):
+                count = 0
+            elif force or not state.headers or state.worksheet != worksheet.title:
+                count = self._rebuild(db, worksheet, state)
+            else:
+                count = self._append_tail(db, worksheet, state)
+                if count == 0 and modified is not None:
+                    # Modified without new rows: edited/deleted in place
+                    count = self._rebuild(db, worksheet, state)
+
+            state.worksheet = worksheet.title
+            state.last_modified = modified
+            state.checked_at = now
+            db.commit()
+            return count
+        finally:
+            db.close()
+
+    def _rebuild(self, db, worksheet, state: RegistrationIndexState) -> int:
+        values = worksheet.get_all_values()
+        headers = values[0] if values else []
+        rows = values[1:]
+
+        db.query(WebRegistration).filter(
+            WebRegistration.spreadsheet_id == state.spreadsheet_id
+        ).delete(synchronize_session=False)
+        db.add_all([
+            self._entry(state.spreadsheet_id, row_number, row_to_record(headers, row))
+            for row_number, row in enumerate(rows, start=2)
+        ])
+
+        state.headers = json.dumps(headers, ensure_ascii=False)
+        state.rows_indexed = len(rows)
+        logger.info(f"📇 Registration index rebuilt: {len(rows)} rows")
+        return len(rows)
+
+    def _append_tail(self, db, worksheet, state: RegistrationIndexState) -> int:
+        headers = json.loads(state.headers)
+        first_row = state.rows_indexed + 2
+        last_column = rowcol_to_a1(1, max(len(headers), 1)).rstrip('0123456789')
+        tail = worksheet.get_values(f"A{first_row}:{last_column}")
+
+        for offset, row in enumerate(tail):
+            self._upsert(db, state.spreadsheet_id, first_row + offset, row_to_record(headers, row))
+
+        state.rows_indexed += len(tail)
+        if tail:
+            logger.info(f"📇 Registration index: +{len(tail)} new rows")
+        return len(tail)
+
+    # ---------- helpers ----------
+
+    @staticmethod
+    def _entry(spreadsheet_id: str, row_number: int, record: Dict) -> WebRegistration:
+        return WebRegistration(
+            spreadsheet_id=spreadsheet_id,
+            referral_code=extract_referral_code(record),
+            row_number=row_number,
+            payload=json.dumps(record_to_user_data(record), ensure_ascii=False, default=str)
+        )
+
+    def _upsert(self, db, spreadsheet_id: str, row_number: int, record: Dict):
+        db.query(WebRegistration).filter(
+            WebRegistration.spreadsheet_id == spreadsheet_id,
+            WebRegistration.row_number == row_number
+        ).delete(synchronize_session=False)
+        db.add(self._entry(spreadsheet_id, row_number, record))
+
+    def _headers(self, spreadsheet_id: str) -> Optional[List[str]]:
+        db = self.session_factory()
+        try:
+            state = db.get(RegistrationIndexState, spreadsheet_id)
+            return json.loads(state.headers) if state and state.headers else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _last_modified(spreadsheet) -> Optional[str]:
+        """Drive modifiedTime (None = unknown: only appended rows are picked up)"""
+        try:
+            return spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read sheet modifiedTime: {e}")
+            return None
+
+
+_index: Optional[RegistrationIndex] = None
+
+
+def get_registration_index() -> RegistrationIndex:
+    """Get the process-wide registration index"""
+    global _index
+
+    if _index is None:
+        _index = RegistrationIndex()
+    return _index
@@ -8,6 +8,8 @@ from config.settings import settings
 from datetime import datetime
 from typing import Optional, Dict
 
+from bot.utils.registration_index import get_registration_index
+
 
 # Google Sheets scope
 SCOPES = [
@@ -142,12 +144,6 @@ async def find_user_in_sheet_by_email_hash(email_hash: str) -> Optional[Dict]:
     Sheet structure: Timestamp | Full Name | Email | Phone | Plan | Source | Status | Referral Code | Referrer
     """
     try:
-        client = get_sheets_client()
-        if not client:
-            print("❌ Sheets client not initialized")
-            print("   Check: GOOGLE_SHEETS_CREDENTIALS in .env")
-            return None
-        
         sheet_id = settings.SUPPORT_SHEET_ID
         if not sheet_id:
             print("❌ No sheet ID configured")
@@ -162,6 +158,19 @@ async def find_user_in_sheet_by_email_hash(email_hash: str) -> Optional[Dict]:
             print("   Current: Check SUPPORT_SHEET_ID in .env")
             return None
         
+        # Referral code → registration row from the local mirror (no sheet access)
+        index = get_registration_index()
+        user_data = index.lookup(sheet_id, email_hash)
+        if user_data:
+            print(f"✅ Found user by referral code in local index: {user_data['email']}")
+            return user_data
+        
+        client = get_sheets_client()
+        if not client:
+            print("❌ Sheets client not initialized")
+            print("   Check: GOOGLE_SHEETS_CREDENTIALS in .env")
+            return None
+        
         print(f"📄 Opening sheet: {sheet_id}")
         
         try:
@@ -198,45 +207,18 @@ async def find_user_in_sheet_by_email_hash(email_hash: str) -> Optional[Dict]:
             print("❌ No registration worksheet found")
             return None
         
-        # Get all records
-        records = worksheet.get_all_records()
-        print(f"📊 Found {len(records)} records in worksheet")
-        
-        # Debug: Show all column names from first record
-        if records:
-            print(f"🔑 Column names: {list(records[0].keys())}")
+        # Sync the local index (throttled, incremental) and look again
+        index.refresh(worksheet)
+        user_data = index.lookup(sheet_id, email_hash)
+        if user_data:
+            print(f"✅ MATCH! Found user by referral code: {user_data['email']}")
+            return user_data
         
-        # Search for user by referral code (stored in "🔗 Link giới thiệu" column)
-        print(f"🔍 Looking for referral code: {email_hash}")
-        for idx, record in enumerate(records, 1):
-            # Get referral code from sheet (this is what landing page generates from email)
-            referral_code = record.get('🔗 Link giới thiệu', record.get('Link giới thiệu', record.get('Referral Code', record.get('🔗 Link giới thiệu ', ''))))
-            
-            email = record.get('📧 Email', record.get('Email', ''))
-            
-            print(f"  [{idx}] Email: {email} → Referral Code: {referral_code}")
-            
-            # Match by referral code (not by email hash!)
-            if referral_code == email_hash:
-                print(f"✅ MATCH! Found user by referral code: {email}")
-                
-                # Get referral count from sheet
-                referral_count_str = str(record.get('👥 Số người đã giới thiệu', record.get('Số người đã giới thiệu', '0')))
-                try:
-                    referral_count = int(referral_count_str) if referral_count_str.strip() else 0
-                except (ValueError, AttributeError):
-                    referral_count = 0
-                
-                print(f"📊 Referral count from sheet: {referral_count}")
-                
-                return {
-                    'full_name': record.get('Họ & Tên', record.get('Họ tên', record.get('Full Name', record.get('fullName', '')))),
-                    'email': email,
-                    'phone': record.get('👤 Điện thoại', record.get('Số điện thoại', record.get('Phone', record.get('phone', '')))),
-                    'plan': record.get('💎 Gói', record.get('Gói', record.get('Plan', record.get('plan', 'FREE')))),
-                    'timestamp': record.get('📅 Ngày đăng ký', record.get('Timestamp', record.get('timestamp', ''))),
-                    'referral_count': referral_count,
-                }
+        # Not mirrored yet (e.g. registered seconds ago): single-cell lookup
+        user_data = index.find_in_sheet(worksheet, email_hash)
+        if user_data:
+            print(f"✅ MATCH! Found user by referral code (sheet find): {user_data['email']}")
+            return user_data
         
         print(f"❌ No user found with referral code: {email_hash}")
         return None
@@ -8,13 +8,23 @@ from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 from loguru import logger
 
+from bot.services.registration_exporter import get_registration_exporter
+
 
 REGISTRATION_SHEET_ID = "1-fruHaSlCKIOpIfU5Qrkns0ze3bx3E-mKUgQ5fUF-Hg"
 WORKSHEET_NAME = "FreedomWallet_Registrations"
 
 
+_worksheet = None  # Opened once, reused by the registration exporter
+
+
 def get_registration_worksheet():
-    """Get the registration worksheet"""
+    """Get the registration worksheet (cached after the first successful open)"""
+    global _worksheet
+    
+    if _worksheet is not None:
+        return _worksheet
+    
     try:
         scope = [
             'https://spreadsheets.google.com/feeds',
@@ -28,15 +38,21 @@ def get_registration_worksheet():
         
         client = gspread.authorize(creds)
         spreadsheet = client.open_by_key(REGISTRATION_SHEET_ID)
-        worksheet = spreadsheet.worksheet(WORKSHEET_NAME)
+        _worksheet = spreadsheet.worksheet(WORKSHEET_NAME)
         
-        return worksheet
+        return _worksheet
         
     except Exception as e:
         logger.error(f"Error accessing registration sheet: {e}")
         return None
 
 
+def reset_registration_worksheet():
+    """Drop the cached worksheet so the next call re-opens the spreadsheet"""
+    global _worksheet
+    _worksheet = None
+
+
 async def save_user_to_registration_sheet(
     user_id: int,
     username: str,
@@ -53,27 +69,14 @@ async def save_user_to_registration_sheet(
     """
     Save user to registration Google Sheet
     
+    The row is persisted to the export outbox and written in the next batch,
+    updating the user's existing row or appending a new one.
+    
     Columns:
     📅 Ngày đăng ký | User ID | Username | Họ & Tên | 📧 Email | 👤 Điện thoại | 
     💎 Gói | 🔗 Link giới thiệu | 👥 Số người đã giới thiệu | 📍 Nguồn | 📊 Trạng thái | 👤 Người giới thiệu
     """
     try:
-        worksheet = get_registration_worksheet()
-        if not worksheet:
-            logger.error("Could not access registration worksheet")
-            return False
-        
-        # Check if user already exists
-        all_values = worksheet.get_all_values()
-        user_exists = False
-        user_row = None
-        
-        for idx, row in enumerate(all_values[1:], start=2):  # Skip header
-            if len(row) > 1 and str(row[1]) == str(user_id):  # Column B (User ID)
-                user_exists = True
-                user_row = idx
-                break
-        
         # Prepare row data
         registration_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         row_data = [
@@ -91,14 +94,9 @@ async def save_user_to_registration_sheet(
             referred_by or ""               # 👤 Người giới thiệu
         ]
         
-        if user_exists:
-            # Update existing row
-            worksheet.update(f'A{user_row}:L{user_row}', [row_data])
-            logger.info(f"✅ Updated user {user_id} in registration sheet (row {user_row})")
-        else:
-            # Append new row
-            worksheet.append_row(row_data)
-            logger.info(f"✅ Added new user {user_id} to registration sheet")
+        # Buffered: written with other registrations in one batch (see RegistrationExporter)
+        await get_registration_exporter().enqueue(user_id, row_data)
+        logger.info(f"✅ Queued user {user_id} for registration sheet")
         
         return True
         
@@ -28,7 +28,25 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview")
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", 0.7))
-    OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", 1000))
+    OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", 1000))  # reply cap (PREMIUM/TRIAL)
+    AI_REPLY_MAX_TOKENS_FREE: int = int(os.getenv("AI_REPLY_MAX_TOKENS_FREE", 400))  # reply cap (FREE)
+    AI_CONTEXT_BUDGET_FREE: int = int(os.getenv("AI_CONTEXT_BUDGET_FREE", 1000))  # history + message tokens
+    AI_CONTEXT_BUDGET_PREMIUM: int = int(os.getenv("AI_CONTEXT_BUDGET_PREMIUM", 4000))  # history + message tokens
+    
+    # Semantic response cache (repeated support questions skip the OpenAI call)
+    AI_CACHE_ENABLED: bool = os.getenv("AI_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+    AI_CACHE_MODEL: str = os.getenv("AI_CACHE_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")  # sentence-transformers
+    AI_CACHE_THRESHOLD: float = float(os.getenv("AI_CACHE_THRESHOLD", 0.92))  # cosine similarity
+    AI_CACHE_TTL: float = float(os.getenv("AI_CACHE_TTL", 86400))  # seconds
+    AI_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_CACHE_MAX_ENTRIES", 1000))
+    AI_CACHE_MIN_CHARS: int = int(os.getenv("AI_CACHE_MIN_CHARS", 12))  # shorter follow-ups are never cached
+    
+    # Knowledge base vector index (faq.json + bot/knowledge/docs, embedded with AI_CACHE_MODEL)
+    KNOWLEDGE_INDEX_DIR: str = os.getenv("KNOWLEDGE_INDEX_DIR", "data/knowledge_index")
+    KNOWLEDGE_CHUNK_CHARS: int = int(os.getenv("KNOWLEDGE_CHUNK_CHARS", 800))
+    KNOWLEDGE_EMBED_BATCH: int = int(os.getenv("KNOWLEDGE_EMBED_BATCH", 32))
+    KNOWLEDGE_TOP_K: int = int(os.getenv("KNOWLEDGE_TOP_K", 3))
+    FAQ_RELOAD_INTERVAL: float = float(os.getenv("FAQ_RELOAD_INTERVAL", 5))  # seconds between faq.json change checks
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///data/bot.db")
@@ -37,24 +55,87 @@ class Settings(BaseSettings):
     GOOGLE_SHEETS_CREDENTIALS: Optional[str] = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
     SUPPORT_SHEET_ID: Optional[str] = os.getenv("SUPPORT_SHEET_ID")
     SUPPORT_SHEET_NAME: str = os.getenv("SUPPORT_SHEET_NAME", "Support Tickets")
+    REGISTRATION_INDEX_REFRESH_INTERVAL: int = int(os.getenv("REGISTRATION_INDEX_REFRESH_INTERVAL", 60))  # seconds between sheet checks
+
+    # Registration sheet exporter (batched append_rows, Sheets write quota ~60/min per user)
+    REGISTRATION_EXPORT_BATCH_WINDOW: float = float(os.getenv("REGISTRATION_EXPORT_BATCH_WINDOW", 10))  # seconds
+    REGISTRATION_EXPORT_MAX_BATCH: int = int(os.getenv("REGISTRATION_EXPORT_MAX_BATCH", 200))
+    REGISTRATION_EXPORT_WRITES_PER_MINUTE: int = int(os.getenv("REGISTRATION_EXPORT_WRITES_PER_MINUTE", 40))
+    REGISTRATION_EXPORT_MAX_ATTEMPTS: int = int(os.getenv("REGISTRATION_EXPORT_MAX_ATTEMPTS", 8))
+    REGISTRATION_EXPORT_RETRY_BASE: float = float(os.getenv("REGISTRATION_EXPORT_RETRY_BASE", 30))  # seconds, doubled per attempt
     
     # Freedom Wallet Template
     YOUR_TEMPLATE_ID: str = os.getenv("YOUR_TEMPLATE_ID", "")
     
     # Redis (for caching - Phase 3)
     REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
-    
+
+    # Shared Sheets API response cache (categories/balance)
+    SHEETS_CACHE_BACKEND: str = os.getenv("SHEETS_CACHE_BACKEND", "memory")  # memory | redis
+    SHEETS_CACHE_TTL: int = int(os.getenv("SHEETS_CACHE_TTL", 300))  # seconds (fresh)
+    SHEETS_CACHE_MAX_AGE: int = int(os.getenv("SHEETS_CACHE_MAX_AGE", 3600))  # seconds (stale served + refreshed)
+    SHEETS_CACHE_MAX_ENTRIES: int = int(os.getenv("SHEETS_CACHE_MAX_ENTRIES", 5000))
+
+    # Write-behind queue for quick-record transactions
+    SHEETS_WRITE_BEHIND_ENABLED: bool = os.getenv("SHEETS_WRITE_BEHIND_ENABLED", "True").lower() in ("true", "1", "t")
+    SHEETS_WRITE_BATCH_WINDOW: float = float(os.getenv("SHEETS_WRITE_BATCH_WINDOW", 3))  # seconds
+    SHEETS_WRITE_MAX_BATCH: int = int(os.getenv("SHEETS_WRITE_MAX_BATCH", 50))
+    SHEETS_WRITE_MAX_ATTEMPTS: int = int(os.getenv("SHEETS_WRITE_MAX_ATTEMPTS", 6))
+    SHEETS_WRITE_RETRY_BASE: float = float(os.getenv("SHEETS_WRITE_RETRY_BASE", 5))  # seconds, doubled per attempt
+
+    # Google Sheets v4 API (SheetsReader/SheetsWriter) - blocking calls run in a thread pool
+    SHEETS_EXECUTOR_WORKERS: int = int(os.getenv("SHEETS_EXECUTOR_WORKERS", 16))
+    SHEETS_MAX_CONCURRENT: int = int(os.getenv("SHEETS_MAX_CONCURRENT", 16))
+    SHEETS_MAX_CONCURRENT_PER_SHEET: int = int(os.getenv("SHEETS_MAX_CONCURRENT_PER_SHEET", 2))
+
     # Rate Limiting
     MAX_MESSAGES_PER_MINUTE: int = int(os.getenv("MAX_MESSAGES_PER_MINUTE", 10))
     MAX_SUPPORT_TICKETS_PER_DAY: int = int(os.getenv("MAX_SUPPORT_TICKETS_PER_DAY", 3))
     
+    # Broadcasts (daily reminders, announcements) - Telegram allows ~30 msg/s per bot
+    BROADCAST_RATE: float = float(os.getenv("BROADCAST_RATE", 25))  # messages per second
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", 20))  # in-flight sends
+    BROADCAST_CHUNK_SIZE: int = int(os.getenv("BROADCAST_CHUNK_SIZE", 500))  # users loaded per query
+    BROADCAST_RESUME_MAX_AGE: int = int(os.getenv("BROADCAST_RESUME_MAX_AGE", 6))  # hours; older interrupted runs are abandoned
+    
+    # Daily reminders: per-user local time, dispatched in per-minute UTC buckets
+    DEFAULT_TIMEZONE: str = os.getenv("DEFAULT_TIMEZONE", "Asia/Ho_Chi_Minh")  # users without a timezone
+    REMINDER_SPREAD_MINUTES: int = int(os.getenv("REMINDER_SPREAD_MINUTES", 20))  # users sharing a time spread over N minutes
+    REMINDER_CATCHUP_MINUTES: int = int(os.getenv("REMINDER_CATCHUP_MINUTES", 5))  # buckets re-checked after a restart
+    
+    # Persistent one-shot jobs (program days, trial reminders, WOW moment)
+    JOB_STORE_POLL_INTERVAL: int = int(os.getenv("JOB_STORE_POLL_INTERVAL", 15))  # seconds between due-queue polls
+    JOB_STORE_BATCH_SIZE: int = int(os.getenv("JOB_STORE_BATCH_SIZE", 100))  # messages claimed per query
+    JOB_STORE_MISFIRE_GRACE: int = int(os.getenv("JOB_STORE_MISFIRE_GRACE", 24))  # hours; jobs missed longer are expired
+    
+    # In-process user cache (bot/services/user_cache.py)
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", 10000))  # users kept (LRU)
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", 30))  # seconds; bounds staleness from other processes
+    
+    # Analytics event store (buffered writes, daily segments + SQLite index)
+    ANALYTICS_FLUSH_INTERVAL: float = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", 2))  # seconds
+    ANALYTICS_MAX_BUFFER: int = int(os.getenv("ANALYTICS_MAX_BUFFER", 500))  # events before an early flush
+    
+    # Admin metrics snapshots (metrics_snapshots table, refreshed by a background job)
+    METRICS_SNAPSHOT_INTERVAL: int = int(os.getenv("METRICS_SNAPSHOT_INTERVAL", 15))  # minutes
+    METRICS_SNAPSHOT_RETENTION_DAYS: int = int(os.getenv("METRICS_SNAPSHOT_RETENTION_DAYS", 365))
+    
     # Context Memory
     CONTEXT_MEMORY_SIZE: int = int(os.getenv("CONTEXT_MEMORY_SIZE", 5))
+    CONTEXT_CACHE_USERS: int = int(os.getenv("CONTEXT_CACHE_USERS", 5000))  # users kept in memory (LRU)
+    CONTEXT_IDLE_TTL: float = float(os.getenv("CONTEXT_IDLE_TTL", 1800))  # seconds idle before eviction
+    CONTEXT_HISTORY_LIMIT: int = int(os.getenv("CONTEXT_HISTORY_LIMIT", 50))  # stored messages per user (ring buffer)
     
     # Freedom Wallet API (Phase 3)
     FREEDOM_WALLET_API_URL: Optional[str] = os.getenv("FREEDOM_WALLET_API_URL")
     FREEDOM_WALLET_API_KEY: Optional[str] = os.getenv("FREEDOM_WALLET_API_KEY")
-    
+
+    # Shared HTTP connection pool (Apps Script / webhook calls)
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", 100))
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))  # seconds
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))  # seconds
+
     # Environment
     ENV: str = os.getenv("ENV", "development")
     
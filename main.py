@@ -122,13 +122,54 @@ async def post_init(application: Application) -> None:
             logger.error(f"❌ Failed to initialize Clean Architecture: {e}", exc_info=True)
             logger.warning("⚠️  Falling back to old handlers only")
     
+    # Resume quick-record writes left in the outbox by a previous run
+    from bot.services.sheets_write_queue import get_sheets_write_queue
+    write_queue = get_sheets_write_queue()
+    write_queue.bot = application.bot
+    await write_queue.restore()
+    
+    # Resume registration sheet rows left in the outbox
+    from bot.services.registration_exporter import get_registration_exporter
+    await get_registration_exporter().restore()
+    
+    # Continue broadcasts (reminders, UNLOCK offers) interrupted by a restart
+    from bot.services.broadcast import resume_broadcasts
+    await resume_broadcasts(application.bot)
+    
+    # Poll scheduled_messages (program days, trial reminders, WOW moment);
+    # importing the job modules registers their handlers
+    from bot.core import program_manager
+    from bot.jobs import trial_churn_prevention, wow_moment
+    from bot.services.job_store import get_job_store
+    get_job_store().start(application.job_queue)
+    
+    # Load the knowledge base vector index once (AI answers search it in memory)
+    if settings.ENABLE_AI:
+        from bot.knowledge.embeddings import get_knowledge_index
+        get_knowledge_index()
+    
     # Add any other initialization logic here
 
 
 async def post_shutdown(application: Application) -> None:
     """Cleanup after bot shutdown."""
     logger.info("[BOT] Freedom Wallet Bot is shutting down...")
-    # Add any cleanup logic here
+    
+    # Flush due write-behind batches (the rest stays in the outbox)
+    from bot.services.sheets_write_queue import get_sheets_write_queue
+    await get_sheets_write_queue().shutdown()
+    
+    # Flush buffered registration sheet rows
+    from bot.services.registration_exporter import get_registration_exporter
+    await get_registration_exporter().shutdown()
+    
+    # Close pooled HTTP connections (Sheets API / webhooks)
+    from bot.services.http_session import close_http_session
+    await close_http_session()
+    
+    # Stop Google Sheets v4 API worker threads
+    from bot.services.sheets_executor import shutdown_executor
+    shutdown_executor()
 
 
 def main() -> None:
@@ -394,8 +435,10 @@ def main() -> None:
     # Setup daily background jobs (Week 4)
     from bot.jobs import setup_daily_jobs
     from bot.jobs.unlock_trigger import setup_unlock_trigger_job
+    from bot.jobs.metrics_snapshot import setup_metrics_snapshot_job
     setup_daily_jobs(application)
     setup_unlock_trigger_job(application)
+    setup_metrics_snapshot_job(application)
     
     # Start bot
     logger.info(f"[OK] Bot started in {settings.ENV} mode")
@@ -0,0 +1,110 @@
+"""
+Database Migration: Bounded conversation context
+Migration Date: Oct 18, 2026
+
+Changes:
+- Add ix_conversation_contexts_user_time on (user_id, timestamp), defined on
+  the ConversationContext model; drop the single-column user_id index it covers
+- Prune each user's stored messages to the newest CONTEXT_HISTORY_LIMIT
+
+The context memory (bot/ai/context.py) reads the last turns per user and prunes
+older ones on every write, both through the composite index. Without the prune,
+conversation_contexts kept every turn forever. New databases get the index from
+create_all().
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from bot.utils.database import engine, ConversationContext
+from config.settings import settings
+from loguru import logger
+
+INDEX_NAME = "ix_conversation_contexts_user_time"
+OLD_INDEX_NAME = "ix_conversation_contexts_user_id"
+
+
+def _context_index():
+    return next(index for index in ConversationContext.__table__.indexes if index.name == INDEX_NAME)
+
+
+def _index_names():
+    return [index['name'] for index in inspect(engine).get_indexes('conversation_contexts')]
+
+
+def upgrade():
+    """Create the composite index, drop the old one and prune old messages"""
+    logger.info("🔄 Starting context memory migration...")
+
+    if INDEX_NAME in _index_names():
+        logger.info(f"⏭️ {INDEX_NAME} already exists")
+    else:
+        logger.info(f"➕ Creating {INDEX_NAME}...")
+        _context_index().create(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {OLD_INDEX_NAME}"))
+
+        pruned = conn.execute(text("""
+            DELETE FROM conversation_contexts WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id ORDER BY timestamp DESC, id DESC
+                    ) AS position
+                    FROM conversation_contexts
+                ) ranked
+                WHERE position > :keep
+            )
+        """), {"keep": settings.CONTEXT_HISTORY_LIMIT}).rowcount
+        conn.commit()
+    logger.info(f"🧹 Pruned {pruned} messages beyond {settings.CONTEXT_HISTORY_LIMIT} per user")
+
+    logger.info("✅ Context memory migration completed successfully!")
+
+
+def downgrade():
+    """Restore the single-column index (pruned messages are not restored)"""
+    logger.info("🔄 Rolling back context memory migration...")
+
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {OLD_INDEX_NAME} ON conversation_contexts (user_id)"))
+        conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        conn.commit()
+
+    logger.info("✅ Rollback completed successfully!")
+
+
+def verify():
+    """Verify the composite index exists"""
+    logger.info("🔍 Verifying migration...")
+
+    if INDEX_NAME not in _index_names():
+        logger.error(f"❌ Migration verification FAILED! Missing index: {INDEX_NAME}")
+        return False
+
+    logger.info("✅ Migration verification PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Context Memory Migration')
+    parser.add_argument('action', choices=['upgrade', 'downgrade', 'verify'],
+                       help='Migration action to perform')
+
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'upgrade':
+            upgrade()
+            verify()
+        elif args.action == 'downgrade':
+            downgrade()
+        elif args.action == 'verify':
+            success = verify()
+            sys.exit(0 if success else 1)
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+        sys.exit(1)
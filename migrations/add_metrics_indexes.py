@@ -0,0 +1,93 @@
+"""
+Database Migration: Covering index for admin metrics
+Migration Date: Oct 18, 2026
+
+Changes:
+- Add ix_users_metrics_covering on the 10 columns read by
+  MetricsCalculationService._aggregate_users (defined on the User model)
+
+The metrics query is a single conditional-aggregation pass; with this index
+SQLite answers it with "SCAN users USING COVERING INDEX" instead of reading
+every (wide) users row. New databases get the index from create_all().
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from bot.utils.database import engine, User
+from loguru import logger
+
+INDEX_NAME = "ix_users_metrics_covering"
+
+
+def _metrics_index():
+    return next(index for index in User.__table__.indexes if index.name == INDEX_NAME)
+
+
+def upgrade():
+    """Create the covering index (no-op if it exists)"""
+    logger.info("🔄 Starting metrics index migration...")
+    
+    existing = [index['name'] for index in inspect(engine).get_indexes('users')]
+    if INDEX_NAME in existing:
+        logger.info(f"⏭️ {INDEX_NAME} already exists")
+        return
+    
+    logger.info(f"➕ Creating {INDEX_NAME}...")
+    _metrics_index().create(engine)
+    
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            # Refresh planner statistics so the new index is picked up
+            conn.execute(text("ANALYZE users"))
+            conn.commit()
+    
+    logger.info("✅ Metrics index migration completed successfully!")
+
+
+def downgrade():
+    """Drop the covering index"""
+    logger.info("🔄 Rolling back metrics index migration...")
+    
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        conn.commit()
+    
+    logger.info("✅ Rollback completed successfully!")
+
+
+def verify():
+    """Verify the index exists"""
+    logger.info("🔍 Verifying migration...")
+    
+    existing = [index['name'] for index in inspect(engine).get_indexes('users')]
+    if INDEX_NAME not in existing:
+        logger.error(f"❌ Migration verification FAILED! Missing index: {INDEX_NAME}")
+        return False
+    
+    logger.info("✅ Migration verification PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Metrics Covering Index Migration')
+    parser.add_argument('action', choices=['upgrade', 'downgrade', 'verify'],
+                       help='Migration action to perform')
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.action == 'upgrade':
+            upgrade()
+            verify()
+        elif args.action == 'downgrade':
+            downgrade()
+        elif args.action == 'verify':
+            success = verify()
+            sys.exit(0 if success else 1)
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,123 @@
+"""
+Database Migration: Per-user reminder times and minute buckets
+Migration Date: Oct 18, 2026
+
+Changes:
+- Add timezone, morning_reminder_at, evening_reminder_at (user preferences)
+- Add morning_reminder_bucket, evening_reminder_bucket (UTC minute of day)
+- Add ix_users_morning_reminder_bucket / ix_users_evening_reminder_bucket
+- Fill the buckets (bot/core/reminder_buckets.py)
+
+Daily reminders are no longer one 8:00 / 20:00 cron burst: a per-minute
+dispatcher sends each bucket at the user's local time.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from bot.utils.database import engine, User
+from loguru import logger
+
+NEW_COLUMNS = {
+    'timezone': "VARCHAR(50) DEFAULT NULL",
+    'morning_reminder_at': "VARCHAR(5) DEFAULT NULL",
+    'evening_reminder_at': "VARCHAR(5) DEFAULT NULL",
+    'morning_reminder_bucket': "INTEGER DEFAULT NULL",
+    'evening_reminder_bucket': "INTEGER DEFAULT NULL",
+}
+NEW_INDEXES = ["ix_users_morning_reminder_bucket", "ix_users_evening_reminder_bucket"]
+
+
+def upgrade():
+    """Add reminder preference/bucket columns, indexes, and assign buckets"""
+    from bot.core.reminder_buckets import assign_reminder_buckets
+
+    logger.info("🔄 Starting reminder buckets migration...")
+
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('users')]
+
+    with engine.connect() as conn:
+        for name, definition in NEW_COLUMNS.items():
+            if name in columns:
+                logger.info(f"⏭️ {name} column already exists")
+                continue
+            logger.info(f"➕ Adding {name} column...")
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {name} {definition}"))
+            conn.commit()
+            logger.info(f"✅ Added {name} column")
+
+    existing = [index['name'] for index in inspect(engine).get_indexes('users')]
+    for index in User.__table__.indexes:
+        if index.name in NEW_INDEXES and index.name not in existing:
+            logger.info(f"➕ Creating {index.name}...")
+            index.create(engine)
+
+    updated = assign_reminder_buckets()
+    logger.info(f"🕐 Assigned buckets ({updated} updates)")
+
+    logger.info("✅ Reminder buckets migration completed successfully!")
+
+
+def downgrade():
+    """Remove reminder preference/bucket columns and indexes"""
+    logger.info("🔄 Rolling back reminder buckets migration...")
+
+    with engine.connect() as conn:
+        for name in NEW_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.commit()
+        for name in NEW_COLUMNS:
+            logger.info(f"➖ Dropping {name} column...")
+            conn.execute(text(f"ALTER TABLE users DROP COLUMN IF EXISTS {name}"))
+            conn.commit()
+
+    logger.info("✅ Rollback completed successfully!")
+
+
+def verify():
+    """Verify columns, indexes and bucket assignment"""
+    logger.info("🔍 Verifying migration...")
+
+    inspector = inspect(engine)
+    columns = [col['name'] for col in inspector.get_columns('users')]
+    indexes = [index['name'] for index in inspector.get_indexes('users')]
+
+    missing = [col for col in NEW_COLUMNS if col not in columns] + [i for i in NEW_INDEXES if i not in indexes]
+    if missing:
+        logger.error(f"❌ Migration verification FAILED! Missing: {missing}")
+        return False
+
+    with engine.connect() as conn:
+        unassigned = conn.execute(text(
+            "SELECT COUNT(*) FROM users WHERE morning_reminder_bucket IS NULL OR evening_reminder_bucket IS NULL"
+        )).scalar()
+    if unassigned:
+        logger.warning(f"⚠️ {unassigned} users without reminder buckets (assigned hourly by the dispatcher)")
+
+    logger.info("✅ Migration verification PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reminder Buckets Migration')
+    parser.add_argument('action', choices=['upgrade', 'downgrade', 'verify'],
+                       help='Migration action to perform')
+
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'upgrade':
+            upgrade()
+            verify()
+        elif args.action == 'downgrade':
+            downgrade()
+        elif args.action == 'verify':
+            success = verify()
+            sys.exit(0 if success else 1)
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+        sys.exit(1)
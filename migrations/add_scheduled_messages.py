@@ -0,0 +1,94 @@
+"""
+Database Migration: scheduled_messages due queue
+Migration Date: Oct 18, 2026
+
+Changes:
+- Create scheduled_messages (+ ix_scheduled_messages_due on status, due_at)
+- Move PENDING rows from scheduled_jobs (first job store version) and drop it
+
+Program days, trial reminders and the WOW moment are claimed in batches by one
+poller (bot/services/job_store.py) instead of one JobQueue job per user per day.
+New databases get the table from create_all().
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from bot.utils.database import engine, ScheduledMessage
+from loguru import logger
+
+OLD_TABLE = "scheduled_jobs"
+
+
+def upgrade():
+    """Create scheduled_messages and carry over pending jobs"""
+    logger.info("🔄 Starting scheduled messages migration...")
+
+    ScheduledMessage.__table__.create(engine, checkfirst=True)
+
+    if OLD_TABLE not in inspect(engine).get_table_names():
+        logger.info(f"⏭️ No {OLD_TABLE} table to migrate")
+    else:
+        with engine.connect() as conn:
+            moved = conn.execute(text(f"""
+                INSERT INTO scheduled_messages (key, handler, user_id, payload, due_at, status, created_at)
+                SELECT key, handler, user_id, payload, run_at, 'PENDING', created_at
+                FROM {OLD_TABLE}
+                WHERE status = 'PENDING' AND key NOT IN (SELECT key FROM scheduled_messages)
+            """)).rowcount
+            conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+            conn.commit()
+        logger.info(f"✅ Moved {moved} pending jobs from {OLD_TABLE}")
+
+    logger.info("✅ Scheduled messages migration completed successfully!")
+
+
+def downgrade():
+    """Drop scheduled_messages (pending messages are lost)"""
+    logger.info("🔄 Rolling back scheduled messages migration...")
+
+    ScheduledMessage.__table__.drop(engine, checkfirst=True)
+
+    logger.info("✅ Rollback completed successfully!")
+
+
+def verify():
+    """Verify the table and its due index exist"""
+    logger.info("🔍 Verifying migration...")
+
+    inspector = inspect(engine)
+    if "scheduled_messages" not in inspector.get_table_names():
+        logger.error("❌ Migration verification FAILED! Missing table: scheduled_messages")
+        return False
+
+    indexes = [index['name'] for index in inspector.get_indexes('scheduled_messages')]
+    if "ix_scheduled_messages_due" not in indexes:
+        logger.error("❌ Migration verification FAILED! Missing index: ix_scheduled_messages_due")
+        return False
+
+    logger.info("✅ Migration verification PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Scheduled Messages Migration')
+    parser.add_argument('action', choices=['upgrade', 'downgrade', 'verify'],
+                       help='Migration action to perform')
+
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'upgrade':
+            upgrade()
+            verify()
+        elif args.action == 'downgrade':
+            downgrade()
+        elif args.action == 'verify':
+            success = verify()
+            sys.exit(0 if success else 1)
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,93 @@
+"""
+Database Migration: Index for the daily streak check
+Migration Date: Oct 18, 2026
+
+Changes:
+- Add ix_users_streak_check on (user_state, reminder_enabled,
+  last_transaction_date), defined on the User model
+
+check_missed_days resets broken streaks with one UPDATE filtered on exactly
+these columns; the index turns its full table scan into a range scan per
+user_state. New databases get the index from create_all().
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from bot.utils.database import engine, User
+from loguru import logger
+
+INDEX_NAME = "ix_users_streak_check"
+
+
+def _streak_index():
+    return next(index for index in User.__table__.indexes if index.name == INDEX_NAME)
+
+
+def upgrade():
+    """Create the streak check index (no-op if it exists)"""
+    logger.info("🔄 Starting streak check index migration...")
+    
+    existing = [index['name'] for index in inspect(engine).get_indexes('users')]
+    if INDEX_NAME in existing:
+        logger.info(f"⏭️ {INDEX_NAME} already exists")
+        return
+    
+    logger.info(f"➕ Creating {INDEX_NAME}...")
+    _streak_index().create(engine)
+    
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            # Refresh planner statistics so the new index is picked up
+            conn.execute(text("ANALYZE users"))
+            conn.commit()
+    
+    logger.info("✅ Streak check index migration completed successfully!")
+
+
+def downgrade():
+    """Drop the streak check index"""
+    logger.info("🔄 Rolling back streak check index migration...")
+    
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        conn.commit()
+    
+    logger.info("✅ Rollback completed successfully!")
+
+
+def verify():
+    """Verify the index exists"""
+    logger.info("🔍 Verifying migration...")
+    
+    existing = [index['name'] for index in inspect(engine).get_indexes('users')]
+    if INDEX_NAME not in existing:
+        logger.error(f"❌ Migration verification FAILED! Missing index: {INDEX_NAME}")
+        return False
+    
+    logger.info("✅ Migration verification PASSED!")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Streak Check Index Migration')
+    parser.add_argument('action', choices=['upgrade', 'downgrade', 'verify'],
+                       help='Migration action to perform')
+    
+    args = parser.parse_args()
+    
+    try:
+        if args.action == 'upgrade':
+            upgrade()
+            verify()
+        elif args.action == 'downgrade':
+            downgrade()
+        elif args.action == 'verify':
+            success = verify()
+            sys.exit(0 if success else 1)
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+        sys.exit(1)
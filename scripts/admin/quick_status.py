@@ -58,20 +58,21 @@ conn.close()
 print()
 print("=" * 60)
 
-# Check analytics
-analytics_file = Path("data/analytics/events.jsonl")
-if analytics_file.exists():
-    with open(analytics_file, 'r') as f:
-        events = f.readlines()
-        print(f"📊 Total events logged: {len(events)}")
-        
-        if len(events) > 0:
-            print("\n🔥 Recent 5 events:")
-            for line in events[-5:]:
-                import json
-                event = json.loads(line)
-                timestamp = event['timestamp'][:19]
-                print(f"  • {timestamp} - {event['event']} (user {event['user_id']})")
+# Check analytics (event index written by bot/services/event_store.py)
+analytics_index = Path("data/analytics/index.sqlite3")
+if analytics_index.exists():
+    index_conn = sqlite3.connect(str(analytics_index))
+    total = index_conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    print(f"📊 Total events logged: {total}")
+    
+    if total > 0:
+        print("\n🔥 Recent 5 events:")
+        recent = index_conn.execute(
+            "SELECT ts, event, user_id FROM events ORDER BY ts DESC, id DESC LIMIT 5"
+        ).fetchall()
+        for timestamp, event_name, user_id in reversed(recent):
+            print(f"  • {timestamp[:19]} - {event_name} (user {user_id})")
+    index_conn.close()
 else:
     print("📊 No analytics events yet")
 
@@ -0,0 +1,122 @@
+"""
+Benchmark - FAQ search: nested keyword loops vs the compiled word-trie matcher
+
+Runs a mix of real support messages against bot/knowledge/faq.json with
+  1. legacy: the old search_faq (substring check per keyword, first match wins)
+  2. compiled: FAQMatcher.search (one pass, diacritic-insensitive, ranked)
+and lists the messages where the two pick different answers. --scale repeats
+the categories with synthetic keywords, to show how each grows with FAQ size.
+
+Usage:
+    python scripts/benchmarks/bench_faq_search.py [--runs 2000] [--scale 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+from loguru import logger
+
+from bot.knowledge.faq_matcher import FAQ_FILE, FAQMatcher
+
+QUERIES = [
+    "xin chào",
+    "làm sao thêm giao dịch",
+    "lam sao them giao dich moi",
+    "6 hũ tiền là gì",
+    "số dư hũ sai rồi, kiểm tra giúp mình",
+    "cách tính roi cho khoản đầu tư cổ phiếu",
+    "app không load được, màn hình trắng",
+    "mình muốn chuyển tiền hũ NEC sang PLAY",
+    "Tôi chi tiêu nhiều quá, có cách nào quản lý không?",
+    "dong bo cham qua",
+    "cảm ơn bạn nhiều",
+    "random question xyz",
+]
+
+
+def legacy_search(faq: dict, query: str) -> dict:
+    """search_faq before the compiled matcher"""
+    query_lower = query.lower()
+    defaults = faq.get("default_responses", {})
+    for name in ("greeting", "thanks", "goodbye"):
+        if any(word in query_lower for word in defaults.get(name, [])):
+            return {"found": True, "answer": defaults.get(f"{name}_response"), "category": name}
+    for category in faq.get("categories", []):
+        for question in category.get("questions", []):
+            if any(keyword.lower() in query_lower for keyword in question.get("keywords", [])):
+                return {"found": True, "answer": question.get("answer"), "category": category.get("name")}
+    return {"found": False, "answer": None, "category": None}
+
+
+def scaled(faq: dict, factor: int) -> dict:
+    """faq with its categories repeated `factor` times, copies using non-matching keywords"""
+    categories = list(faq["categories"])
+    for copy in range(1, factor):
+        for category in faq["categories"]:
+            categories.append(dict(category, questions=[
+                dict(question, keywords=[f"{keyword} v{copy}" for keyword in question.get("keywords", [])])
+                for question in category.get("questions", [])
+            ]))
+    return dict(faq, categories=categories)
+
+
+def timed(fn, runs: int) -> float:
+    """Median microseconds per query over `runs` passes of QUERIES"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for query in QUERIES:
+            fn(query)
+        samples.append((time.perf_counter() - start) * 1_000_000 / len(QUERIES))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--scale", type=int, default=10, help="FAQ size multiplier for the scaled run")
+    args = parser.parse_args()
+    logger.remove()
+
+    with open(FAQ_FILE, "r", encoding="utf-8") as f:
+        faq = json.load(f)
+    keywords = sum(len(q.get("keywords", [])) for c in faq["categories"] for q in c.get("questions", []))
+
+    start = time.perf_counter()
+    matcher = FAQMatcher(FAQ_FILE, reload_interval=float("inf"))
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    legacy_us = timed(lambda query: legacy_search(faq, query), args.runs)
+    compiled_us = timed(matcher.search, args.runs)
+
+    print(f"FAQ: {keywords} category keywords, compiled in {compile_ms:.1f} ms")
+    print(f"{'variant':<24}{'median µs/query':>16}")
+    print(f"{'legacy loops':<24}{legacy_us:>16.1f}")
+    print(f"{'compiled matcher':<24}{compiled_us:>16.1f}")
+
+    if args.scale > 1:
+        big = scaled(faq, args.scale)
+        big_path = Path(tempfile.mkdtemp()) / "faq.json"
+        big_path.write_text(json.dumps(big, ensure_ascii=False), encoding="utf-8")
+        big_matcher = FAQMatcher(big_path, reload_interval=float("inf"))
+        print(f"\nFAQ x{args.scale}: {keywords * args.scale} category keywords")
+        print(f"{'legacy loops':<24}{timed(lambda query: legacy_search(big, query), args.runs):>16.1f}")
+        print(f"{'compiled matcher':<24}{timed(big_matcher.search, args.runs):>16.1f}")
+
+    print("\nDifferent answers (legacy -> compiled):")
+    for query in QUERIES:
+        before, after = legacy_search(faq, query)["category"], matcher.search(query)["category"]
+        if before != after:
+            print(f"  {query!r}: {before} -> {after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark - Admin metrics: ~20 COUNT/AVG queries vs one conditional-aggregation pass
+
+Builds a synthetic `users` table in a temporary SQLite file and times
+  1. legacy: one query per metric (what MetricsCalculationService used to do)
+  2. single pass: MetricsCalculationService._aggregate_users
+  3. single pass + ix_users_metrics_covering (migrations/add_metrics_indexes.py)
+and checks that legacy and single-pass results agree.
+
+Usage:
+    python scripts/benchmarks/bench_metrics_aggregation.py [--users 1000000] [--runs 3]
+
+Point --database-url at a Postgres database to run against Postgres instead
+(the julianday() duration average is SQLite-specific, as in the service).
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench_metrics_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir}/bench.db")
+
+from loguru import logger
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils.database import Base, User
+from bot.services.metrics_service import MetricsCalculationService
+
+VIP_TIERS = [None] * 90 + ["RISING_STAR"] * 7 + ["SUPER_VIP"] * 2 + ["LEGEND"]
+SUB_TIERS = ["FREE"] * 60 + ["TRIAL"] * 25 + ["PREMIUM"] * 15
+
+
+def populate(db_path: str, users: int, seed: int = 42):
+    """Bulk-insert synthetic users with plain sqlite3 (fast)"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(db_path)
+
+    def rows():
+        for user_id in range(1, users + 1):
+            created = now - timedelta(days=rng.randint(0, 365))
+            last_active = created + timedelta(days=rng.randint(0, (now - created).days or 1))
+            tier = rng.choice(SUB_TIERS)
+            started = created + timedelta(days=rng.randint(0, 30)) if tier != "FREE" else None
+            expires = started + timedelta(days=rng.choice([7, 30, 365])) if started else None
+            yield (
+                user_id, f"REF{user_id}", created, last_active, rng.random() < 0.4, rng.choice(VIP_TIERS),
+                tier, expires, started, rng.randint(0, 40), rng.randint(0, 60), rng.randint(0, 120)
+            )
+
+    conn.executemany(
+        """
+        INSERT INTO users (id, referral_code, created_at, last_active, is_free_unlocked, vip_tier,
+                           subscription_tier, subscription_expires, premium_started_at,
+                           referral_count, total_transactions, bot_chat_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows()
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_queries(db):
+    """The per-metric queries the service issued before the single-pass rewrite"""
+    now = datetime.utcnow()
+    seven, thirty, ninety = (now - timedelta(days=d) for d in (7, 30, 90))
+    free = User.is_free_unlocked == True
+    vip = User.vip_tier.isnot(None)
+    paid = User.subscription_tier.in_(['TRIAL', 'PREMIUM'])
+
+    def count(*conditions):
+        return db.query(User).filter(*conditions).count()
+
+    def avg(column, *conditions):
+        return db.query(func.avg(column)).filter(*conditions).scalar() or 0
+
+    return {
+        'free_old': count(User.created_at <= thirty, free),
+        'free_old_active': count(User.created_at <= thirty, free, User.last_active >= seven),
+        'free_avg_transactions': avg(User.total_transactions, free, User.total_transactions > 0),
+        'free_total': count(free),
+        'free_active_7d': count(free, User.last_active >= seven),
+        'free_new_this_week': count(free, User.created_at >= seven),
+        'free_avg_referrals': avg(User.referral_count, free),
+        'vip_total': count(vip),
+        'vip_active': count(vip, User.last_active >= seven),
+        'vip_with_premium': count(vip, User.subscription_tier == 'PREMIUM'),
+        'rising_star_count': count(User.vip_tier == 'RISING_STAR'),
+        'super_vip_count': count(User.vip_tier == 'SUPER_VIP'),
+        'legend_count': count(User.vip_tier == 'LEGEND'),
+        'vip_avg_referrals': avg(User.referral_count, vip),
+        'premium_avg_ai_usage': avg(User.bot_chat_count, paid, User.bot_chat_count > 0),
+        'premium_90d_total': count(User.premium_started_at <= ninety, paid),
+        'premium_90d_churned': count(User.premium_started_at <= ninety, paid, User.subscription_expires < now),
+        'premium_total': count(User.subscription_tier == 'PREMIUM'),
+        'trial_total': count(User.subscription_tier == 'TRIAL'),
+        'premium_active_7d': count(paid, User.last_active >= seven),
+    }
+
+
+def timed(fn, runs: int):
+    samples = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--database-url", default=None, help="existing database (skips synthetic data)")
+    args = parser.parse_args()
+    logger.remove()
+
+    url = args.database_url or f"sqlite:///{_tmp_dir}/metrics_{args.users}.db"
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+
+    if args.database_url is None:
+        Base.metadata.create_all(engine)
+        with engine.connect() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS ix_users_metrics_covering"))
+            conn.commit()
+        print(f"Populating {args.users:,} users ...")
+        start = time.perf_counter()
+        populate(url.replace("sqlite:///", ""), args.users)
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    service = MetricsCalculationService()
+    db = Session()
+    try:
+        legacy_ms, legacy = timed(lambda: legacy_queries(db), args.runs)
+        single_ms, stats = timed(lambda: service._aggregate_users(db), args.runs)
+
+        with engine.connect() as conn:
+            index = next(i for i in User.__table__.indexes if i.name == "ix_users_metrics_covering")
+            index.create(conn, checkfirst=True)
+            if engine.dialect.name == "sqlite":
+                conn.execute(text("ANALYZE users"))
+            conn.commit()
+        db.close()
+        db = Session()
+        indexed_ms, _ = timed(lambda: service._aggregate_users(db), args.runs)
+    finally:
+        db.close()
+
+    mismatches = [
+        key for key, value in legacy.items()
+        if abs(float(value or 0) - float(getattr(stats, key) or 0)) > 1e-6
+    ]
+
+    print(f"{'variant':<36}{'median ms':>12}")
+    print(f"{'legacy (' + str(len(legacy)) + ' queries)':<36}{legacy_ms:>12.1f}")
+    print(f"{'single pass':<36}{single_ms:>12.1f}")
+    print(f"{'single pass + covering index':<36}{indexed_ms:>12.1f}")
+    print("results match" if not mismatches else f"MISMATCH: {mismatches}")
+
+    engine.dispose()
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark - SheetsAPIClient per-call latency: new session vs shared pool
+
+Starts a local stub of the Apps Script endpoint and measures p50/p99 latency of
+SheetsAPIClient._call_api with a fresh aiohttp.ClientSession per call (old
+behaviour) and with the shared pooled session (bot/services/http_session.py).
+
+Usage:
+    python scripts/benchmarks/bench_sheets_http_pool.py [--calls 500] [--delay-ms 0]
+
+Note: the stub is plain HTTP on localhost, so only the TCP handshake is saved
+here. Against script.google.com the pool also skips the TLS handshake.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+import aiohttp
+from aiohttp import web
+
+from bot.services import sheets_api_client
+from bot.services.http_session import close_http_session
+from bot.services.sheets_api_client import SheetsAPIClient
+
+
+async def start_stub_server(delay_ms: float):
+    """Local Apps Script stub answering every action with success"""
+    async def handle(request):
+        payload = await request.json()
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000)
+        return web.json_response({"success": True, "action": payload.get("action")})
+
+    app = web.Application()
+    app.router.add_post("/exec", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/exec"
+
+
+class _FreshSessionClient(SheetsAPIClient):
+    """Old behaviour: open a brand-new ClientSession for every call"""
+
+    async def _call_api(self, action, data=None):
+        payload = {"action": action, "spreadsheet_id": self.spreadsheet_id}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(self.api_url, json=payload) as response:
+                return await response.json()
+
+
+async def measure(client: SheetsAPIClient, calls: int) -> list:
+    """Return per-call latencies in milliseconds"""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = await client._call_api("getCategories")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result.get("success"), result
+    return latencies
+
+
+def report(label: str, latencies: list):
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{label:<22} p50={p50:7.3f} ms   p99={p99:7.3f} ms   n={len(ordered)}")
+
+
+async def main(calls: int, delay_ms: float):
+    runner, url = await start_stub_server(delay_ms)
+    sheets_api_client.logger.disabled = True
+    try:
+        before = await measure(_FreshSessionClient("bench" * 5, url), calls)
+        after = await measure(SheetsAPIClient("bench" * 5, url), calls)
+    finally:
+        await close_http_session()
+        await runner.cleanup()
+
+    print("=" * 60)
+    print(f"SheetsAPIClient._call_api latency ({calls} calls, stub delay {delay_ms} ms)")
+    print("=" * 60)
+    report("before (new session)", before)
+    report("after (shared pool)", after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--delay-ms", type=float, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.delay_ms))
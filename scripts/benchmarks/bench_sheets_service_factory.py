@@ -0,0 +1,96 @@
+"""
+Benchmark - Sheets v4 service setup: per-command build vs shared factory
+
+Measures what `get_user_sheets_reader` pays before the first API request:
+the old path loaded the service-account file and parsed the discovery
+document on every command; the factory (bot/services/sheets_service.py)
+does both once per process.
+
+No network is used: a throwaway service-account key is generated locally.
+
+Usage:
+    python scripts/benchmarks/bench_sheets_service_factory.py [--commands 200]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "benchmark")
+
+import rsa
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+from loguru import logger
+
+SHEET_ID = "b" * 44
+
+
+def write_fake_service_account(directory: str) -> str:
+    """Service-account JSON with a freshly generated key (never sent anywhere)"""
+    _, private_key = rsa.newkeys(2048)
+    info = {
+        "type": "service_account",
+        "project_id": "benchmark",
+        "private_key_id": "benchmark",
+        "private_key": private_key.save_pkcs1().decode(),
+        "client_email": "bench@benchmark.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+    path = os.path.join(directory, "service_account.json")
+    with open(path, "w") as f:
+        json.dump(info, f)
+    return path
+
+
+def old_reader_setup(creds_path: str, scopes):
+    """What SheetsReader._initialize_service did before the factory"""
+    creds = Credentials.from_service_account_file(creds_path, scopes=scopes)
+    return build('sheets', 'v4', credentials=creds)
+
+
+def measure(fn, n: int):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--commands", type=int, default=200, help="simulated commands per variant")
+    args = parser.parse_args()
+    logger.remove()  # keep per-command log lines out of the timings
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["GOOGLE_SHEETS_CREDENTIALS"] = write_fake_service_account(tmp)
+
+        from bot.services.sheets_reader import SheetsReader
+        from bot.services.sheets_service import get_sheets_service
+
+        creds_path = os.environ["GOOGLE_SHEETS_CREDENTIALS"]
+
+        start = time.perf_counter()
+        get_sheets_service(SheetsReader.SCOPES)
+        startup_ms = (time.perf_counter() - start) * 1000
+
+        old_p50, old_p99 = measure(lambda: old_reader_setup(creds_path, SheetsReader.SCOPES), args.commands)
+        new_p50, new_p99 = measure(lambda: SheetsReader(SHEET_ID), args.commands)
+
+    print(f"Factory startup (first build): {startup_ms:.2f} ms")
+    print(f"{'variant':<28}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'build per command (old)':<28}{old_p50:>10.3f}{old_p99:>10.3f}")
+    print(f"{'shared factory':<28}{new_p50:>10.3f}{new_p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Tests for the rate-limited, checkpointed broadcast engine
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from telegram.error import Forbidden, RetryAfter
+
+from bot.utils.database import Base, User, BroadcastJob, BroadcastDelivery
+from bot.services import broadcast as broadcast_module
+from bot.services.broadcast import BroadcastEngine, register_broadcast, resume_broadcasts
+
+
+class FakeClock:
+    """Virtual time: sleeping advances the clock instead of waiting"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += max(seconds, 0)
+        await asyncio.sleep(0)
+
+
+class FakeBot:
+    def __init__(self, clock, flood_user=None, blocked_user=None):
+        self.clock = clock
+        self.flood_user = flood_user
+        self.blocked_user = blocked_user
+        self.sent = []  # (time, chat_id)
+        self.flood_at = None
+
+    async def send_message(self, chat_id, **kwargs):
+        await asyncio.sleep(0)
+        if chat_id == self.flood_user and self.flood_at is None:
+            self.flood_at = self.clock()
+            raise RetryAfter(3)
+        if chat_id == self.blocked_user:
+            raise Forbidden("bot was blocked by the user")
+        self.sent.append((self.clock(), chat_id))
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    db = factory()
+    db.add_all([
+        User(id=i, referral_code=f"R{i}", user_state="VIP" if i % 5 else "REGISTERED", reminder_enabled=True)
+        for i in range(1, 251)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+
+def _engine(session_factory, bot, clock, **kwargs):
+    return BroadcastEngine(bot, session_factory=session_factory, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def _message(user):
+    return {"text": f"hi {user.id}"}
+
+
+@pytest.mark.asyncio
+async def test_streams_users_in_keyset_chunks(session_factory):
+    clock = FakeClock()
+    bot = FakeBot(clock, blocked_user=9)
+    selects = []
+    event.listen(
+        session_factory.kw["bind"], "before_cursor_execute",
+        lambda conn, cursor, sql, *args: selects.append(sql) if sql.lstrip().startswith("SELECT") else None
+    )
+
+    stats = await _engine(session_factory, bot, clock, rate=1000, chunk_size=50).broadcast(
+        "test", [User.user_state == "VIP"], _message, on_delivered={"reminder_enabled": False}
+    )
+
+    assert (stats["total"], stats["sent"], stats["blocked"], stats["chunks"]) == (200, 199, 1, 4)
+    assert sorted(chat_id for _, chat_id in bot.sent) == [i for i in range(1, 251) if i % 5 and i != 9]
+    assert len(selects) == 5 and all("users.id > ?" in sql and "LIMIT" in sql for sql in selects)  # 4 chunks + empty tail
+
+    db = session_factory()
+    still_enabled = {u.id for u in db.query(User).filter(User.user_state == "VIP", User.reminder_enabled == True)}
+    db.close()
+    assert still_enabled == {9}
+
+
+@pytest.mark.asyncio
+async def test_respects_send_rate(session_factory):
+    clock = FakeClock()
+    bot = FakeBot(clock)
+
+    stats = await _engine(session_factory, bot, clock, rate=20, concurrency=10, chunk_size=64).broadcast(
+        "test", [User.user_state == "VIP"], _message
+    )
+
+    assert stats["sent"] == 200
+    assert stats["duration"] >= (200 - 20) / 20  # Initial burst = one second of tokens
+    times = [t for t, _ in bot.sent]
+    for t in times:
+        assert sum(1 for other in times if t <= other < t + 1) <= 20 + 20
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_all_senders(session_factory):
+    clock = FakeClock()
+    bot = FakeBot(clock, flood_user=7)
+
+    stats = await _engine(session_factory, bot, clock, rate=50, concurrency=10).broadcast(
+        "test", [User.user_state == "VIP"], _message
+    )
+
+    assert (stats["sent"], stats["retry_after"], stats["failed"]) == (200, 1, 0)
+    assert not [t for t, _ in bot.sent if bot.flood_at < t < bot.flood_at + 3]
+    assert 7 in [chat_id for _, chat_id in bot.sent]
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_without_double_sends(session_factory):
+    clock = FakeClock()
+    first = FakeBot(clock)
+    engine = _engine(session_factory, first, clock, rate=1000, chunk_size=50)
+    task = asyncio.ensure_future(engine.broadcast("test", [User.user_state == "VIP"], _message, job_key="test:1"))
+
+    original_send = first.send_message
+
+    async def send_then_crash(chat_id, **kwargs):
+        await original_send(chat_id, **kwargs)
+        if len(first.sent) == 70:  # Mid second chunk
+            task.cancel()
+    first.send_message = send_then_crash
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    db = session_factory()
+    job = db.query(BroadcastJob).filter(BroadcastJob.key == "test:1").one()
+    assert job.status == "RUNNING" and 0 < job.cursor < 250
+    db.close()
+
+    second = FakeBot(clock)
+    stats = await _engine(session_factory, second, clock, rate=1000, chunk_size=50).broadcast(
+        "test", [User.user_state == "VIP"], _message, job_key="test:1"
+    )
+
+    deliveries = Counter(chat_id for _, chat_id in first.sent + second.sent)
+    assert max(deliveries.values()) == 1
+    assert set(deliveries) == {i for i in range(1, 251) if i % 5}
+    assert stats["sent"] == 200
+
+    db = session_factory()
+    assert db.query(BroadcastJob).filter(BroadcastJob.key == "test:1").one().status == "DONE"
+    assert db.query(BroadcastDelivery).count() == 0
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_finished_job_key_is_not_sent_again(session_factory):
+    clock = FakeClock()
+    bot = FakeBot(clock)
+    engine = _engine(session_factory, bot, clock, rate=1000)
+
+    first = await engine.broadcast("test", [User.user_state == "VIP"], _message, job_key="test:day")
+    again = await engine.broadcast("test", [User.user_state == "VIP"], _message, job_key="test:day")
+
+    assert len(bot.sent) == 200
+    assert again["sent"] == first["sent"] == 200
+
+
+@pytest.mark.asyncio
+async def test_resume_broadcasts_abandons_stale_runs(session_factory, monkeypatch):
+    monkeypatch.setattr(broadcast_module, "_registry", {})
+    clock = FakeClock()
+    bot = FakeBot(clock)
+    register_broadcast("test", lambda: {"criteria": [User.user_state == "VIP"], "build_message": _message})
+
+    db = session_factory()
+    db.add_all([
+        BroadcastJob(key="test:fresh", name="test", status="RUNNING", cursor=100, started_at=datetime.utcnow()),
+        BroadcastJob(key="test:stale", name="test", status="RUNNING", started_at=datetime.utcnow() - timedelta(hours=12)),
+    ])
+    db.commit()
+    db.close()
+
+    resumed = await resume_broadcasts(
+        bot, session_factory=session_factory, max_age=timedelta(hours=6), clock=clock, sleep=clock.sleep
+    )
+    assert resumed == 1
+    await asyncio.gather(*broadcast_module._resumed)
+
+    assert sorted(chat_id for _, chat_id in bot.sent) == [i for i in range(101, 251) if i % 5]
+    db = session_factory()
+    assert {j.key: j.status for j in db.query(BroadcastJob)} == {"test:fresh": "DONE", "test:stale": "ABANDONED"}
+    db.close()
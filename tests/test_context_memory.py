@@ -0,0 +1,75 @@
+"""
+Tests for the bounded two-tier conversation context memory
+"""
+import pytest
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bot.ai.context import ContextMemory
+from bot.utils.database import Base, ConversationContext
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def _turn(n):
+    return [{"role": "user", "content": f"q{n}"}, {"role": "assistant", "content": f"a{n}"}]
+
+
+def _stored(session_factory, user_id):
+    db = session_factory()
+    try:
+        return db.query(func.count(ConversationContext.id)).filter(ConversationContext.user_id == user_id).scalar()
+    finally:
+        db.close()
+
+
+def test_db_tier_is_a_ring_buffer_per_user(session_factory):
+    memory = ContextMemory(session_factory, window=4, history_limit=6)
+    for n in range(10):
+        memory.add(1, _turn(n))
+    memory.add(2, _turn(0))
+
+    assert _stored(session_factory, 1) == 6 and _stored(session_factory, 2) == 2
+    # A cold reader gets the newest messages, oldest first
+    cold = ContextMemory(session_factory, window=4, history_limit=6)
+    assert [m["content"] for m in cold.get(1)] == ["q8", "a8", "q9", "a9"]
+    assert [m["content"] for m in cold.get(1, limit=6)] == ["q7", "a7", "q8", "a8", "q9", "a9"]
+
+
+def test_memory_tier_hits_without_sql_and_evicts(session_factory):
+    now = [0.0]
+    memory = ContextMemory(session_factory, window=4, max_users=2, idle_ttl=60, clock=lambda: now[0])
+    memory.add(1, _turn(0))
+
+    selects = []
+    event.listen(
+        session_factory.kw["bind"], "before_cursor_execute",
+        lambda conn, cursor, sql, *args: selects.append(sql) if sql.startswith("SELECT") else None
+    )
+    assert memory.get(1) == _turn(0)  # Miss: loaded once
+    memory.add(1, _turn(1))  # Appended to the loaded history
+    assert memory.get(1, limit=2) == _turn(1)
+    assert len(selects) == 1
+
+    # LRU bound: a third user evicts the least recently used one
+    memory.get(2)
+    memory.get(3)
+    assert memory.stats()["users"] == 2 and 1 not in memory._histories
+
+    # Idle users are evicted after idle_ttl
+    now[0] += 61
+    memory.get(4)
+    stats = memory.stats()
+    assert stats["users"] == 1 and stats["evictions"] == 3
+    assert stats["hits"] == 1 and stats["misses"] == 4
+
+    memory.clear(4)
+    assert memory.get(4) == [] and _stored(session_factory, 4) == 0
@@ -0,0 +1,117 @@
+"""
+Tests for the segmented analytics event store
+"""
+import json
+
+import pytest
+
+from bot.services.analytics import Analytics
+from bot.services.analytics_aggregator import EventAggregator, HyperLogLog
+from bot.services.event_store import EventStore
+
+
+def event(ts, name, user_id, **properties):
+    return {'timestamp': ts, 'user_id': user_id, 'event': name, 'properties': properties}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(tmp_path, background=False, max_buffer=1000)
+    yield store
+    store.close()
+
+
+def test_events_are_buffered_then_written_to_day_segments(store, tmp_path):
+    store.append(event('2026-03-01T10:00:00', 'message_sent', 1))
+    store.append(event('2026-03-02T09:00:00', 'trial_started', 1))
+
+    assert not list(tmp_path.glob('events-*.jsonl'))  # still buffered
+
+    assert store.flush() == 2
+    assert sorted(p.name for p in tmp_path.glob('events-*.jsonl')) == [
+        'events-2026-03-01.jsonl', 'events-2026-03-02.jsonl'
+    ]
+
+
+def test_query_reads_only_indexed_lines(store, tmp_path):
+    for i in range(50):
+        store.append(event(f'2026-03-01T10:00:{i:02d}', 'message_sent', i % 5))
+    store.append(event('2026-03-02T08:00:00', 'trial_started', 3, source='limit'))
+
+    trials = store.query(event_name='trial_started')
+    assert trials == [event('2026-03-02T08:00:00', 'trial_started', 3, source='limit')]
+
+    # The 2026-03-01 segment isn't needed: corrupting it doesn't affect the query
+    (tmp_path / 'events-2026-03-01.jsonl').write_text('garbage')
+    assert store.query(event_name='trial_started', user_id=3) == trials
+
+
+def test_counts_come_from_the_index(store):
+    for i in range(4):
+        store.append(event(f'2026-03-01T10:00:0{i}', 'chat_limit_hit', i))
+    store.append(event('2026-03-01T11:00:00', 'trial_started', 1))
+
+    assert store.count('chat_limit_hit') == 4
+    assert store.count(user_id=1) == 2
+    assert store.count_by_event() == {'chat_limit_hit': 4, 'trial_started': 1}
+
+
+def test_legacy_file_is_indexed_once(tmp_path):
+    legacy = [event('2025-12-31T23:00:00', 'message_sent', 7), event('2026-01-01T00:10:00', 'trial_started', 7)]
+    (tmp_path / 'events.jsonl').write_text(''.join(json.dumps(e) + '\n' for e in legacy))
+
+    store = EventStore(tmp_path, background=False)
+    assert store.query(user_id=7) == legacy
+    store.close()
+
+    reopened = EventStore(tmp_path, background=False)
+    assert reopened.count() == 2
+    reopened.close()
+
+
+def test_analytics_summary_uses_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Analytics, '_store', EventStore(tmp_path, background=False, aggregator=EventAggregator()))
+
+    for user_id in range(4):
+        Analytics.track_event(user_id, 'chat_limit_hit')
+    Analytics.track_event(1, 'trial_started')
+
+    summary = Analytics.get_summary()
+    assert summary['total_events'] == 5
+    assert summary['metrics']['trial_conversion'] == '25.0%'
+    assert len(Analytics.get_events(event_name='chat_limit_hit')) == 4
+
+
+def test_counters_are_maintained_per_day_and_tier(tmp_path):
+    store = EventStore(tmp_path, background=False, aggregator=EventAggregator())
+    store.append(event('2026-03-01T10:00:00', 'message_sent', 1, tier='PREMIUM'))
+    store.append(event('2026-03-01T11:00:00', 'message_sent', 1, tier='PREMIUM'))
+    store.append(event('2026-03-02T10:00:00', 'message_sent', 2, tier='FREE'))
+
+    assert store.counters() == {'message_sent': 3}
+    assert store.counters(day='2026-03-01') == {'message_sent': 2}
+    assert store.counters(tier='FREE') == {'message_sent': 1}
+    assert store.unique_users('message_sent') == 2
+    assert store.unique_users('message_sent', day='2026-03-01', tier='PREMIUM') == 1
+    store.close()
+
+
+def test_counters_are_backfilled_from_existing_index(tmp_path):
+    plain = EventStore(tmp_path, background=False)
+    for i in range(10):
+        plain.append(event(f'2026-03-01T10:00:0{i}', 'chat_limit_hit', i))
+    plain.close()
+
+    store = EventStore(tmp_path, background=False, aggregator=EventAggregator())
+    assert store.counters() == {'chat_limit_hit': 10}
+    assert store.unique_users('chat_limit_hit') == 10
+    store.close()
+
+
+def test_hyperloglog_estimate_is_close():
+    sketch = HyperLogLog(precision=10)
+    for user_id in range(20000):
+        sketch.add(user_id)
+        sketch.add(user_id)  # duplicates don't count
+
+    assert abs(sketch.count() - 20000) / 20000 < 0.08
@@ -0,0 +1,77 @@
+"""
+Tests for the compiled FAQ matcher
+"""
+import json
+import os
+
+from bot.knowledge.faq_matcher import FAQMatcher
+
+FAQ = {
+    "default_responses": {
+        "greeting": ["xin chào", "hi"],
+        "greeting_response": "👋 Xin chào!",
+        "thanks": ["cảm ơn"],
+        "thanks_response": "😊 Không có gì!",
+    },
+    "categories": [
+        {"id": "transactions", "name": "Giao dịch", "icon": "💰", "questions": [
+            {"keywords": ["thêm giao dịch", "làm sao thêm"], "answer": "add"},
+            {"keywords": ["xóa giao dịch"], "answer": "delete"},
+        ]},
+        {"id": "investments", "name": "Đầu tư", "icon": "📈", "questions": [
+            {"keywords": ["roi", "tính roi"], "answer": "roi"},
+        ]},
+        {"id": "general", "name": "Chung", "icon": "ℹ️", "questions": [
+            {"keywords": ["là gì", "app"], "answer": "about"},
+        ]},
+    ],
+}
+
+
+def _matcher(tmp_path, data=FAQ, **kwargs):
+    path = tmp_path / "faq.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return FAQMatcher(path, **kwargs), path
+
+
+def test_diacritic_insensitive_word_matches(tmp_path):
+    matcher, _ = _matcher(tmp_path)
+
+    assert matcher.search("Lam sao THEM giao dich?")["answer"] == "add"  # Typed without accents
+    assert matcher.search("thêm giao dich")["answer"] == "add"  # Partly accented
+    assert matcher.search("tinh ROI the nao")["answer"] == "roi"
+
+    assert not matcher.search("Tôi chi tiêu nhiều")["found"]  # "hi" inside "chi" is not a greeting
+    assert not matcher.search("xong rồi")["found"]  # Accented "rồi" is not "roi"
+    assert matcher.search("random question xyz") == {"found": False, "answer": None, "category": None, "matches": []}
+
+
+def test_all_matches_ranked_by_specificity(tmp_path):
+    matcher, _ = _matcher(tmp_path)
+
+    result = matcher.search("xin chào, làm sao thêm giao dịch trong app?")
+    assert result["answer"] == "add" and result["icon"] == "💰"
+    assert [m["category"] for m in result["matches"]] == ["Giao dịch", "greeting", "Chung"]
+    assert result["matches"][0] == {"category": "Giao dịch", "score": 26, "keywords": ["làm sao thêm", "thêm giao dịch"]}
+
+
+def test_hot_reload(tmp_path):
+    now = [0.0]
+    matcher, path = _matcher(tmp_path, reload_interval=5, clock=lambda: now[0])
+    assert not matcher.search("đồng bộ chậm")["found"]
+
+    updated = dict(FAQ, categories=FAQ["categories"] + [
+        {"id": "sync", "name": "Đồng bộ", "icon": "🔄", "questions": [{"keywords": ["đồng bộ"], "answer": "sync"}]}
+    ])
+    path.write_text(json.dumps(updated, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (1, 1))  # Distinct mtime even on coarse filesystem clocks
+
+    assert not matcher.search("đồng bộ chậm")["found"]  # Not re-checked within the interval
+    now[0] += 5
+    assert matcher.search("dong bo cham")["answer"] == "sync"
+
+    # A broken edit keeps serving the last good version
+    path.write_text("{ not json", encoding="utf-8")
+    os.utime(path, (2, 2))
+    now[0] += 5
+    assert matcher.search("đồng bộ")["answer"] == "sync"
@@ -0,0 +1,74 @@
+"""
+Tests for the shared HTTP session used by SheetsAPIClient
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from bot.services.http_session import get_http_session, close_http_session
+from bot.services.sheets_api_client import SheetsAPIClient
+
+
+@pytest_asyncio.fixture
+async def stub_api():
+    """Local Apps Script stub that records the client port of each request"""
+    peers = []
+
+    async def handle(request):
+        peers.append(request.transport.get_extra_info("peername")[1])
+        payload = await request.json()
+        return web.json_response({"success": True, "action": payload["action"]})
+
+    app = web.Application()
+    app.router.add_post("/exec", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    yield f"http://127.0.0.1:{port}/exec", peers
+
+    await close_http_session()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_session_is_shared_and_recreated_after_close():
+    """Same session is handed out until it is closed"""
+    first = get_http_session()
+    assert get_http_session() is first
+
+    await close_http_session()
+    assert first.closed
+    assert get_http_session() is not first
+    await close_http_session()
+
+
+@pytest.mark.asyncio
+async def test_clients_reuse_pooled_connection(stub_api):
+    """Calls from separate client instances go over one kept-alive connection"""
+    url, peers = stub_api
+
+    for _ in range(3):
+        client = SheetsAPIClient("x" * 44, url)
+        result = await client.ping()
+        assert result["success"] is True
+
+    assert len(peers) == 3
+    assert len(set(peers)) == 1
+
+
+def test_session_from_previous_loop_is_closed_on_replace():
+    """Switching event loops closes the old session instead of leaking it"""
+    async def grab():
+        return get_http_session()
+
+    old = asyncio.run(grab())
+    new = asyncio.run(grab())
+
+    assert old.closed
+    assert new is not old
+    asyncio.run(close_http_session())
@@ -0,0 +1,129 @@
+"""
+Tests for the scheduled_messages due-queue poller
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils.database import Base, ScheduledMessage
+from bot.services import job_store as job_store_module
+from bot.services.broadcast import TokenBucket
+from bot.services.job_store import JobStore, register_job_handler
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.once = []
+        self.repeating = []
+
+    def run_once(self, *args, **kwargs):
+        self.once.append((args, kwargs))
+
+    def run_repeating(self, callback, interval, first=None, name=None):
+        self.repeating.append(name)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File DB: concurrent pollers claim from worker threads with their own connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    monkeypatch.setattr(job_store_module, "_handlers", {})
+    sent = []
+
+    async def greet(context, user_id, day=None):
+        await asyncio.sleep(0)
+        sent.append(user_id)
+
+    async def explode(context, user_id):
+        raise RuntimeError("boom")
+
+    register_job_handler("greet", greet)
+    register_job_handler("explode", explode)
+    return sent
+
+
+def _store(session_factory, **kwargs):
+    return JobStore(session_factory, clock=lambda: NOW, limiter=TokenBucket(1_000_000), **kwargs)
+
+
+def _statuses(session_factory):
+    db = session_factory()
+    try:
+        return {job.key: job.status for job in db.query(ScheduledMessage)}
+    finally:
+        db.close()
+
+
+@pytest.mark.asyncio
+async def test_one_poller_claims_due_messages_in_batches(session_factory, sent):
+    store = _store(session_factory, batch_size=100)
+    for user_id in range(1, 251):
+        due = NOW - timedelta(minutes=user_id % 7) if user_id <= 230 else NOW + timedelta(hours=1)
+        store.schedule(f"program_{user_id}_NURTURE_7_DAY_day_1", "greet", due, user_id=user_id, day=1)
+
+    queue = FakeJobQueue()
+    store.start(queue)
+    assert queue.repeating == ["job_store_poller"] and queue.once == []  # No per-user jobs
+
+    claims = []
+    event.listen(
+        session_factory.kw["bind"], "before_cursor_execute",
+        lambda conn, cursor, sql, *args: claims.append(sql) if "SET status=?, claimed_at=?" in sql else None
+    )
+    assert await store.poll(context=None) == 230
+
+    assert sorted(sent) == list(range(1, 231))
+    assert len(claims) == 3 and all("RETURNING" in sql and "LIMIT" in sql for sql in claims)  # 100 + 100 + 30
+    assert Counter(_statuses(session_factory).values()) == {"DONE": 230, "PENDING": 20}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_pollers_never_send_twice(session_factory, sent):
+    first = _store(session_factory, batch_size=7)
+    for user_id in range(1, 101):
+        first.schedule(f"wow_moment_{user_id}", "greet", NOW, user_id=user_id)
+
+    second = _store(session_factory, batch_size=7)
+    counts = await asyncio.gather(first.poll(None), second.poll(None))
+
+    assert sum(counts) == 100
+    assert sorted(sent) == list(range(1, 101))
+
+
+@pytest.mark.asyncio
+async def test_failures_expiry_cancel_and_reschedule(session_factory, sent):
+    store = _store(session_factory, misfire_grace=timedelta(hours=24))
+    store.schedule("explode_1", "explode", NOW, user_id=1)
+    store.schedule("unknown_2", "nope", NOW, user_id=2)
+    store.schedule("too_old_3", "greet", NOW - timedelta(days=3), user_id=3)
+    store.schedule("program_4_NURTURE_7_DAY_day_1", "greet", NOW, user_id=4)
+    store.schedule("program_4_NURTURE_7_DAY_day_2", "greet", NOW, user_id=4)
+    store.schedule("program_40_NURTURE_7_DAY_day_1", "greet", NOW, user_id=40)
+    store.schedule("trial_reminder_5", "greet", NOW, user_id=5)
+    store.schedule("trial_reminder_5", "greet", NOW + timedelta(days=5), user_id=5)  # Same key: moved
+
+    assert store.cancel("program_4_") == 2
+    await store.poll(None)
+
+    assert sent == [40]
+    assert _statuses(session_factory) == {
+        "explode_1": "FAILED",
+        "unknown_2": "FAILED",
+        "too_old_3": "EXPIRED",
+        "program_4_NURTURE_7_DAY_day_1": "CANCELLED",
+        "program_4_NURTURE_7_DAY_day_2": "CANCELLED",
+        "program_40_NURTURE_7_DAY_day_1": "DONE",
+        "trial_reminder_5": "PENDING",
+    }
@@ -0,0 +1,64 @@
+"""
+Tests for the on-disk knowledge base vector index (stub embeddings)
+"""
+import zlib
+
+from bot.knowledge.embeddings import FAQ_FILE, VectorIndex, chunk_corpus
+
+
+class BagOfWords:
+    """Stub embedding: hashed word counts; records how many texts were embedded"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def __call__(self, texts):
+        self.embedded += len(texts)
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 128
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode()) % 128] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+def _docs(tmp_path, guide):
+    docs = tmp_path / "docs"
+    docs.mkdir(exist_ok=True)
+    (docs / "guide.md").write_text(guide, encoding="utf-8")
+    return docs
+
+
+def test_build_persist_and_search(tmp_path):
+    docs = _docs(tmp_path, "Hũ tiền NEC 55% dùng cho chi tiêu thiết yếu.\n\nHũ GIVE 5% dùng để cho đi.")
+    chunks = chunk_corpus(FAQ_FILE, docs, chunk_chars=60)
+    assert any(chunk["source"] == "faq.json" for chunk in chunks)
+    assert [c["id"] for c in chunks if c["source"] == "guide.md"] == ["doc:guide.md:0", "doc:guide.md:1"]
+
+    embed = BagOfWords()
+    stats = VectorIndex(tmp_path / "index", embed, model="stub", batch_size=8).build(chunks)
+    assert stats == {"chunks": len(chunks), "embedded": len(chunks), "reused": 0, "removed": 0}
+
+    # A fresh process loads the files; nothing is re-embedded
+    index = VectorIndex(tmp_path / "index", embed, model="stub")
+    assert index.load() and len(index.chunks) == len(chunks)
+    results = index.search("hũ GIVE dùng để cho đi", k=2)
+    assert len(results) == 2 and results[0]["id"] == "doc:guide.md:1"
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_reindex_embeds_only_changed_chunks(tmp_path):
+    index_dir = tmp_path / "index"
+    docs = _docs(tmp_path, "Đồng bộ chậm là bình thường.\n\nRefresh cache bằng nút 🔄.")
+    VectorIndex(index_dir, BagOfWords(), model="stub").build(chunk_corpus(FAQ_FILE, docs, chunk_chars=40))
+
+    _docs(tmp_path, "Đồng bộ chậm là bình thường.\n\nXóa cache trình duyệt rồi tải lại trang.")
+    embed = BagOfWords()
+    stats = VectorIndex(index_dir, embed, model="stub").build(chunk_corpus(FAQ_FILE, docs, chunk_chars=40))
+
+    assert embed.embedded == stats["embedded"] == 1
+    assert stats["removed"] == 1 and stats["reused"] == stats["chunks"] - 1
+    index = VectorIndex(index_dir, embed, model="stub")
+    index.load()
+    assert index.search("xóa cache trình duyệt", k=1)[0]["text"].startswith("Xóa cache")
@@ -0,0 +1,69 @@
+"""
+Tests for the atomic FREE-tier daily message counter
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from bot.core import subscription
+from bot.core.subscription import SubscriptionManager
+from bot.utils.database import Base, User
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    # File DB: concurrent increments run on worker threads with their own connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(subscription, "SessionLocal", factory)
+    return factory
+
+
+def _add_user(session_factory, **columns):
+    db = session_factory()
+    db.add(User(id=7, subscription_tier="FREE", **columns))
+    db.commit()
+    db.close()
+
+
+def _load(session_factory):
+    db = session_factory()
+    try:
+        return db.get(User, 7)
+    finally:
+        db.close()
+
+
+def test_increment_is_one_statement_and_resets_on_new_day(session_factory):
+    _add_user(session_factory, bot_chat_count=4, bot_chat_limit_date=datetime.now() - timedelta(days=1))
+    user = _load(session_factory)
+
+    statements = []
+    event.listen(
+        session_factory.kw["bind"], "before_cursor_execute",
+        lambda conn, cursor, sql, *args: statements.append(sql)
+    )
+    assert SubscriptionManager.increment_message_count(user) == 1
+    assert len(statements) == 1 and statements[0].startswith("UPDATE") and "RETURNING" in statements[0]
+
+    assert user.bot_chat_count == 1 and user.bot_chat_limit_date.date() == datetime.now().date()
+    assert _load(session_factory).bot_chat_count == 1
+
+
+def test_concurrent_increments_never_exceed_the_limit(session_factory):
+    _add_user(session_factory, bot_chat_count=0, bot_chat_limit_date=datetime.now())
+    # Every worker read the same snapshot (count 0) before any increment landed
+    users = [_load(session_factory) for _ in range(12)]
+    assert all(SubscriptionManager.can_send_message(user)[0] for user in users)
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        counts = list(pool.map(SubscriptionManager.increment_message_count, users))
+
+    limit = SubscriptionManager.FREE_DAILY_MESSAGES
+    assert sorted(count for count in counts if count is not None) == list(range(1, limit + 1))
+    assert counts.count(None) == 12 - limit
+    assert _load(session_factory).bot_chat_count == limit
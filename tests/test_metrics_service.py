@@ -0,0 +1,115 @@
+"""
+Tests for the single-pass admin metrics aggregation and metrics snapshots
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils.database import Base, User, MetricsSnapshot
+from bot.services.metrics_service import MetricsCalculationService
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    old, recent = now - timedelta(days=40), now - timedelta(days=2)
+    session.add_all([
+        # FREE: 2 old users (1 still active), 1 new user
+        User(id=1, referral_code="R1", is_free_unlocked=True, created_at=old, last_active=recent,
+             total_transactions=12, referral_count=2, subscription_tier="FREE"),
+        User(id=2, referral_code="R2", is_free_unlocked=True, created_at=old, last_active=old,
+             total_transactions=0, referral_count=4, subscription_tier="FREE"),
+        User(id=3, referral_code="R3", is_free_unlocked=True, created_at=recent, last_active=recent,
+             total_transactions=8, referral_count=0, subscription_tier="FREE"),
+        # VIP + PREMIUM, started 100 days ago and expired (churned)
+        User(id=4, referral_code="R4", vip_tier="RISING_STAR", subscription_tier="PREMIUM",
+             created_at=old, last_active=recent, referral_count=10, bot_chat_count=20,
+             premium_started_at=now - timedelta(days=100), subscription_expires=now - timedelta(days=10)),
+        # VIP on trial, inactive
+        User(id=5, referral_code="R5", vip_tier="LEGEND", subscription_tier="TRIAL",
+             created_at=old, last_active=old, referral_count=100, bot_chat_count=0),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(db):
+    """(sql, params) of every statement sent to the database"""
+    captured = []
+    listener = lambda conn, cursor, sql, params, context, many: captured.append((sql, params))
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    yield captured
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def test_all_metrics_in_one_query(db, statements):
+    service = MetricsCalculationService()
+    stats = service._aggregate_users(db)
+
+    assert len(statements) == 1
+    free = service._calculate_free_metrics(stats)
+    vip = service._calculate_vip_metrics(stats)
+    premium = service._calculate_premium_metrics(stats)
+
+    assert (free['total_users'], free['active_7d'], free['new_this_week']) == (3, 2, 1)
+    assert free['retention_30day'] == 50.0
+    assert free['transactions_per_user'] == 10.0  # (12 + 8) / 2, zero excluded
+    assert free['avg_referrals'] == 2.0
+
+    assert (vip['total_vip'], vip['active_vip'], vip['vip_with_premium']) == (2, 1, 1)
+    assert (vip['rising_star_count'], vip['super_vip_count'], vip['legend_count']) == (1, 0, 1)
+    assert vip['premium_conversion_pct'] == 50.0
+
+    assert premium['ai_usage_avg'] == 20.0
+    assert premium['churn_90day_pct'] == 100.0
+    assert (premium['total_premium'], premium['trial_users'], premium['active_7d']) == (1, 1, 1)
+    assert premium['avg_sub_duration_days'] == 90
+
+
+def test_metrics_query_scans_covering_index(db, statements):
+    MetricsCalculationService()._aggregate_users(db)
+    sql, params = statements[0]
+
+    plan = db.get_bind().raw_connection().cursor().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    assert "USING COVERING INDEX ix_users_metrics_covering" in " ".join(str(row[-1]) for row in plan)
+
+
+@pytest.fixture
+def service(db):
+    return MetricsCalculationService(session_factory=sessionmaker(bind=db.get_bind(), expire_on_commit=False))
+
+
+def test_dashboard_reads_latest_snapshot(service, statements):
+    stored = service.get_dashboard_metrics()  # No snapshot yet: calculated and stored
+    statements.clear()
+
+    metrics = service.get_dashboard_metrics()
+
+    assert len([sql for sql, _ in statements if sql.lstrip().upper().startswith("SELECT")]) == 1
+    assert "metrics_snapshots" in statements[0][0] and "users" not in statements[0][0]
+    assert metrics == stored
+    assert service.format_telegram_message(metrics)
+
+
+def test_trend_keeps_last_snapshot_per_day(service, db):
+    two_days_ago = (datetime.utcnow() - timedelta(days=2)).replace(hour=12, minute=0)
+    db.add_all([
+        MetricsSnapshot(captured_at=two_days_ago.replace(hour=8), overall_status="CRITICAL", free_retention_30day=10.0),
+        MetricsSnapshot(captured_at=two_days_ago, overall_status="WARNING", free_retention_30day=20.0),
+        MetricsSnapshot(captured_at=two_days_ago - timedelta(days=28), overall_status="HEALTHY", free_retention_30day=90.0),
+    ])
+    db.commit()
+    service.refresh_snapshot()
+
+    trend = service.get_trend(days=7)
+
+    assert [p['date'] for p in trend] == [two_days_ago.strftime('%Y-%m-%d'), datetime.utcnow().strftime('%Y-%m-%d')]
+    assert [p['overall_status'] for p in trend][0] == "WARNING"
+    assert [p['free_retention_30day'] for p in trend] == [20.0, 50.0]
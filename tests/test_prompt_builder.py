@@ -0,0 +1,76 @@
+"""
+Tests for token-budgeted prompt assembly
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from bot.ai import gpt_client as gpt_client_module
+from bot.ai.prompt_builder import PromptBuilder, count_message_tokens
+from config.settings import settings
+
+SYSTEM = "Bạn là Freedom Wallet Bot. " * 40
+
+
+def _history(turns):
+    history = []
+    for n in range(turns):
+        history.append({"role": "user", "content": f"Câu hỏi số {n} về hũ tiền và giao dịch " * 3})
+        history.append({"role": "assistant", "content": f"Trả lời số {n}: hướng dẫn từng bước " * 8})
+    return history
+
+
+def test_history_is_trimmed_to_the_tier_budget(monkeypatch):
+    monkeypatch.setattr(settings, "AI_CONTEXT_BUDGET_FREE", 400)
+    monkeypatch.setattr(settings, "AI_CONTEXT_BUDGET_PREMIUM", 4000)
+    builder = PromptBuilder(SYSTEM)
+    history = _history(10)
+
+    free = builder.build("Làm sao thêm giao dịch?", history, "FREE")
+    premium = builder.build("Làm sao thêm giao dịch?", history, "TRIAL")
+
+    # Stable prefix: the system prompt always leads, unchanged
+    assert free["messages"][0] == premium["messages"][0] == {"role": "system", "content": SYSTEM}
+    assert free["messages"][-1] == {"role": "user", "content": "Làm sao thêm giao dịch?"}
+
+    assert free["max_tokens"] == settings.AI_REPLY_MAX_TOKENS_FREE
+    assert premium["max_tokens"] == settings.OPENAI_MAX_TOKENS
+    assert 0 < free["history_used"] < premium["history_used"] == len(history)
+    assert free["messages"][-1 - free["history_used"]:-1] == history[-free["history_used"]:]  # Newest turns kept
+    assert free["prompt_tokens"] == count_message_tokens(free["messages"])
+    assert free["prompt_tokens"] - builder.system_tokens <= 400
+
+    # Trimmed turns survive as the user's earlier questions
+    summary = free["messages"][1]
+    assert summary["role"] == "system" and "Câu hỏi số" in summary["content"]
+    assert premium["history_dropped"] == 0 and premium["messages"][1] == history[0]
+
+
+@pytest.mark.asyncio
+async def test_chat_records_tokens_in_and_out(monkeypatch):
+    calls, events = [], []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="📝 Click nút + Thêm"))],
+            usage=SimpleNamespace(prompt_tokens=812, completion_tokens=35)
+        )
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(gpt_client_module, "AsyncOpenAI", lambda api_key: fake)
+    monkeypatch.setattr(gpt_client_module, "get_response_cache", lambda: None)
+    monkeypatch.setattr(
+        gpt_client_module.Analytics, "track_event",
+        staticmethod(lambda user_id, name, properties=None: events.append((user_id, name, properties)))
+    )
+
+    client = gpt_client_module.GPTClient()
+    assert await client.chat("Làm sao thêm giao dịch?", _history(2), user_id=9, tier="FREE") == "📝 Click nút + Thêm"
+
+    assert calls[0]["max_tokens"] == settings.AI_REPLY_MAX_TOKENS_FREE
+    assert calls[0]["messages"][0]["content"] == gpt_client_module.SYSTEM_PROMPT
+    (user_id, name, properties), = events
+    assert (user_id, name) == (9, "ai_request")
+    assert properties["prompt_tokens"] == 812 and properties["completion_tokens"] == 35
+    assert properties["cached_tokens"] is None and properties["latency_ms"] >= 0
@@ -0,0 +1,147 @@
+"""
+Tests for the batched registration sheet exporter
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from gspread.exceptions import APIError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bot.utils.database import Base, PendingRegistrationExport
+from bot.services.registration_exporter import RegistrationExporter, _WriteRateLimiter
+
+
+def row(user_id, plan="FREE"):
+    return ["2026-01-01 00:00:00", str(user_id), "", f"User {user_id}", "", "", plan, "", "0", "BOT", "ACTIVE", ""]
+
+
+class FakeWorksheet:
+    """Registration sheet stub: header + existing rows, records API calls"""
+
+    def __init__(self, user_ids=()):
+        self.rows = [["📅 Ngày đăng ký", "User ID"]] + [row(uid) for uid in user_ids]
+        self.calls = []
+        self.fail_with = None
+
+    def col_values(self, col):
+        self.calls.append("col_values")
+        return [r[col - 1] for r in self.rows]
+
+    def batch_update(self, updates):
+        self.calls.append("batch_update")
+        for update in updates:
+            n = int(update["range"].split(":")[0][1:])
+            self.rows[n - 1] = update["values"][0]
+
+    def append_rows(self, rows):
+        self.calls.append("append_rows")
+        if self.fail_with:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        self.rows.extend(rows)
+
+
+def quota_error():
+    response = SimpleNamespace(status_code=429, text="Quota exceeded", json=lambda: {"error": {"code": 429}})
+    return APIError(response)
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def make_exporter(session_factory, worksheet, **kwargs):
+    options = dict(batch_window=0.05, retry_base=0.01, max_attempts=3, writes_per_minute=100)
+    options.update(kwargs)
+    return RegistrationExporter(session_factory=session_factory, worksheet_factory=lambda: worksheet, **options)
+
+
+def outbox(session_factory):
+    db = session_factory()
+    try:
+        return db.query(PendingRegistrationExport).all()
+    finally:
+        db.close()
+
+
+@pytest.mark.asyncio
+async def test_burst_is_appended_in_one_request(session_factory):
+    sheet = FakeWorksheet()
+    exporter = make_exporter(session_factory, sheet)
+
+    for user_id in range(1, 21):
+        await exporter.enqueue(user_id, row(user_id))
+    await asyncio.sleep(0.2)
+
+    assert sheet.calls == ["col_values", "append_rows"]
+    assert [r[1] for r in sheet.rows[1:]] == [str(i) for i in range(1, 21)]
+    assert outbox(session_factory) == []
+
+
+@pytest.mark.asyncio
+async def test_existing_users_are_updated_and_duplicates_coalesced(session_factory):
+    sheet = FakeWorksheet(user_ids=[7])
+    exporter = make_exporter(session_factory, sheet)
+
+    await exporter.enqueue(7, row(7, plan="PREMIUM"))
+    await exporter.enqueue(8, row(8))
+    await exporter.enqueue(8, row(8, plan="PREMIUM"))
+    await asyncio.sleep(0.2)
+
+    assert sheet.calls == ["col_values", "batch_update", "append_rows"]
+    assert [(r[1], r[6]) for r in sheet.rows[1:]] == [("7", "PREMIUM"), ("8", "PREMIUM")]
+
+
+@pytest.mark.asyncio
+async def test_quota_error_is_retried(session_factory):
+    sheet = FakeWorksheet()
+    sheet.fail_with = quota_error()
+    exporter = make_exporter(session_factory, sheet)
+
+    await exporter.enqueue(1, row(1))
+    await asyncio.sleep(0.3)
+
+    assert exporter.stats["retries"] == 1
+    assert [r[1] for r in sheet.rows[1:]] == ["1"]
+    assert outbox(session_factory) == []
+
+
+@pytest.mark.asyncio
+async def test_restore_resends_rows_from_previous_run(session_factory):
+    db = session_factory()
+    db.add(PendingRegistrationExport(user_id=5, row_data=json.dumps(row(5)), status="SENDING"))
+    db.commit()
+    db.close()
+
+    sheet = FakeWorksheet()
+    exporter = make_exporter(session_factory, sheet)
+    assert await exporter.restore() == 1
+    await asyncio.sleep(0.2)
+
+    assert [r[1] for r in sheet.rows[1:]] == ["5"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_waits_for_window():
+    now = [0.0]
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = _WriteRateLimiter(per_minute=2, clock=lambda: now[0], sleep=fake_sleep)
+
+    await limiter.acquire()
+    now[0] = 10
+    await limiter.acquire()
+    await limiter.acquire()
+
+    assert sleeps == [50]
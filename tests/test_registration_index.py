@@ -0,0 +1,136 @@
+"""
+Tests for the local web-registration index (WEB_<code> deep links)
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bot.utils.database import Base
+from bot.utils.registration_index import RegistrationIndex
+
+HEADERS = ['📅 Ngày đăng ký', 'Họ & Tên', '📧 Email', '👤 Điện thoại', '🔗 Link giới thiệu', '👥 Số người đã giới thiệu']
+
+
+def registration(code, name, referrals='0'):
+    return ['2026-01-01', name, f'{name.lower()}@example.com', '0901234567', code, referrals]
+
+
+class FakeWorksheet:
+    """gspread Worksheet stub recording which read calls were made"""
+
+    title = "FreedomWallet_Registrations"
+
+    def __init__(self, rows):
+        self.values = [HEADERS] + rows
+        self.calls = []
+        self.modified = "2026-01-01T00:00:00Z"
+        self.spreadsheet = SimpleNamespace(id="r" * 44, get_lastUpdateTime=lambda: self.modified)
+
+    def touch(self):
+        self.modified = datetime.utcnow().isoformat()
+
+    def get_all_values(self):
+        self.calls.append("get_all_values")
+        return [list(r) for r in self.values]
+
+    def get_values(self, range_name):
+        self.calls.append(f"get_values {range_name}")
+        first_row = int(range_name.split(':')[0][1:])
+        return [list(r) for r in self.values[first_row - 1:]]
+
+    def row_values(self, row):
+        self.calls.append(f"row_values {row}")
+        return list(self.values[row - 1])
+
+    def find(self, query, in_column=None):
+        self.calls.append(f"find {query}")
+        for row_number, row in enumerate(self.values, start=1):
+            if query in (row if in_column is None else row[in_column - 1:in_column]):
+                return SimpleNamespace(row=row_number, col=in_column)
+        return None
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def index():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return RegistrationIndex(
+        session_factory=sessionmaker(bind=engine, expire_on_commit=False),
+        refresh_interval=60,
+        clock=Clock()
+    )
+
+
+def test_lookup_after_initial_build(index):
+    sheet = FakeWorksheet([registration('ABC123', 'An'), registration('XYZ789', 'Binh', '3')])
+
+    assert index.refresh(sheet) == 2
+    user = index.lookup(sheet.spreadsheet.id, 'XYZ789')
+
+    assert user['full_name'] == 'Binh'
+    assert user['phone'] == '0901234567'  # raw string, leading zero kept
+    assert user['referral_count'] == 3
+    assert index.lookup(sheet.spreadsheet.id, 'NOPE') is None
+
+
+def test_appended_rows_are_fetched_incrementally(index):
+    sheet = FakeWorksheet([registration('ABC123', 'An')])
+    index.refresh(sheet)
+
+    sheet.values.append(registration('NEW001', 'Chi'))
+    sheet.touch()
+    index.clock.now += timedelta(seconds=61)
+    sheet.calls.clear()
+
+    assert index.refresh(sheet) == 1
+    assert sheet.calls == ["get_values A3:F"]
+    assert index.lookup(sheet.spreadsheet.id, 'NEW001')['full_name'] == 'Chi'
+
+
+def test_unchanged_sheet_and_throttle_skip_reads(index):
+    sheet = FakeWorksheet([registration('ABC123', 'An')])
+    index.refresh(sheet)
+    sheet.calls.clear()
+
+    index.refresh(sheet)  # within interval
+    index.clock.now += timedelta(seconds=61)
+    index.refresh(sheet)  # same modifiedTime
+
+    assert sheet.calls == []
+
+
+def test_in_place_edit_triggers_rebuild(index):
+    sheet = FakeWorksheet([registration('ABC123', 'An', '0')])
+    index.refresh(sheet)
+
+    sheet.values[1] = registration('ABC123', 'An', '2')
+    sheet.touch()
+    index.clock.now += timedelta(seconds=61)
+    index.refresh(sheet)
+
+    assert index.lookup(sheet.spreadsheet.id, 'ABC123')['referral_count'] == 2
+
+
+def test_find_fallback_indexes_the_match(index):
+    sheet = FakeWorksheet([registration('ABC123', 'An')])
+    index.refresh(sheet)
+    sheet.values.append(registration('LATE01', 'Dung'))  # before the next refresh window
+
+    user = index.find_in_sheet(sheet, 'LATE01')
+
+    assert user['full_name'] == 'Dung'
+    assert "get_all_values" not in sheet.calls[1:]
+    assert index.lookup(sheet.spreadsheet.id, 'LATE01')['full_name'] == 'Dung'
+    assert index.find_in_sheet(sheet, 'MISSING') is None
@@ -0,0 +1,112 @@
+"""
+Tests for timezone-aware reminder buckets and the per-minute dispatcher
+"""
+import asyncio
+from collections import Counter
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils.database import Base, User
+from bot.core.reminder_buckets import utc_minute, assign_reminder_buckets, ReminderBucketDispatcher
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File DB, one connection per thread: buckets broadcast concurrently (StaticPool would share one transaction)
+    engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def _add_users(session_factory, *users):
+    db = session_factory()
+    db.add_all(users)
+    db.commit()
+    db.close()
+
+
+def _buckets(session_factory):
+    db = session_factory()
+    try:
+        return {u.id: (u.morning_reminder_bucket, u.evening_reminder_bucket) for u in db.query(User)}
+    finally:
+        db.close()
+
+
+def test_utc_minute_follows_timezone_and_dst():
+    assert utc_minute("08:00", "Asia/Ho_Chi_Minh") == 60  # UTC+7
+    assert utc_minute("08:00", None) == 60  # DEFAULT_TIMEZONE
+    assert utc_minute("08:00", "America/New_York", date(2026, 1, 15)) == 13 * 60
+    assert utc_minute("08:00", "America/New_York", date(2026, 7, 15)) == 12 * 60
+    assert utc_minute("06:30", "Asia/Kolkata") == 60  # UTC+5:30
+
+
+def test_buckets_spread_users_after_their_local_time(session_factory):
+    _add_users(session_factory, *[User(id=i, referral_code=f"R{i}") for i in range(1, 101)])
+    _add_users(
+        session_factory,
+        User(id=101, referral_code="R101", timezone="Europe/London", morning_reminder_at="07:00"),
+        User(id=102, referral_code="R102", timezone="Not/AZone", evening_reminder_at="21:15"),
+    )
+
+    assign_reminder_buckets(session_factory, spread=20)
+    buckets = _buckets(session_factory)
+
+    morning = Counter(buckets[i][0] for i in range(1, 101))
+    assert sorted(morning) == list(range(60, 80))  # 08:00 +07 -> 01:00 UTC, spread over 20 minutes
+    assert set(morning.values()) == {5}
+    assert {buckets[i][1] for i in range(1, 101)} == set(range(13 * 60, 13 * 60 + 20))
+    assert buckets[101][0] == utc_minute("07:00", "Europe/London") + 101 % 20
+    assert buckets[102] == (60 + 102 % 20, 14 * 60 + 15 + 102 % 20)  # Unknown zone -> default
+
+
+def test_only_missing_keeps_existing_buckets(session_factory):
+    _add_users(
+        session_factory,
+        User(id=1, referral_code="R1", morning_reminder_bucket=5, evening_reminder_bucket=6),
+        User(id=2, referral_code="R2"),
+    )
+
+    assert assign_reminder_buckets(session_factory, only_missing=True, spread=1) == 2  # morning + evening of user 2
+    assert _buckets(session_factory) == {1: (5, 6), 2: (60, 780)}
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, **kwargs):
+        self.sent.append(chat_id)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_sends_only_due_buckets(session_factory):
+    _add_users(session_factory, *[
+        User(id=i, referral_code=f"R{i}", user_state="VIP", reminder_enabled=True) for i in range(1, 61)
+    ])
+    assign_reminder_buckets(session_factory, spread=20)  # Morning buckets 60..79 (01:00-01:19 UTC)
+
+    now = datetime(2026, 10, 18, 1, 5, 30)
+    bot = FakeBot()
+    dispatcher = ReminderBucketDispatcher(
+        bot, session_factory=session_factory, catchup_minutes=5, clock=lambda: now, rate=10_000
+    )
+
+    started = await dispatcher.tick()
+    await dispatcher.drain()
+
+    assert started == [f"morning_reminder:2026-10-18:{bucket:04d}" for bucket in range(60, 66)]
+    assert sorted(bot.sent) == sorted(i for i in range(1, 61) if i % 20 <= 5)
+
+    # Same minute again: nothing new is due
+    assert await dispatcher.tick() == []
+
+    # Next minute: only bucket 66
+    now = datetime(2026, 10, 18, 1, 6, 2)
+    bot.sent.clear()
+    assert await dispatcher.tick() == ["morning_reminder:2026-10-18:0066"]
+    await dispatcher.drain()
+    assert sorted(bot.sent) == [6, 26, 46]
@@ -0,0 +1,91 @@
+"""
+Tests for the semantic AI response cache (stub embeddings, no model download)
+"""
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from bot.ai import gpt_client as gpt_client_module
+from bot.ai.response_cache import ResponseCache, normalize_question
+
+ANSWER = "📝 **Cách Thêm Giao Dịch**\n1️⃣ Click nút **+ Thêm**"
+
+
+def bag_of_words(texts):
+    """Stub embedding: hashed word counts (paraphrases sharing words are close)"""
+    vectors = []
+    for text in texts:
+        vector = [0.0] * 64
+        for word in text.split():
+            vector[zlib.crc32(word.encode()) % 64] += 1.0
+        vectors.append(vector)
+    return vectors
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        return bag_of_words(texts)
+
+
+def test_exact_and_similar_questions_hit():
+    embed = CountingEmbedder()
+    cache = ResponseCache(embed=embed, threshold=0.8, ttl=60, max_entries=10, min_chars=8)
+    cache.put("Làm sao thêm giao dịch mới trong app?", ANSWER)
+
+    # Normalized repeat: served without embedding the question
+    calls = embed.calls
+    assert cache.get("  làm sao THÊM giao dịch mới trong app!! ") == ANSWER
+    assert embed.calls == calls
+
+    assert cache.get("làm sao để thêm giao dịch mới trong app") == ANSWER  # Paraphrase
+    assert cache.get("Tại sao số dư của tôi bị sai?") is None  # Different question
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    assert stats["top_questions"] == [(normalize_question("Làm sao thêm giao dịch mới trong app?"), 2)]
+
+
+def test_ttl_lru_and_short_follow_ups():
+    now = [0.0]
+    cache = ResponseCache(embed=bag_of_words, threshold=0.8, ttl=60, max_entries=2, min_chars=12, clock=lambda: now[0])
+
+    cache.put("còn cái kia?", "...")
+    assert cache.stats()["entries"] == 0  # Follow-up depends on the conversation
+
+    cache.put("cách thêm giao dịch", "a1")
+    cache.put("cách xóa giao dịch", "a2")
+    cache.get("cách thêm giao dịch")
+    cache.put("cách sửa giao dịch", "a3")  # Evicts the least recently used ("xóa")
+    assert cache.get("cách xóa giao dịch") is None
+
+    now[0] += 61
+    assert cache.get("cách thêm giao dịch") is None and cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_skips_openai(monkeypatch):
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=ANSWER))],
+            usage=SimpleNamespace(prompt_tokens=812, completion_tokens=35)
+        )
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    cache = ResponseCache(embed=bag_of_words, threshold=0.8, ttl=60, max_entries=10, min_chars=8)
+    monkeypatch.setattr(gpt_client_module, "AsyncOpenAI", lambda api_key: fake)
+    monkeypatch.setattr(gpt_client_module, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(gpt_client_module.Analytics, "track_event", staticmethod(lambda *args, **kwargs: None))
+
+    client = gpt_client_module.GPTClient()
+    assert await client.chat("Làm sao thêm giao dịch mới?", user_id=1) == ANSWER
+    assert await client.chat("làm sao thêm giao dịch mới", user_id=2) == ANSWER
+
+    assert len(calls) == 1
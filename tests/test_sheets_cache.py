@@ -0,0 +1,247 @@
+"""
+Tests for the process-wide Sheets response cache
+"""
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+
+from bot.services import sheets_api_client, sheets_cache
+from bot.services.sheets_cache import MemorySheetsCache, RedisSheetsCache, get_sheets_cache
+from bot.services.sheets_api_client import SheetsAPIClient
+
+SHEET_ID = "s" * 44
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_cache():
+    """Start every test with an empty shared cache and no in-flight reads"""
+    await get_sheets_cache().clear()
+    sheets_api_client._inflight_reads.clear()
+    yield
+    await get_sheets_cache().clear()
+    sheets_api_client._inflight_reads.clear()
+
+
+class FakeClock:
+    """Manually advanced clock injected into the cache (never patches global time)"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def api_calls(monkeypatch):
+    """Stub _call_api and record the actions sent upstream"""
+    calls = []
+
+    async def fake_call_api(self, action, data=None):
+        calls.append(action)
+        return {"success": True, "action": action}
+
+    monkeypatch.setattr(SheetsAPIClient, "_call_api", fake_call_api)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used():
+    cache = MemorySheetsCache(max_entries=2, ttl=60)
+    await cache.set("a", "getBalance", {"v": 1})
+    await cache.set("b", "getBalance", {"v": 2})
+    await cache.get_entry("a", "getBalance")
+    await cache.set("c", "getBalance", {"v": 3})
+
+    assert await cache.get_entry("b", "getBalance") is None
+    assert (await cache.get_entry("a", "getBalance"))[0] == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_go_stale_then_expire():
+    clock = FakeClock()
+    cache = MemorySheetsCache(max_entries=10, ttl=5, max_age=30, clock=clock)
+
+    await cache.set("a", "getCategories", {"v": 1})
+    clock.now += 4
+    assert await cache.get_entry("a", "getCategories") == ({"v": 1}, 4)
+    clock.now += 2
+    assert await cache.get_entry("a", "getCategories") == ({"v": 1}, 6)
+    clock.now += 30
+    assert await cache.get_entry("a", "getCategories") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_shared_across_client_instances(api_calls):
+    await SheetsAPIClient(SHEET_ID).get_categories()
+    await SheetsAPIClient(SHEET_ID).get_categories()
+    await SheetsAPIClient("t" * 44).get_categories()
+
+    assert api_calls == ["getCategories", "getCategories"]
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_balance_only(api_calls):
+    client = SheetsAPIClient(SHEET_ID)
+    await client.get_balance()
+    await client.get_categories()
+
+    await SheetsAPIClient(SHEET_ID).add_transaction(amount=50000, category="Ăn uống")
+    await client.get_balance()
+    await client.get_categories()
+
+    await client.add_transactions([{"amount": 1}])
+    await client.get_balance()
+
+    assert api_calls == [
+        "getBalance", "getCategories",
+        "addTransaction", "getBalance",
+        "addTransactions", "getBalance",
+    ]
+
+
+@pytest.fixture
+def slow_api(monkeypatch):
+    """Stub _call_api that blocks until released, returning a versioned payload"""
+    state = {"calls": 0, "release": asyncio.Event()}
+
+    async def fake_call_api(self, action, data=None):
+        state["calls"] += 1
+        version = state["calls"]
+        if action.startswith("get"):
+            await state["release"].wait()
+        return {"success": True, "version": version}
+
+    monkeypatch.setattr(SheetsAPIClient, "_call_api", fake_call_api)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_upstream_call(slow_api):
+    reads = [
+        asyncio.create_task(SheetsAPIClient(SHEET_ID).get_balance())
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    slow_api["release"].set()
+    results = await asyncio.gather(*reads)
+
+    assert slow_api["calls"] == 1
+    assert all(r["version"] == 1 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refreshing(slow_api, monkeypatch):
+    clock = FakeClock()
+    cache = MemorySheetsCache(ttl=300, max_age=3600, clock=clock)
+    monkeypatch.setattr(sheets_cache, "_cache", cache)
+    await cache.set(SHEET_ID, "getBalance", {"success": True, "version": 0})
+    clock.now += cache.ttl + 1
+
+    # Stale: answered immediately from cache, one background refresh
+    first = await SheetsAPIClient(SHEET_ID).get_balance()
+    second = await SheetsAPIClient(SHEET_ID).get_balance()
+    assert first["version"] == 0 and second["version"] == 0
+    refresh = sheets_api_client._inflight_reads[(SHEET_ID, "getBalance")]
+
+    slow_api["release"].set()
+    await refresh
+    assert slow_api["calls"] == 1
+    assert (await SheetsAPIClient(SHEET_ID).get_balance())["version"] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_discards_refresh_started_before_it(slow_api):
+    client = SheetsAPIClient(SHEET_ID)
+    read = asyncio.create_task(client.get_balance())
+    await asyncio.sleep(0)
+
+    await client.add_transaction(amount=10000, category="Ăn uống")
+    slow_api["release"].set()
+    await read
+
+    assert await get_sheets_cache().get_entry(SHEET_ID, "getBalance") is None
+
+
+class FakeRedis:
+    """Minimal async stand-in for redis.asyncio.Redis"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        for key in list(self.store):
+            if key.startswith(prefix):
+                yield key
+
+
+class BrokenRedis(FakeRedis):
+    """Every command fails as if Redis were down"""
+
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+    async def delete(self, *keys):
+        raise ConnectionError("redis down")
+
+    async def scan_iter(self, pattern):
+        raise ConnectionError("redis down")
+        yield
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_fresh_then_stale():
+    clock = FakeClock()
+    cache = RedisSheetsCache("redis://stub", ttl=5, max_age=30, clock=clock, client=FakeRedis())
+
+    await cache.set("a", "getBalance", {"v": 1})
+    assert await cache.get_entry("a", "getBalance") == ({"v": 1}, 0)
+    clock.now += 10
+    assert await cache.get_entry("a", "getBalance") == ({"v": 1}, 10)
+    await cache.invalidate("a")
+    assert await cache.get_entry("a", "getBalance") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_redis_legacy_or_corrupt_payload_is_a_miss():
+    redis = FakeRedis()
+    cache = RedisSheetsCache("redis://stub", client=redis)
+    redis.store[cache._key("a", "getBalance")] = json.dumps({"success": True, "jars": []})
+    redis.store[cache._key("a", "getCategories")] = "{not json"
+
+    assert await cache.get_entry("a", "getBalance") is None
+    assert await cache.get_entry("a", "getCategories") is None
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_degrades_to_miss():
+    cache = RedisSheetsCache("redis://stub", client=BrokenRedis())
+
+    await cache.set("a", "getBalance", {"v": 1})
+    assert await cache.get_entry("a", "getBalance") is None
+    await cache.invalidate("a")
+    await cache.clear()
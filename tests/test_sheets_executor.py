@@ -0,0 +1,90 @@
+"""
+Tests for running blocking Sheets v4 API requests off the event loop
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bot.services import sheets_executor
+from bot.services.sheets_executor import execute_request
+
+
+class SlowRequest:
+    """Stub HttpRequest whose execute() blocks like a slow Sheets round trip"""
+
+    def __init__(self, delay=0.3, result=None):
+        self.delay = delay
+        self.result = result or {"values": [["ok"]]}
+        self.threads = []
+
+    def execute(self, http=None):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return self.result
+
+
+class CountingRequest:
+    """Tracks how many executes overlap"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def execute(self, http=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return {}
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_slow_call():
+    request = SlowRequest(delay=0.3)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.ensure_future(ticker())
+    try:
+        result = await execute_request("sheet-a", request)
+    finally:
+        ticker_task.cancel()
+
+    assert result == {"values": [["ok"]]}
+    assert request.threads[0].startswith("sheets-api")
+    # A blocked loop would tick once or twice; a free one keeps ticking
+    assert len(ticks) >= 10
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_per_sheet_limit(monkeypatch):
+    monkeypatch.setattr(sheets_executor.settings, "SHEETS_MAX_CONCURRENT_PER_SHEET", 1)
+    monkeypatch.setattr(sheets_executor, "_limits_loop", None)
+
+    same_sheet = CountingRequest()
+    await asyncio.gather(*[execute_request("sheet-a", same_sheet) for _ in range(4)])
+    assert same_sheet.peak == 1
+
+    other_sheets = CountingRequest()
+    await asyncio.gather(*[execute_request(f"sheet-{i}", other_sheets) for i in range(4)])
+    assert other_sheets.peak > 1
+
+
+@pytest.mark.asyncio
+async def test_global_limit(monkeypatch):
+    monkeypatch.setattr(sheets_executor.settings, "SHEETS_MAX_CONCURRENT", 2)
+    monkeypatch.setattr(sheets_executor, "_limits_loop", None)
+
+    request = CountingRequest()
+    await asyncio.gather(*[execute_request(f"sheet-{i}", request) for i in range(6)])
+    assert request.peak == 2
@@ -0,0 +1,38 @@
+"""
+Tests for the shared Sheets v4 service factory
+"""
+import pytest
+
+from bot.services import sheets_service
+from bot.services.sheets_reader import SheetsReader
+from bot.services.sheets_writer import SheetsWriter
+
+
+@pytest.fixture
+def fake_build(monkeypatch):
+    calls = []
+
+    def from_file(path, scopes):
+        calls.append(("creds", tuple(scopes)))
+        return object()
+
+    def build(name, version, **kwargs):
+        calls.append(("build", kwargs["static_discovery"]))
+        return object()
+
+    monkeypatch.setattr(sheets_service.Credentials, "from_service_account_file", from_file)
+    monkeypatch.setattr(sheets_service, "build", build)
+    sheets_service.clear_sheets_services()
+    yield calls
+    sheets_service.clear_sheets_services()
+
+
+def test_service_is_built_once_per_scope(fake_build):
+    readers = [SheetsReader(f"sheet-{i}") for i in range(5)]
+    writers = [SheetsWriter(f"sheet-{i}") for i in range(5)]
+
+    assert len({id(r.service) for r in readers}) == 1
+    assert len({id(w.service) for w in writers}) == 1
+    assert readers[0].service is not writers[0].service
+    assert [c for c in fake_build if c[0] == "build"] == [("build", True), ("build", True)]
+    assert readers[3].spreadsheet_id == "sheet-3"
@@ -0,0 +1,122 @@
+"""
+Tests for the quick-record write-behind queue
+"""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bot.utils.database import Base, PendingSheetWrite
+from bot.services.sheets_write_queue import SheetsWriteQueue
+
+SHEET_ID = "q" * 44
+
+
+@pytest.fixture
+def session_factory():
+    """In-memory SQLite shared by every session of one test"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+class FakeClient:
+    """Records addTransactions batches; fails the first `failures` calls"""
+
+    batches = []
+    failures = 0
+
+    def __init__(self, spreadsheet_id, webapp_url=None):
+        self.spreadsheet_id = spreadsheet_id
+
+    async def add_transactions(self, transactions):
+        if FakeClient.failures > 0:
+            FakeClient.failures -= 1
+            return {"success": False, "error": "HTTP 500"}
+        FakeClient.batches.append(transactions)
+        return {"success": True, "count": len(transactions)}
+
+
+@pytest.fixture
+def make_queue(session_factory):
+    FakeClient.batches = []
+    FakeClient.failures = 0
+
+    def factory(**kwargs):
+        options = dict(batch_window=0.05, retry_base=0.01, max_attempts=3)
+        options.update(kwargs)
+        return SheetsWriteQueue(session_factory=session_factory, client_factory=FakeClient, **options)
+
+    return factory
+
+
+def pending_rows(session_factory):
+    db = session_factory()
+    try:
+        return db.query(PendingSheetWrite).all()
+    finally:
+        db.close()
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_into_one_call(make_queue, session_factory):
+    queue = make_queue()
+    for i in range(10):
+        await queue.enqueue(1, SHEET_ID, None, {"amount": i})
+
+    await asyncio.sleep(0.2)
+
+    assert len(FakeClient.batches) == 1
+    assert [t["amount"] for t in FakeClient.batches[0]] == list(range(10))
+    assert pending_rows(session_factory) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_with_backoff(make_queue, session_factory):
+    FakeClient.failures = 1
+    queue = make_queue()
+    await queue.enqueue(1, SHEET_ID, None, {"amount": 1})
+
+    await asyncio.sleep(0.3)
+
+    assert FakeClient.batches == [[{"amount": 1}]]
+    assert queue.stats["retries"] == 1
+    assert pending_rows(session_factory) == []
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts(make_queue, session_factory):
+    FakeClient.failures = 10
+    queue = make_queue(max_attempts=2)
+    await queue.enqueue(1, SHEET_ID, None, {"amount": 1})
+
+    await asyncio.sleep(0.3)
+
+    rows = pending_rows(session_factory)
+    assert [(r.status, r.attempts) for r in rows] == [("FAILED", 2)]
+    assert FakeClient.batches == []
+
+
+@pytest.mark.asyncio
+async def test_restore_sends_rows_left_by_previous_process(make_queue, session_factory):
+    db = session_factory()
+    db.add_all([
+        PendingSheetWrite(user_id=1, spreadsheet_id=SHEET_ID, payload=json.dumps({"amount": 1}), status="PENDING"),
+        PendingSheetWrite(user_id=1, spreadsheet_id=SHEET_ID, payload=json.dumps({"amount": 2}), status="SENDING"),
+    ])
+    db.commit()
+    db.close()
+
+    queue = make_queue()
+    assert await queue.restore() == 1
+    await asyncio.sleep(0.1)
+
+    assert FakeClient.batches == [[{"amount": 1}, {"amount": 2}]]
+    assert pending_rows(session_factory) == []
@@ -0,0 +1,75 @@
+"""
+Tests for the set-based daily streak check
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from bot.utils.database import Base, User
+
+pytest.importorskip("PIL")  # bot.handlers.celebration renders milestone images
+from bot.handlers.streak_tracking import check_missed_days
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    now = datetime.utcnow()
+    db = factory()
+    db.add_all([
+        # Missed 2+ days: streak broken
+        User(id=1, referral_code="R1", user_state="VIP", reminder_enabled=True, streak_count=5,
+             last_transaction_date=now - timedelta(days=3)),
+        User(id=2, referral_code="R2", user_state="SUPER_VIP", reminder_enabled=True, streak_count=1,
+             last_transaction_date=now - timedelta(days=2)),
+        # Recorded yesterday / today: kept
+        User(id=3, referral_code="R3", user_state="VIP", reminder_enabled=True, streak_count=4,
+             last_transaction_date=now - timedelta(days=1)),
+        User(id=4, referral_code="R4", user_state="VIP", reminder_enabled=True, streak_count=9,
+             last_transaction_date=now),
+        # Not checked: reminders off, not VIP, no streak, never recorded
+        User(id=5, referral_code="R5", user_state="VIP", reminder_enabled=False, streak_count=7,
+             last_transaction_date=now - timedelta(days=10)),
+        User(id=6, referral_code="R6", user_state="REGISTERED", reminder_enabled=True, streak_count=7,
+             last_transaction_date=now - timedelta(days=10)),
+        User(id=7, referral_code="R7", user_state="VIP", reminder_enabled=True, streak_count=0,
+             last_transaction_date=now - timedelta(days=10)),
+        User(id=8, referral_code="R8", user_state="VIP", reminder_enabled=True, streak_count=3),
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_breaks_streaks_in_one_update(session_factory):
+    statements = []
+    event.listen(
+        session_factory.kw["bind"], "before_cursor_execute",
+        lambda conn, cursor, sql, *args: statements.append(sql)
+    )
+
+    broken = check_missed_days(session_factory)
+
+    assert sorted(broken) == [1, 2]
+    assert len(statements) == 1 and statements[0].lstrip().startswith("UPDATE users")
+
+    db = session_factory()
+    streaks = dict(db.query(User.id, User.streak_count))
+    db.close()
+    assert streaks == {1: 0, 2: 0, 3: 4, 4: 9, 5: 7, 6: 7, 7: 0, 8: 3}
+
+
+def test_streak_update_uses_index(session_factory):
+    statements = []
+    engine = session_factory.kw["bind"]
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, params, *args: statements.append((sql, params)))
+
+    check_missed_days(session_factory)
+
+    sql, params = statements[0]
+    plan = engine.raw_connection().cursor().execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    assert "ix_users_streak_check" in " ".join(str(row[-1]) for row in plan)
@@ -0,0 +1,104 @@
+"""
+Tests for the in-process user cache and the per-update unit of work
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from bot.utils.database import Base, User
+from bot.middleware import usage_tracker
+from bot.middleware.usage_tracker import check_message_limit
+from bot.services.user_cache import UnitOfWork, UserCache
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+
+    db = factory()
+    db.add(User(id=42, username="lan", subscription_tier="FREE", bot_chat_count=0,
+                bot_chat_limit_date=datetime.now()))
+    db.commit()
+    db.close()
+    return factory
+
+
+@pytest.fixture
+def statements(session_factory):
+    executed = []
+    event.listen(
+        session_factory.kw["bind"], "before_cursor_execute",
+        lambda conn, cursor, sql, *args: executed.append(sql.split()[0])
+    )
+    return executed
+
+
+def _update(text="Chào bot"):
+    async def reply_text(*args, **kwargs):
+        pass
+
+    return SimpleNamespace(
+        message=SimpleNamespace(text=text, reply_text=reply_text),
+        effective_user=SimpleNamespace(id=42)
+    )
+
+
+@pytest.mark.asyncio
+async def test_update_loads_user_once_and_commits_once(session_factory, statements, monkeypatch):
+    monkeypatch.setattr(usage_tracker.Analytics, "track_event", staticmethod(lambda *args, **kwargs: None))
+    cache = UserCache(session_factory)
+
+    with UnitOfWork(session_factory, cache) as uow:
+        assert await check_message_limit(_update(), None, uow)
+    assert statements == ["SELECT", "UPDATE"]  # Cold: one SELECT, one UPDATE
+
+    statements.clear()
+    with UnitOfWork(session_factory, cache) as uow:
+        assert await check_message_limit(_update(), None, uow)
+    assert statements == ["UPDATE"]  # Warm: served from the cache
+
+    db = session_factory()
+    assert db.get(User, 42).bot_chat_count == 2
+    db.close()
+
+
+def test_writes_invalidate_and_ttl_expires(session_factory):
+    now = [0.0]
+    cache = UserCache(session_factory, ttl=30, clock=lambda: now[0])
+
+    db = session_factory()
+    cache.put(db.get(User, 42))
+    db.close()
+    first, second = cache.get(42), cache.get(42)
+    assert first is not second and first.username == "lan"
+
+    # ORM write through another session drops the entry
+    db = session_factory()
+    db.get(User, 42).username = "hoa"
+    db.commit()
+    db.close()
+    assert cache.get(42) is None
+
+    # Bulk UPDATE on users clears the whole cache
+    with UnitOfWork(session_factory, cache) as uow:
+        uow.get_user(42)
+    assert cache.get(42).username == "hoa"
+    db = session_factory()
+    db.query(User).update({User.bot_chat_count: 0})
+    db.commit()
+    db.close()
+    assert cache.get(42) is None
+
+    # Entries expire after the TTL
+    with UnitOfWork(session_factory, cache) as uow:
+        uow.get_user(42)
+    now[0] += 31
+    assert cache.get(42) is None